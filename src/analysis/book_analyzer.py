@@ -5,59 +5,127 @@ import logging
 from datetime import datetime
 import re
 from collections import Counter
+from src.analysis.result_cache import ResultCache, memoized
+from src.utils.metrics import Metrics
+from src.config.settings import Settings
+
+# 按顺序匹配，命中第一个即为该书的分类
+CATEGORY_PATTERNS = {
+    '小说': r'小说|故事|散文|随笔',
+    '教育': r'教育|教材|考试|学习|题库',
+    '经管': r'经济|管理|商业|金融|投资',
+    '科技': r'科技|计算机|编程|工程|科学',
+    '文学': r'文学|诗歌|散文|文集',
+    '生活': r'生活|美食|旅游|健康|养生',
+    '童书': r'童书|儿童|绘本|少儿',
+    '艺术': r'艺术|音乐|绘画|设计',
+    '社科': r'社会|科学|哲学|历史|政治'
+}
+
+# 价格区间
+PRICE_BINS = [0, 30, 50, 100, 200, float('inf')]
+PRICE_LABELS = ['0-30元', '30-50元', '50-100元', '100-200元', '200元以上']
+
+# 只保留每个近似重复簇的代表图书（簇编号即代表图书的 id，未聚类的图书视为独立作品）
+DEDUP_FILTER = "NOT EXISTS (SELECT 1 FROM book_clusters c WHERE c.book_id = b.id AND c.cluster_id != b.id)"
+
+# 书名关键词的停用词
+STOP_WORDS = {'的', '了', '和', '与', '或', '之', '等', '及', '上', '中', '下'}
+
+def clean_price(price: str) -> float:
+    """清理价格数据，提取数字"""
+    try:
+        # 移除货币符号和其他非数字字符
+        price = re.findall(r'\d+\.?\d*', price)[0]
+        return float(price)
+    except:
+        return 0.0
+
+def clean_rating(rating: str) -> float:
+    """清理评分数据，提取数字"""
+    try:
+        # 提取评分数字
+        rating = re.findall(r'\d+\.?\d*', rating)[0]
+        return float(rating)
+    except:
+        return 0.0
+
+def extract_publisher(author_info: str) -> str:
+    """从作者信息中提取出版社"""
+    try:
+        # 匹配出版社名称（通常在最后，包含"出版社"字样）
+        match = re.search(r'[\u4e00-\u9fa5]+出版社', author_info)
+        return match.group() if match else "未知出版社"
+    except:
+        return "未知出版社"
+
+def extract_author(author_info: str) -> str:
+    """从作者信息中提取作者（第一个"/"之前的部分，去掉"著""编"等署名方式），无法提取时返回空字符串"""
+    if not author_info:
+        return ""
+    author = author_info.split('/')[0].strip()
+    return re.sub(r'\s*(编著|主编|著|编|译|绘|等)+$', '', author).strip()
+
+def categorize_book(title: str, author_info: str) -> str:
+    """根据书名和作者信息对图书进行分类"""
+    text = f"{title} {author_info}"
+    for category, pattern in CATEGORY_PATTERNS.items():
+        if re.search(pattern, text, re.I):
+            return category
+    return "其他"
+
+def title_keywords(title: str) -> List[str]:
+    """书名中的关键词（简单的分词，可以使用更复杂的分词库如jieba），已过滤停用词"""
+    words = re.findall(r'[\u4e00-\u9fa5]+', title)
+    return [w for w in words if len(w) > 1 and w not in STOP_WORDS]
+
+def create_analyzer(db_manager, engine: str = None) -> 'BookAnalyzer':
+    """
+    创建分析器：安装了 duckdb 时默认使用 DuckDB 分析引擎，否则使用多进程分块分析
+
+    Args:
+        db_manager: 数据库管理器
+        engine: auto / duckdb / parallel / pandas，默认使用 Settings.ANALYTICS_ENGINE
+    """
+    engine = engine or Settings.ANALYTICS_ENGINE
+    if engine in ('auto', 'duckdb'):
+        try:
+            from src.analysis.duckdb_engine import DuckDBAnalyzer
+            return DuckDBAnalyzer(db_manager)
+        except Exception as e:
+            if engine == 'duckdb':
+                raise
+            logging.getLogger(__name__).info(f"DuckDB 分析引擎不可用，使用多进程分块分析: {str(e)}")
+    if engine in ('auto', 'parallel'):
+        from src.analysis.parallel_analyzer import ParallelAnalyzer
+        return ParallelAnalyzer(db_manager)
+    return BookAnalyzer(db_manager)
 
 class BookAnalyzer:
     def __init__(self, db_manager):
         self.db_manager = db_manager
         self.logger = logging.getLogger(__name__)
+        # 数据库有新写入时自动失效，重复查看同一批数据时直接返回上次的结果
+        self.result_cache = ResultCache(db_manager.data_version, Settings.ANALYSIS_CACHE_SIZE)
         
     def _clean_price(self, price: str) -> float:
         """清理价格数据，提取数字"""
-        try:
-            # 移除货币符号和其他非数字字符
-            price = re.findall(r'\d+\.?\d*', price)[0]
-            return float(price)
-        except:
-            return 0.0
+        return clean_price(price)
             
     def _clean_rating(self, rating: str) -> float:
         """清理评分数据，提取数字"""
-        try:
-            # 提取评分数字
-            rating = re.findall(r'\d+\.?\d*', rating)[0]
-            return float(rating)
-        except:
-            return 0.0
+        return clean_rating(rating)
 
     def _extract_publisher(self, author_info: str) -> str:
         """从作者信息中提取出版社"""
-        try:
-            # 匹配出版社名称（通常在最后，包含"出版社"字样）
-            match = re.search(r'[\u4e00-\u9fa5]+出版社', author_info)
-            return match.group() if match else "未知出版社"
-        except:
-            return "未知出版社"
+        return extract_publisher(author_info)
 
     def _categorize_book(self, title: str, author_info: str) -> str:
         """根据书名和作者信息对图书进行分类"""
-        categories = {
-            '小说': r'小说|故事|散文|随笔',
-            '教育': r'教育|教材|考试|学习|题库',
-            '经管': r'经济|管理|商业|金融|投资',
-            '科技': r'科技|计算机|编程|工程|科学',
-            '文学': r'文学|诗歌|散文|文集',
-            '生活': r'生活|美食|旅游|健康|养生',
-            '童书': r'童书|儿童|绘本|少儿',
-            '艺术': r'艺术|音乐|绘画|设计',
-            '社科': r'社会|科学|哲学|历史|政治'
-        }
-        
-        text = f"{title} {author_info}"
-        for category, pattern in categories.items():
-            if re.search(pattern, text, re.I):
-                return category
-        return "其他"
+        return categorize_book(title, author_info)
 
+    @memoized
+    @Metrics.timed('analysis.get_basic_stats')
     def get_basic_stats(self) -> Dict:
         """获取基本统计信息"""
         with self.db_manager.get_connection() as conn:
@@ -80,8 +148,12 @@ class BookAnalyzer:
                 }
             }
             
+            # 价格分位数和作者/出版社数量来自入库时维护的摘要，无需再扫描全表
+            stats.update(self.db_manager.stat_sketches.summary())
             return stats
 
+    @memoized
+    @Metrics.timed('analysis.analyze_price_trends')
     def analyze_price_trends(self) -> pd.DataFrame:
         """分析价格趋势"""
         with self.db_manager.get_connection() as conn:
@@ -95,11 +167,21 @@ class BookAnalyzer:
             
             return price_trends
 
-    def analyze_publishers(self) -> pd.DataFrame:
-        """分析出版社统计"""
+    @memoized
+    @Metrics.timed('analysis.analyze_publishers')
+    def analyze_publishers(self, dedup: bool = False) -> pd.DataFrame:
+        """分析出版社统计（dedup 为 True 时同一作品的多个版本只计一次）"""
         with self.db_manager.get_connection() as conn:
-            df = pd.read_sql_query("SELECT * FROM books", conn)
-            df['publisher'] = df['author'].apply(self._extract_publisher)
+            df = pd.read_sql_query(f'''
+            SELECT b.*, d.publisher AS detail_publisher FROM books b
+            LEFT JOIN book_details d ON d.url = b.url
+            {f"WHERE {DEDUP_FILTER}" if dedup else ""}
+            ''', conn)
+            # 优先使用详情页中的出版社，未补充详情的图书再从作者信息中提取
+            df['publisher'] = df['detail_publisher'].where(
+                df['detail_publisher'].notna(),
+                df['author'].apply(self._extract_publisher)
+            )
             
             publisher_stats = df.groupby('publisher').agg({
                 'title': 'count',
@@ -110,10 +192,12 @@ class BookAnalyzer:
             publisher_stats.columns = ['publisher', 'book_count', 'avg_price', 'avg_rating']
             return publisher_stats.sort_values('book_count', ascending=False)
 
-    def analyze_categories(self) -> pd.DataFrame:
-        """分析图书分类统计"""
+    @memoized
+    @Metrics.timed('analysis.analyze_categories')
+    def analyze_categories(self, dedup: bool = False) -> pd.DataFrame:
+        """分析图书分类统计（dedup 为 True 时同一作品的多个版本只计一次）"""
         with self.db_manager.get_connection() as conn:
-            df = pd.read_sql_query("SELECT * FROM books", conn)
+            df = pd.read_sql_query(f"SELECT b.* FROM books b {f'WHERE {DEDUP_FILTER}' if dedup else ''}", conn)
             df['category'] = df.apply(lambda x: self._categorize_book(x['title'], x['author']), axis=1)
             
             category_stats = df.groupby('category').agg({
@@ -125,40 +209,61 @@ class BookAnalyzer:
             category_stats.columns = ['category', 'book_count', 'avg_price', 'avg_rating']
             return category_stats.sort_values('book_count', ascending=False)
 
-    def analyze_keywords(self, top_n: int = 20) -> List[Tuple[str, int]]:
-        """分析书名关键词"""
+    @memoized
+    @Metrics.timed('analysis.analyze_keywords')
+    def analyze_keywords(self, top_n: int = 20, dedup: bool = False) -> List[Tuple[str, int]]:
+        """分析书名关键词（dedup 为 True 时同一作品的多个版本只计一次）"""
         with self.db_manager.get_connection() as conn:
-            df = pd.read_sql_query("SELECT title FROM books", conn)
+            # 按插入顺序读取，词频相同的关键词按首次出现的先后排序
+            df = pd.read_sql_query(
+                f"SELECT b.title FROM books b {f'WHERE {DEDUP_FILTER}' if dedup else ''} ORDER BY b.id", conn
+            )
             
-            # 分词并统计
+            # 分词并过滤停用词
             words = []
             for title in df['title']:
-                # 简单的分词（可以使用更复杂的分词库如jieba）
-                words.extend(re.findall(r'[\u4e00-\u9fa5]+', title))
-            
-            # 过滤停用词
-            stop_words = {'的', '了', '和', '与', '或', '之', '等', '及', '上', '中', '下'}
-            words = [w for w in words if len(w) > 1 and w not in stop_words]
+                words.extend(title_keywords(title))
             
             # 统计词频
             word_counts = Counter(words).most_common(top_n)
             return word_counts
 
+    @memoized
+    @Metrics.timed('analysis.analyze_price_segments')
     def analyze_price_segments(self) -> Dict[str, int]:
         """分析价格区间分布"""
         with self.db_manager.get_connection() as conn:
             df = pd.read_sql_query("SELECT price FROM books", conn)
             df['price_clean'] = df['price'].apply(self._clean_price)
             
-            bins = [0, 30, 50, 100, 200, float('inf')]
-            labels = ['0-30元', '30-50元', '50-100元', '100-200元', '200元以上']
-            df['price_range'] = pd.cut(df['price_clean'], bins=bins, labels=labels)
+            df['price_range'] = pd.cut(df['price_clean'], bins=PRICE_BINS, labels=PRICE_LABELS)
             
             distribution = df['price_range'].value_counts().to_dict()
             return distribution
 
-    def generate_summary_report(self) -> Dict:
-        """生成完整的分析报告"""
+    @memoized
+    @Metrics.timed('analysis.analyze_price_changes')
+    def analyze_price_changes(self, days: int = 7, direction: str = 'drop', limit: int = 50) -> pd.DataFrame:
+        """分析最近N天内降价/涨价的图书（基于价格时间序列索引）"""
+        changes = self.db_manager.price_history.get_price_changes(days, direction, limit)
+        return pd.DataFrame(changes, columns=[
+            'book_id', 'title', 'url', 'current_price', 'change', 'change_count'
+        ])
+
+    @memoized
+    @Metrics.timed('analysis.get_price_sparkline')
+    def get_price_sparkline(self, url: str, days: int = None) -> List[Tuple[str, float]]:
+        """获取单本图书的价格走势"""
+        return self.db_manager.price_history.get_sparkline(url, days)
+
+    @Metrics.timed('analysis.generate_summary_report')
+    def generate_summary_report(self, dedup: bool = False) -> Dict:
+        """
+        生成完整的分析报告
+
+        Args:
+            dedup: 出版社、分类和关键词统计中同一作品的多个版本只计一次
+        """
         try:
             # 基本统计
             basic_stats = self.get_basic_stats()
@@ -167,13 +272,13 @@ class BookAnalyzer:
             price_trends = self.analyze_price_trends()
             
             # 出版社分析
-            publisher_stats = self.analyze_publishers()
+            publisher_stats = self.analyze_publishers(dedup=dedup)
             
             # 分类分析
-            category_stats = self.analyze_categories()
+            category_stats = self.analyze_categories(dedup=dedup)
             
             # 关键词分析
-            keyword_stats = self.analyze_keywords()
+            keyword_stats = self.analyze_keywords(dedup=dedup)
             
             report = {
                 'basic_stats': basic_stats,
@@ -181,6 +286,7 @@ class BookAnalyzer:
                 'publisher_stats': publisher_stats.head(10).to_dict('records'),
                 'category_stats': category_stats.to_dict('records'),
                 'keyword_stats': dict(keyword_stats),
+                'deduplicated': dedup,
                 'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
             
@@ -0,0 +1,262 @@
+"""
+基于 DuckDB 的分析引擎
+
+与 BookAnalyzer 返回相同结构的结果，但分组聚合以列式SQL在 DuckDB 中完成，
+不再把整张表逐行读入 pandas。数据来源按以下顺序选择：
+1. 通过 DuckDB 的 sqlite 扩展直接挂载 books.db（需事先执行过一次 INSTALL sqlite）；
+2. 否则维护一份 Parquet 镜像（需要 pyarrow），数据库有新写入时自动重建。
+   镜像默认放在数据库文件旁的 <数据库名>_analytics 目录，签名中包含数据库路径，不同数据库不会共用镜像。
+"""
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+import pandas as pd
+from src.analysis.book_analyzer import BookAnalyzer, CATEGORY_PATTERNS, PRICE_BINS, PRICE_LABELS, STOP_WORDS
+from src.analysis.result_cache import memoized
+from src.utils.metrics import Metrics
+
+try:
+    import duckdb
+except ImportError:  # duckdb 为可选依赖
+    duckdb = None
+
+# 与 BookAnalyzer._clean_price / _clean_rating 一致：取第一个数字，无数字时为 0
+PRICE_SQL = r"COALESCE(TRY_CAST(NULLIF(regexp_extract(price, '\d+\.?\d*'), '') AS DOUBLE), 0.0)"
+RATING_SQL = r"COALESCE(TRY_CAST(NULLIF(regexp_extract(rating, '\d+\.?\d*'), '') AS DOUBLE), 0.0)"
+HAN_PATTERN = r'[\x{4e00}-\x{9fa5}]+'
+
+# 与 BookAnalyzer._extract_publisher 一致，详情页中的出版社优先
+PUBLISHER_SQL = (
+    "COALESCE(detail_publisher, "
+    f"NULLIF(regexp_extract(author, '{HAN_PATTERN}出版社'), ''), '未知出版社')"
+)
+
+def _sql_string(value) -> str:
+    """SQL 字符串字面量（单引号转义），用于不支持参数绑定的 ATTACH / read_parquet"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _category_sql() -> str:
+    """与 BookAnalyzer._categorize_book 一致的 CASE 表达式（按顺序匹配第一个分类）"""
+    text = "(title || ' ' || COALESCE(author, 'None'))"
+    cases = ' '.join(
+        f"WHEN regexp_matches({text}, '(?i){pattern}') THEN '{category}'"
+        for category, pattern in CATEGORY_PATTERNS.items()
+    )
+    return f"CASE {cases} ELSE '其他' END"
+
+class DuckDBAnalyzer(BookAnalyzer):
+    """使用 DuckDB 执行聚合的分析器"""
+
+    def __init__(self, db_manager, mirror_dir: Path = None):
+        if duckdb is None:
+            raise ImportError("DuckDB 分析引擎需要安装 duckdb：pip install duckdb")
+        super().__init__(db_manager)
+        self.logger = logging.getLogger(__name__)
+        db_path = Path(db_manager.db_path)
+        self.mirror_dir = Path(mirror_dir or db_path.with_name(f"{db_path.stem}_analytics"))
+        self._lock = threading.Lock()
+        self._mirror_signature = None
+        # 不在分析时联网下载扩展
+        self.conn = duckdb.connect(config={'autoinstall_known_extensions': False})
+        self.source = self._attach()
+        self.logger.info(f"DuckDB 分析引擎已启用（数据来源: {self.source}）")
+
+    def _attach(self) -> str:
+        """挂载 SQLite 数据库；sqlite 扩展不可用或图书数据已按月分区时改用 Parquet 镜像"""
+        # 分区文件只能通过连接池的临时视图合并读取，直接挂载主库只能看到当月的数据
+        if not self.db_manager.partitions.attached_months():
+            try:
+                self.conn.execute('LOAD sqlite')
+                self.conn.execute('SET sqlite_all_varchar = true')
+                self.conn.execute(f"ATTACH {_sql_string(self.db_manager.db_path)} AS src (TYPE sqlite, READ_ONLY)")
+                self.conn.execute('''
+                CREATE OR REPLACE VIEW books AS
+                SELECT CAST(b.id AS BIGINT) AS id, b.title, b.author, b.price, b.rating, b.platform, b.crawl_time,
+                       d.publisher AS detail_publisher
+                FROM src.books b LEFT JOIN src.book_details d ON d.url = b.url
+                ''')
+                return 'sqlite'
+            except duckdb.Error:
+                pass
+        from src.export.columnar_exporter import pa
+        if pa is None:
+            raise ImportError("DuckDB 无法加载 sqlite 扩展或图书数据已分区，且未安装 pyarrow，无法生成 Parquet 镜像")
+        self._refresh_mirror()
+        return 'parquet'
+
+    def _signature(self) -> List:
+        """数据库路径和内容的签名：图书表只追加，行数和最大 id 不变即认为没有新写入"""
+        with self.db_manager.reader() as conn:
+            books = conn.execute(f'SELECT COUNT(*), MAX(id) FROM {self.db_manager.book_rows_table}').fetchone()
+            details = conn.execute('SELECT COUNT(*), MAX(fetched_at) FROM book_details').fetchone()
+        return [str(Path(self.db_manager.db_path).resolve()), *books, *details]
+
+    def _refresh_mirror(self):
+        """数据库有变化时重建 Parquet 镜像"""
+        from src.export.columnar_exporter import ColumnarExporter, pq
+
+        signature = self._signature()
+        path = self.mirror_dir / 'books.parquet'
+        meta_path = self.mirror_dir / 'books.json'
+        if signature == self._mirror_signature:
+            return
+        if path.exists() and meta_path.exists() and json.loads(meta_path.read_text()) == signature:
+            self._mirror_signature = signature
+            self._create_mirror_view(path)
+            return
+
+        with Metrics.timer('analysis.duckdb_mirror'):
+            self.mirror_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix('.parquet.tmp')
+            writer = None
+            try:
+                for columns, rows in self.db_manager.iter_book_chunks(query='''
+                SELECT b.id, b.title, b.author, b.price, b.rating, b.platform, b.crawl_time,
+                       d.publisher AS detail_publisher
+                FROM books b LEFT JOIN book_details d ON d.url = b.url
+                ORDER BY b.id
+                '''):
+                    if writer is None:
+                        schema = ColumnarExporter._build_schema(columns)
+                        writer = pq.ParquetWriter(tmp_path, schema, compression='zstd')
+                    writer.write_batch(ColumnarExporter._to_record_batch(schema, rows))
+            finally:
+                if writer is not None:
+                    writer.close()
+            if writer is None:
+                # 空表：写入只有表头的镜像
+                schema = ColumnarExporter._build_schema(
+                    ['id', 'title', 'author', 'price', 'rating', 'platform', 'crawl_time', 'detail_publisher'])
+                pq.write_table(schema.empty_table(), tmp_path)
+            os.replace(tmp_path, path)
+            meta_path.write_text(json.dumps(signature))
+
+        self._mirror_signature = signature
+        self._create_mirror_view(path)
+        self.logger.info(f"已重建 Parquet 镜像（{signature[1]} 行）")
+
+    def _create_mirror_view(self, path: Path):
+        self.conn.execute(f"CREATE OR REPLACE VIEW books AS SELECT * FROM read_parquet({_sql_string(path)})")
+
+    def _query(self, sql: str) -> pd.DataFrame:
+        """执行查询（Parquet 模式下先检查镜像是否需要更新）"""
+        with self._lock:
+            if self.source == 'parquet':
+                self._refresh_mirror()
+            return self.conn.execute(sql).df()
+
+    @memoized
+    @Metrics.timed('analysis.get_basic_stats')
+    def get_basic_stats(self) -> Dict:
+        """获取基本统计信息"""
+        row = self._query(f'''
+        SELECT COUNT(*) AS total_books, AVG(p) AS avg_price, MAX(p) AS max_price, MIN(p) AS min_price,
+               AVG(r) AS avg_rating, MIN(crawl_time) AS start, MAX(crawl_time) AS end
+        FROM (SELECT {PRICE_SQL} AS p, {RATING_SQL} AS r, crawl_time FROM books)
+        ''').iloc[0]
+        platforms = self._query('''
+        SELECT platform, COUNT(*) AS cnt FROM books WHERE platform IS NOT NULL
+        GROUP BY platform ORDER BY cnt DESC, platform
+        ''')
+        nan = float('nan')
+        stats = {
+            'total_books': int(row['total_books']),
+            'avg_price': row['avg_price'] if pd.notna(row['avg_price']) else nan,
+            'max_price': row['max_price'] if pd.notna(row['max_price']) else nan,
+            'min_price': row['min_price'] if pd.notna(row['min_price']) else nan,
+            'avg_rating': row['avg_rating'] if pd.notna(row['avg_rating']) else nan,
+            'platform_dist': dict(zip(platforms['platform'], platforms['cnt'].astype(int))),
+            'date_range': {
+                'start': row['start'],
+                'end': row['end']
+            }
+        }
+        # 价格分位数和作者/出版社数量来自入库时维护的摘要
+        stats.update(self.db_manager.stat_sketches.summary())
+        return stats
+
+    @memoized
+    @Metrics.timed('analysis.analyze_price_trends')
+    def analyze_price_trends(self) -> pd.DataFrame:
+        """分析价格趋势"""
+        df = self._query(f'''
+        SELECT CAST(TRY_CAST(crawl_time AS TIMESTAMP) AS DATE) AS crawl_date, platform,
+               AVG(p) AS mean, MIN(p) AS min, MAX(p) AS max, COUNT(*) AS count
+        FROM (SELECT {PRICE_SQL} AS p, crawl_time, platform FROM books)
+        WHERE crawl_date IS NOT NULL AND platform IS NOT NULL
+        GROUP BY crawl_date, platform
+        ORDER BY crawl_date, platform
+        ''')
+        df['crawl_date'] = pd.to_datetime(df['crawl_date']).dt.date
+        return df
+
+    def _group_stats(self, key_sql: str, key: str) -> pd.DataFrame:
+        """按 key 分组统计图书数量、平均价格和平均评分，排序方式与 pandas 版本一致"""
+        df = self._query(f'''
+        SELECT {key_sql} AS {key}, COUNT(*) AS book_count,
+               AVG({PRICE_SQL}) AS avg_price, AVG({RATING_SQL}) AS avg_rating
+        FROM books GROUP BY 1 ORDER BY 1
+        ''')
+        return df.sort_values('book_count', ascending=False)
+
+    @memoized
+    @Metrics.timed('analysis.analyze_publishers')
+    def analyze_publishers(self, dedup: bool = False) -> pd.DataFrame:
+        """分析出版社统计（去重统计需要聚类结果表，使用 pandas 实现）"""
+        if dedup:
+            return super().analyze_publishers(dedup=True)
+        return self._group_stats(PUBLISHER_SQL, 'publisher')
+
+    @memoized
+    @Metrics.timed('analysis.analyze_categories')
+    def analyze_categories(self, dedup: bool = False) -> pd.DataFrame:
+        """分析图书分类统计（去重统计需要聚类结果表，使用 pandas 实现）"""
+        if dedup:
+            return super().analyze_categories(dedup=True)
+        return self._group_stats(_category_sql(), 'category')
+
+    @memoized
+    @Metrics.timed('analysis.analyze_keywords')
+    def analyze_keywords(self, top_n: int = 20, dedup: bool = False) -> List[Tuple[str, int]]:
+        """分析书名关键词（词频相同时按首次出现的先后排序，与 Counter.most_common 一致）"""
+        if dedup:
+            # 去重统计需要聚类结果表，使用 pandas 实现
+            return super().analyze_keywords(top_n, dedup=True)
+        stop_words = ', '.join(f"'{word}'" for word in STOP_WORDS)
+        df = self._query(f'''
+        WITH words AS (
+            SELECT id, UNNEST(w) AS word, UNNEST(range(len(w))) AS pos
+            FROM (SELECT id, regexp_extract_all(title, '{HAN_PATTERN}') AS w FROM books)
+        )
+        SELECT word, COUNT(*) AS cnt, MIN(id * 1000000 + pos) AS first_seen
+        FROM words
+        WHERE length(word) > 1 AND word NOT IN ({stop_words})
+        GROUP BY word
+        ORDER BY cnt DESC, first_seen
+        LIMIT {int(top_n)}
+        ''')
+        return list(zip(df['word'], df['cnt'].astype(int)))
+
+    @memoized
+    @Metrics.timed('analysis.analyze_price_segments')
+    def analyze_price_segments(self) -> Dict[str, int]:
+        """分析价格区间分布（区间为左开右闭，与 pd.cut 一致）"""
+        cases = ' '.join(
+            f"WHEN p > {low} AND p <= {high} THEN {index}"
+            for index, (low, high) in enumerate(zip(PRICE_BINS[:-1], PRICE_BINS[1:]))
+            if high != float('inf')
+        )
+        last = len(PRICE_LABELS) - 1
+        df = self._query(f'''
+        SELECT CASE {cases} WHEN p > {PRICE_BINS[-2]} THEN {last} END AS segment, COUNT(*) AS cnt
+        FROM (SELECT {PRICE_SQL} AS p FROM books)
+        GROUP BY segment
+        ''')
+        counts = dict.fromkeys(PRICE_LABELS, 0)
+        for segment, cnt in zip(df['segment'], df['cnt']):
+            if pd.notna(segment):
+                counts[PRICE_LABELS[int(segment)]] = int(cnt)
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
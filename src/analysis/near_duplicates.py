@@ -0,0 +1,270 @@
+"""
+近似重复图书聚类（MinHash + LSH）
+
+同一部作品在当当网上常以不同版本、套装或带促销后缀的书名重复出现。
+这里对"规范化书名的字符3-gram + 作者"计算 MinHash 签名，按 LSH 分段把签名
+相同的图书放进同一个桶，只比较同桶的候选对，因此整体耗时接近线性。
+相似度达到阈值的图书合并为一个簇，簇编号为簇内最小的图书 id，
+保存在 book_clusters 表中，分析时可按需只保留每个簇的代表图书。
+
+命令行用法（在项目根目录执行）：
+    python -m src.analysis.near_duplicates build
+    python -m src.analysis.near_duplicates show --limit 20
+"""
+import argparse
+import logging
+import re
+import sqlite3
+import sys
+import zlib
+from typing import Dict, List, Set
+import numpy as np
+from src.analysis.book_analyzer import extract_author
+from src.config.settings import Settings
+from src.utils.metrics import Metrics
+
+# 书名中与作品本身无关的部分：括号内的说明、版本、册数和促销词
+BRACKETS_PATTERN = re.compile(r'[【\[（(《<].*?[】\]）)》>]')
+NOISE_PATTERN = re.compile(
+    r'第[一二三四五六七八九十\d]+版|[全共]?[一二三四五六七八九十\d]+册|'
+    r'正版|包邮|现货|套装|全套|新版|修订版|珍藏版|典藏版|精装|平装|赠[^\s]*'
+)
+PUNCTUATION_PATTERN = re.compile(r'[\W_]+')
+
+# 梅森素数 2^31-1，签名计算 (a * x + b) mod P 时不会溢出 uint64
+MERSENNE_PRIME = (1 << 31) - 1
+
+# 合成桶键的乘数（64 位奇数）
+BAND_MULTIPLIERS = np.array([
+    0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+    0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x27D4EB2F165667C5, 0x94D049BB133111EB
+], dtype=np.uint64)
+
+def band_multipliers(rows: int) -> np.ndarray:
+    """每段 rows 个签名值所需的桶键乘数，超出预置的部分用固定种子生成（各次运行一致）"""
+    if rows <= len(BAND_MULTIPLIERS):
+        return BAND_MULTIPLIERS[:rows]
+    rng = np.random.default_rng(0x9E3779B9)
+    extra = rng.integers(0, np.iinfo(np.uint64).max, size=rows - len(BAND_MULTIPLIERS),
+                         dtype=np.uint64, endpoint=True) | np.uint64(1)
+    return np.concatenate([BAND_MULTIPLIERS, extra])
+
+def normalize_title(title: str) -> str:
+    """去掉括号说明、版本/册数/促销词和标点，统一为小写"""
+    title = BRACKETS_PATTERN.sub(' ', title or '')
+    title = NOISE_PATTERN.sub(' ', title)
+    return PUNCTUATION_PATTERN.sub('', title).lower()
+
+def shingles(title: str, author_info: str, size: int = 3) -> Set[str]:
+    """
+    规范化书名的字符 n-gram，加上与书名特征数量相同的作者特征
+
+    作者特征占一半权重，书名相同但作者不同的图书相似度只有约 1/3，不会被合并。
+    """
+    text = normalize_title(title)
+    grams = {text[i:i + size] for i in range(max(1, len(text) - size + 1))} if text else set()
+    author = extract_author(author_info)
+    if author:
+        grams.update(f"@{index}:{author}" for index in range(max(1, len(grams))))
+    return grams
+
+class MinHasher:
+    """用 numpy 批量计算 MinHash 签名"""
+
+    def __init__(self, num_perm: int = 32, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+
+    def signatures(self, shingle_sets: List[Set[str]]) -> np.ndarray:
+        """
+        计算一批图书的签名
+
+        Returns:
+            np.ndarray: 形状为 (图书数, num_perm) 的 uint32 数组，没有特征的图书整行为最大值
+        """
+        lengths = np.array([len(s) for s in shingle_sets], dtype=np.int64)
+        result = np.full((len(shingle_sets), self.num_perm), MERSENNE_PRIME, dtype=np.uint32)
+        if not lengths.sum():
+            return result
+        hashes = np.fromiter(
+            (zlib.crc32(g.encode('utf-8')) for s in shingle_sets for g in s),
+            dtype=np.uint64, count=int(lengths.sum())
+        ) % MERSENNE_PRIME
+        values = (hashes[:, None] * self.a + self.b) % MERSENNE_PRIME
+        nonempty = lengths > 0
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+        result[nonempty] = np.minimum.reduceat(values, offsets, axis=0)
+        return result
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, x: int, y: int):
+        root_x, root_y = self.find(x), self.find(y)
+        if root_x != root_y:
+            # 以较小的下标为根，簇编号即为簇内最早入库的图书
+            if root_x < root_y:
+                self.parent[root_y] = root_x
+            else:
+                self.parent[root_x] = root_y
+
+class NearDuplicateDetector:
+    """近似重复图书聚类"""
+
+    def __init__(self, db_manager, num_perm: int = None, bands: int = None, threshold: float = None):
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+        self.hasher = MinHasher(num_perm or Settings.DEDUP_NUM_PERM)
+        self.bands = bands or Settings.DEDUP_BANDS
+        self.threshold = threshold or Settings.DEDUP_THRESHOLD
+        if self.hasher.num_perm % self.bands:
+            raise ValueError(f"签名长度 {self.hasher.num_perm} 必须能被分段数 {self.bands} 整除")
+        self.multipliers = band_multipliers(self.hasher.num_perm // self.bands)
+
+    @staticmethod
+    def init_tables(conn: sqlite3.Connection):
+        """创建聚类结果表"""
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS book_clusters (
+            book_id INTEGER PRIMARY KEY,
+            cluster_id INTEGER NOT NULL
+        )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_book_clusters_cluster ON book_clusters(cluster_id)')
+
+    def _signatures(self, chunk_size: int = 50000):
+        """按 id 顺序计算全部图书的签名"""
+        ids, parts = [], []
+        for _, rows in self.db_manager.iter_book_chunks(
+                chunk_size, query='SELECT id, title, author FROM books ORDER BY id'):
+            ids.extend(row[0] for row in rows)
+            parts.append(self.hasher.signatures([shingles(row[1], row[2]) for row in rows]))
+        if not parts:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, self.hasher.num_perm), dtype=np.uint32)
+        return np.array(ids, dtype=np.int64), np.vstack(parts)
+
+    def _candidate_pairs(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        LSH 分段：某一段签名完全相同的图书互为候选
+
+        每个桶按 id 顺序排列，桶内每本书只与桶内第一本和前一本比较，
+        足以把相似的图书连成一个簇，同时避免大桶产生平方级的候选对。
+        """
+        rows = signatures.shape[1] // self.bands
+        pairs = []
+        for band in range(self.bands):
+            block = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+            # 把一段签名合成一个 64 位桶键（溢出回绕），偶发的冲突会在相似度校验时排除
+            keys = (block * self.multipliers).sum(axis=1)
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            same = sorted_keys[1:] == sorted_keys[:-1]
+            if not same.any():
+                continue
+            # 每个桶的起始位置
+            starts = np.flatnonzero(np.concatenate(([True], ~same)))
+            heads = order[starts[np.searchsorted(starts, np.arange(1, len(order)), side='right') - 1]]
+            members = order[1:][same]
+            pairs.append(np.stack([heads[same], members], axis=1))
+            pairs.append(np.stack([order[:-1][same], members], axis=1))
+        if not pairs:
+            return np.zeros((0, 2), dtype=np.int64)
+        pairs = np.unique(np.sort(np.vstack(pairs), axis=1), axis=0)
+        return pairs[pairs[:, 0] != pairs[:, 1]]
+
+    @Metrics.timed('analysis.near_duplicates')
+    def build(self) -> Dict[str, int]:
+        """
+        重新计算全部图书的聚类并写入 book_clusters
+
+        Returns:
+            Dict[str, int]: books（图书数）、clusters（簇数）、duplicates（被归入其他图书所在簇的图书数）
+        """
+        ids, signatures = self._signatures()
+        union_find = _UnionFind(len(ids))
+        pairs = self._candidate_pairs(signatures)
+        if len(pairs):
+            # 用签名中相同位置的比例估计 Jaccard 相似度
+            similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+            # 没有任何特征的图书签名全为最大值，不能互相匹配
+            empty = (signatures[pairs[:, 0]] == MERSENNE_PRIME).all(axis=1)
+            for left, right in pairs[(similarity >= self.threshold) & ~empty]:
+                union_find.union(int(left), int(right))
+
+        roots = np.array([union_find.find(i) for i in range(len(ids))], dtype=np.int64)
+        cluster_ids = ids[roots] if len(ids) else ids
+        with self.db_manager.writer() as conn:
+            conn.execute('DELETE FROM book_clusters')
+            conn.executemany('INSERT INTO book_clusters (book_id, cluster_id) VALUES (?, ?)',
+                             zip(ids.tolist(), cluster_ids.tolist()))
+
+        summary = {
+            'books': len(ids),
+            'clusters': len(np.unique(roots)),
+            'duplicates': int((roots != np.arange(len(ids))).sum())
+        }
+        self.logger.info(
+            f"近似重复聚类完成: 图书{summary['books']}本, 簇{summary['clusters']}个, 重复{summary['duplicates']}本"
+        )
+        return summary
+
+    def is_current(self) -> bool:
+        """所有图书是否都已有聚类结果"""
+        with self.db_manager.reader() as conn:
+            return conn.execute('''
+            SELECT NOT EXISTS (
+                SELECT 1 FROM books b WHERE NOT EXISTS (SELECT 1 FROM book_clusters c WHERE c.book_id = b.id)
+            )
+            ''').fetchone()[0] == 1
+
+    def ensure_current(self):
+        """有新入库的图书时重新聚类"""
+        if not self.is_current():
+            self.build()
+
+    def largest_clusters(self, limit: int = 20) -> List[Dict]:
+        """图书数最多的簇及其代表书名"""
+        with self.db_manager.reader() as conn:
+            rows = conn.execute('''
+            SELECT c.cluster_id, COUNT(*) AS size, b.title
+            FROM book_clusters c JOIN books b ON b.id = c.cluster_id
+            GROUP BY c.cluster_id HAVING size > 1
+            ORDER BY size DESC, c.cluster_id LIMIT ?
+            ''', (limit,)).fetchall()
+        return [{'cluster_id': cluster_id, 'size': size, 'title': title} for cluster_id, size, title in rows]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="近似重复图书聚类")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('build', help="重新计算全部图书的聚类")
+    show_parser = subparsers.add_parser('show', help="显示图书最多的簇")
+    show_parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    from src.database.db_manager import DatabaseManager
+    from src.utils.logger import Logger
+
+    Logger.setup_logging()
+    detector = NearDuplicateDetector(DatabaseManager.instance())
+    if args.command == 'build':
+        summary = detector.build()
+        print(f"共 {summary['books']} 本图书，{summary['clusters']} 个簇，{summary['duplicates']} 本为重复版本")
+    else:
+        for cluster in detector.largest_clusters(args.limit):
+            print(f"[{cluster['cluster_id']}] {cluster['size']} 本: {cluster['title']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
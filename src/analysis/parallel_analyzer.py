@@ -0,0 +1,262 @@
+"""
+多进程分块分析
+
+按 id 区间把 books 表切成若干块，在进程池中并行完成价格/评分清洗、出版社提取、
+分类和关键词统计，每块只返回部分聚合（计数、求和、最值、Counter），
+最后在主进程合并，结果与 BookAnalyzer 的单进程实现一致。
+"""
+import bisect
+import os
+import sqlite3
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from src.analysis.book_analyzer import (
+    BookAnalyzer, DEDUP_FILTER, PRICE_BINS, PRICE_LABELS,
+    categorize_book, clean_price, clean_rating, extract_publisher, title_keywords
+)
+from src.analysis.result_cache import memoized
+from src.config.settings import Settings
+from src.database.partitions import PartitionStore
+from src.utils.metrics import Metrics
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    # 与连接池一样挂载按月分区
+    PartitionStore.attach(conn)
+    return conn
+
+def _group_partial(rows, key_func) -> Dict:
+    """分组部分聚合：键 -> [图书数, 价格和, 评分和]"""
+    groups = {}
+    for row in rows:
+        key = key_func(row)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = [0, 0.0, 0.0]
+        group[0] += 1
+        group[1] += clean_price(row['price'])
+        group[2] += clean_rating(row['rating'])
+    return groups
+
+def _map_basic(conn, where: str, params: Tuple) -> Dict:
+    partial = {'count': 0, 'price_sum': 0.0, 'price_min': None, 'price_max': None,
+               'rating_sum': 0.0, 'platforms': Counter(), 'time_min': None, 'time_max': None}
+    for row in conn.execute(f'SELECT price, rating, platform, crawl_time FROM books b WHERE {where}',
+                            params):
+        price = clean_price(row['price'])
+        partial['count'] += 1
+        partial['price_sum'] += price
+        partial['price_min'] = price if partial['price_min'] is None else min(partial['price_min'], price)
+        partial['price_max'] = price if partial['price_max'] is None else max(partial['price_max'], price)
+        partial['rating_sum'] += clean_rating(row['rating'])
+        if row['platform'] is not None:
+            partial['platforms'][row['platform']] += 1
+        crawl_time = row['crawl_time']
+        if crawl_time is not None:
+            partial['time_min'] = crawl_time if partial['time_min'] is None else min(partial['time_min'], crawl_time)
+            partial['time_max'] = crawl_time if partial['time_max'] is None else max(partial['time_max'], crawl_time)
+    return partial
+
+def _map_trends(conn, where: str, params: Tuple) -> Dict:
+    df = pd.read_sql_query(f'SELECT price, platform, crawl_time FROM books b WHERE {where}',
+                           conn, params=params)
+    df['price_clean'] = df['price'].apply(clean_price)
+    df['crawl_date'] = pd.to_datetime(df['crawl_time']).dt.date
+    groups = {}
+    for (crawl_date, platform), prices in df.groupby(['crawl_date', 'platform'])['price_clean']:
+        groups[(crawl_date, platform)] = [prices.sum(), prices.min(), prices.max(), len(prices)]
+    return groups
+
+def _publisher_key(row) -> str:
+    """优先使用详情页中的出版社，未补充详情的图书再从作者信息中提取"""
+    if row['detail_publisher'] is not None:
+        return row['detail_publisher']
+    return extract_publisher(row['author'])
+
+def _map_publishers(conn, where: str, params: Tuple) -> Dict:
+    rows = conn.execute(f'''
+    SELECT b.author, b.price, b.rating, d.publisher AS detail_publisher FROM books b
+    LEFT JOIN book_details d ON d.url = b.url
+    WHERE {where}
+    ''', params)
+    return _group_partial(rows, _publisher_key)
+
+def _map_categories(conn, where: str, params: Tuple) -> Dict:
+    rows = conn.execute(f'SELECT title, author, price, rating FROM books b WHERE {where}', params)
+    return _group_partial(rows, lambda row: categorize_book(row['title'], row['author']))
+
+def _map_keywords(conn, where: str, params: Tuple) -> Tuple[Counter, Dict]:
+    """关键词词频，以及每个词首次出现的位置 (id, 序号)，用于合并后按首次出现排序"""
+    counts = Counter()
+    first_seen = {}
+    for book_id, title in conn.execute(f'SELECT b.id, b.title FROM books b WHERE {where} ORDER BY b.id',
+                                       params):
+        for position, word in enumerate(title_keywords(title)):
+            counts[word] += 1
+            if word not in first_seen:
+                first_seen[word] = (book_id, position)
+    return counts, first_seen
+
+def _map_segments(conn, where: str, params: Tuple) -> List[int]:
+    counts = [0] * len(PRICE_LABELS)
+    for (price,) in conn.execute(f'SELECT price FROM books b WHERE {where}', params):
+        # 区间为左开右闭，与 pd.cut 一致；不大于 0 的价格不属于任何区间
+        index = bisect.bisect_left(PRICE_BINS, clean_price(price)) - 1
+        if 0 <= index < len(PRICE_LABELS):
+            counts[index] += 1
+    return counts
+
+MAPPERS = {
+    'basic': _map_basic,
+    'trends': _map_trends,
+    'publishers': _map_publishers,
+    'categories': _map_categories,
+    'keywords': _map_keywords,
+    'segments': _map_segments,
+}
+
+def _map_task(task: Tuple[str, str, int, int, bool]):
+    """子进程任务：对 id 位于 [low, high) 的图书计算部分聚合，dedup 为 True 时只计每个近似重复簇的代表图书"""
+    db_path, kind, low, high, dedup = task
+    where = 'b.id >= ? AND b.id < ?' + (f' AND {DEDUP_FILTER}' if dedup else '')
+    conn = _connect(db_path)
+    try:
+        return MAPPERS[kind](conn, where, (low, high))
+    finally:
+        conn.close()
+
+def _merge_groups(partials: List[Dict]) -> Dict:
+    merged = {}
+    for partial in partials:
+        for key, (count, price_sum, rating_sum) in partial.items():
+            group = merged.get(key)
+            if group is None:
+                merged[key] = [count, price_sum, rating_sum]
+            else:
+                group[0] += count
+                group[1] += price_sum
+                group[2] += rating_sum
+    return merged
+
+class ParallelAnalyzer(BookAnalyzer):
+    """在多个CPU核心上分块执行分析的分析器"""
+
+    def __init__(self, db_manager, workers: int = None, chunk_rows: int = None):
+        super().__init__(db_manager)
+        self.workers = workers or Settings.ANALYSIS_WORKERS or os.cpu_count()
+        self.chunk_rows = chunk_rows or Settings.ANALYSIS_CHUNK_ROWS
+
+    def _id_ranges(self) -> List[Tuple[int, int]]:
+        """按 id 把图书表切成 [low, high) 区间"""
+        with self.db_manager.reader() as conn:
+            low, high = conn.execute(f'SELECT MIN(id), MAX(id) FROM {self.db_manager.book_rows_table}').fetchone()
+        if low is None:
+            return []
+        return [(start, min(start + self.chunk_rows, high + 1))
+                for start in range(low, high + 1, self.chunk_rows)]
+
+    def _map(self, kind: str, dedup: bool = False) -> List:
+        """在进程池中对每个区间执行 kind 对应的部分聚合，只有一个区间时在当前进程执行"""
+        tasks = [(str(self.db_manager.db_path), kind, low, high, dedup) for low, high in self._id_ranges()]
+        with Metrics.timer(f'analysis.parallel_map.{kind}'):
+            if len(tasks) <= 1 or self.workers <= 1:
+                return [_map_task(task) for task in tasks]
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as executor:
+                return list(executor.map(_map_task, tasks))
+
+    def _group_stats(self, kind: str, key: str, dedup: bool) -> pd.DataFrame:
+        merged = _merge_groups(self._map(kind, dedup))
+        # 先按键排序得到与 groupby 相同的行顺序和索引，再用同样的方式按图书数排序
+        rows = [(name, count, price_sum / count, rating_sum / count)
+                for name, (count, price_sum, rating_sum) in sorted(merged.items())]
+        df = pd.DataFrame(rows, columns=[key, 'book_count', 'avg_price', 'avg_rating'])
+        return df.sort_values('book_count', ascending=False)
+
+    @memoized
+    @Metrics.timed('analysis.get_basic_stats')
+    def get_basic_stats(self) -> Dict:
+        """获取基本统计信息"""
+        partials = [p for p in self._map('basic') if p['count']]
+        count = sum(p['count'] for p in partials)
+        platforms = Counter()
+        for partial in partials:
+            platforms.update(partial['platforms'])
+        times_min = [p['time_min'] for p in partials if p['time_min'] is not None]
+        times_max = [p['time_max'] for p in partials if p['time_max'] is not None]
+        nan = float('nan')
+        stats = {
+            'total_books': count,
+            'avg_price': sum(p['price_sum'] for p in partials) / count if count else nan,
+            'max_price': max(p['price_max'] for p in partials) if count else nan,
+            'min_price': min(p['price_min'] for p in partials) if count else nan,
+            'avg_rating': sum(p['rating_sum'] for p in partials) / count if count else nan,
+            'platform_dist': dict(platforms.most_common()),
+            'date_range': {
+                'start': min(times_min) if times_min else nan,
+                'end': max(times_max) if times_max else nan
+            }
+        }
+        # 价格分位数和作者/出版社数量来自入库时维护的摘要
+        stats.update(self.db_manager.stat_sketches.summary())
+        return stats
+
+    @memoized
+    @Metrics.timed('analysis.analyze_price_trends')
+    def analyze_price_trends(self) -> pd.DataFrame:
+        """分析价格趋势"""
+        merged = {}
+        for partial in self._map('trends'):
+            for key, (price_sum, price_min, price_max, count) in partial.items():
+                group = merged.get(key)
+                if group is None:
+                    merged[key] = [price_sum, price_min, price_max, count]
+                else:
+                    group[0] += price_sum
+                    group[1] = min(group[1], price_min)
+                    group[2] = max(group[2], price_max)
+                    group[3] += count
+        rows = [(crawl_date, platform, price_sum / count, price_min, price_max, count)
+                for (crawl_date, platform), (price_sum, price_min, price_max, count) in sorted(merged.items())]
+        df = pd.DataFrame(rows, columns=['crawl_date', 'platform', 'mean', 'min', 'max', 'count'])
+        df['count'] = df['count'].astype(np.int64)
+        return df
+
+    @memoized
+    @Metrics.timed('analysis.analyze_publishers')
+    def analyze_publishers(self, dedup: bool = False) -> pd.DataFrame:
+        """分析出版社统计（dedup 为 True 时同一作品的多个版本只计一次）"""
+        return self._group_stats('publishers', 'publisher', dedup)
+
+    @memoized
+    @Metrics.timed('analysis.analyze_categories')
+    def analyze_categories(self, dedup: bool = False) -> pd.DataFrame:
+        """分析图书分类统计（dedup 为 True 时同一作品的多个版本只计一次）"""
+        return self._group_stats('categories', 'category', dedup)
+
+    @memoized
+    @Metrics.timed('analysis.analyze_keywords')
+    def analyze_keywords(self, top_n: int = 20, dedup: bool = False) -> List[Tuple[str, int]]:
+        """分析书名关键词（词频相同时按首次出现的先后排序，与 Counter.most_common 一致）"""
+        counts = Counter()
+        first_seen = {}
+        for partial_counts, partial_first_seen in self._map('keywords', dedup):
+            counts.update(partial_counts)
+            for word, position in partial_first_seen.items():
+                if word not in first_seen or position < first_seen[word]:
+                    first_seen[word] = position
+        words = sorted(counts.items(), key=lambda item: (-item[1], first_seen[item[0]]))
+        return words[:top_n]
+
+    @memoized
+    @Metrics.timed('analysis.analyze_price_segments')
+    def analyze_price_segments(self) -> Dict[str, int]:
+        """分析价格区间分布"""
+        counts = [0] * len(PRICE_LABELS)
+        for partial in self._map('segments'):
+            counts = [total + count for total, count in zip(counts, partial)]
+        return dict(sorted(zip(PRICE_LABELS, counts), key=lambda item: -item[1]))
@@ -0,0 +1,92 @@
+"""
+分析结果缓存
+
+以 (方法名, 参数) 为键缓存分析结果，并记录计算时的数据版本号
+（DatabaseManager.data_version，即 PRAGMA data_version）。
+数据库有新的写入后版本号改变，整个缓存随之失效，因此无需在写入处手动清理。
+"""
+import copy
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple
+from src.utils.metrics import Metrics
+
+class ResultCache:
+    """按数据版本失效的 LRU 缓存（线程安全）"""
+
+    def __init__(self, version_func: Callable[[], int], maxsize: int = 32):
+        self.version_func = version_func
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._version = None
+
+    def _check_version(self) -> int:
+        """数据版本变化时清空缓存，返回当前版本号"""
+        version = self.version_func()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        return version
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        查找缓存
+
+        Returns:
+            Tuple[bool, Any]: (是否命中, 缓存的结果)
+        """
+        with self._lock:
+            self._check_version()
+            if key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, self._entries[key]
+
+    def put(self, key: Hashable, value: Any, version: int):
+        """写入缓存；计算期间数据已变化（版本号不同）时不写入"""
+        with self._lock:
+            if self._check_version() != version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def version(self) -> int:
+        with self._lock:
+            return self._check_version()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def __len__(self):
+        return len(self._entries)
+
+def memoized(func):
+    """
+    分析方法的缓存装饰器，缓存存放在实例的 result_cache 属性上（为 None 时不缓存）
+
+    结果以深拷贝返回，调用方修改返回的 DataFrame/字典不会影响缓存。
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        cache = getattr(self, 'result_cache', None)
+        if cache is None:
+            return func(self, *args, **kwargs)
+
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        hit, value = cache.get(key)
+        if hit:
+            Metrics.inc('analysis_cache_hits_total', stage=func.__name__)
+            return copy.deepcopy(value)
+
+        Metrics.inc('analysis_cache_misses_total', stage=func.__name__)
+        version = cache.version()
+        value = func(self, *args, **kwargs)
+        cache.put(key, copy.deepcopy(value), version)
+        return value
+    return wrapper
@@ -0,0 +1,320 @@
+"""
+相似图书索引
+
+把书名和出版信息（作者字段）的字符 2/3-gram 哈希到固定维度，按 TF-IDF 加权并做
+L2 归一化，再以倒排形式（每个特征对应的图书及权重）保存为 .npy 文件，加载时内存映射。
+查询时只累加查询特征对应的倒排列表即可得到全部图书的余弦相似度，不必扫描图书表。
+
+新入库的图书以增量分段追加（沿用建索引时的 IDF），增量部分超过主索引的
+Settings.SIMILARITY_REBUILD_RATIO 时整体重建。重建时写入新的 gen-* 子目录，写完后
+原子替换 meta.json 切换过去，再删除旧目录，重建中途崩溃或同时查询都能读到完整的索引。
+
+命令行用法（在项目根目录执行）：
+    python -m src.analysis.similarity_index build
+    python -m src.analysis.similarity_index query "深入理解计算机系统" --top 10
+"""
+import argparse
+import json
+import logging
+import math
+import re
+import shutil
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+from src.config.settings import Settings
+from src.utils.metrics import Metrics
+
+# 哈希特征空间的维度
+DIMENSION = 1 << 18
+TITLE_NGRAMS = (2, 3)
+AUTHOR_NGRAMS = (3,)
+# 出版信息的特征权重（书名为 1）
+AUTHOR_WEIGHT = 0.5
+NON_WORD_PATTERN = re.compile(r'[\W_]+')
+# 出版信息中的日期等数字与内容无关
+AUTHOR_NOISE_PATTERN = re.compile(r'[\W_\d]+')
+
+def _grams(text: str, prefix: str, sizes: Tuple[int, ...]) -> List[str]:
+    if len(text) < min(sizes):
+        return [prefix + text] if text else []
+    return [prefix + text[i:i + size] for size in sizes for i in range(len(text) - size + 1)]
+
+def features(title: str, author_info: str) -> Dict[int, float]:
+    """书名和出版信息的哈希特征及词频"""
+    title = NON_WORD_PATTERN.sub('', (title or '').lower())
+    author_info = AUTHOR_NOISE_PATTERN.sub('', (author_info or '').lower())
+    counts: Dict[int, float] = {}
+    for weight, grams in ((1.0, _grams(title, 't:', TITLE_NGRAMS)),
+                          (AUTHOR_WEIGHT, _grams(author_info, 'a:', AUTHOR_NGRAMS))):
+        for gram in grams:
+            index = zlib.crc32(gram.encode('utf-8')) % DIMENSION
+            counts[index] = counts.get(index, 0.0) + weight
+    return counts
+
+class _Segment:
+    """一个索引分段：倒排列表 + 行号到图书 id 的映射，文件以内存映射方式打开"""
+
+    FILES = ('ids', 'indptr', 'docs', 'weights')
+
+    def __init__(self, path: Path):
+        self.path = path
+        for name in self.FILES:
+            setattr(self, name, np.load(path / f'{name}.npy', mmap_mode='r'))
+
+    @classmethod
+    def write(cls, path: Path, ids: np.ndarray, rows: np.ndarray, feats: np.ndarray,
+              weights: np.ndarray) -> '_Segment':
+        """把 (行号, 特征, 权重) 三元组按特征排序后写成倒排形式"""
+        path.mkdir(parents=True, exist_ok=True)
+        order = np.argsort(feats, kind='stable')
+        indptr = np.zeros(DIMENSION + 1, dtype=np.int64)
+        np.cumsum(np.bincount(feats, minlength=DIMENSION), out=indptr[1:])
+        np.save(path / 'ids.npy', ids.astype(np.int64))
+        np.save(path / 'indptr.npy', indptr)
+        np.save(path / 'docs.npy', rows[order].astype(np.int32))
+        np.save(path / 'weights.npy', weights[order].astype(np.float32))
+        return cls(path)
+
+    def scores(self, query: Dict[int, float]) -> np.ndarray:
+        """该分段内每本图书与查询向量的余弦相似度"""
+        docs, weights = [], []
+        for feature, query_weight in query.items():
+            start, end = self.indptr[feature], self.indptr[feature + 1]
+            if end > start:
+                docs.append(self.docs[start:end])
+                weights.append(self.weights[start:end] * query_weight)
+        if not docs:
+            return np.zeros(len(self.ids), dtype=np.float64)
+        return np.bincount(np.concatenate(docs), np.concatenate(weights), minlength=len(self.ids))
+
+class SimilarityIndex:
+    """图书相似度索引"""
+
+    def __init__(self, db_manager, index_dir: Path = None):
+        self.db_manager = db_manager
+        self.index_dir = Path(index_dir or Settings.SIMILARITY_INDEX_DIR)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self.meta = None
+        self.idf = None
+        self.segments: List[_Segment] = []
+        self._load()
+
+    def _load(self):
+        meta_path = self.index_dir / 'meta.json'
+        if not meta_path.exists():
+            return
+        self.meta = json.loads(meta_path.read_text())
+        # 旧版本的索引文件直接放在 index_dir 下，没有 generation
+        self.idf = np.load(self.index_dir / self.meta.get('generation', '') / 'idf.npy', mmap_mode='r')
+        self.segments = [_Segment(self.index_dir / name) for name in self.meta['segments']]
+
+    def _save_meta(self):
+        tmp_path = self.index_dir / 'meta.json.tmp'
+        tmp_path.write_text(json.dumps(self.meta))
+        tmp_path.replace(self.index_dir / 'meta.json')
+
+    def _remove_stale(self, generation: str):
+        """删除当前版本以外的索引文件（其他进程可能仍映射着，删除失败时留到下次）"""
+        for path in self.index_dir.iterdir():
+            if path.name in (generation, 'meta.json'):
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _vectors(self, min_id: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        计算 id 大于 min_id 的图书的词频三元组
+
+        Returns:
+            (图书 id, 行号, 特征, 词频)
+        """
+        parts = []
+        doc_count = 0
+        for _, chunk in self.db_manager.iter_book_chunks(
+                query='SELECT id, title, author FROM books WHERE id > ? ORDER BY id', params=(min_id,)):
+            # 每批先在列表中收集，再转换为 numpy 数组，避免为全表保存 Python 对象
+            rows, feats, counts = [], [], []
+            for row, (_, title, author) in enumerate(chunk, doc_count):
+                for feature, count in features(title, author).items():
+                    rows.append(row)
+                    feats.append(feature)
+                    counts.append(count)
+            parts.append((np.array([book[0] for book in chunk], dtype=np.int64), np.array(rows, dtype=np.int64),
+                          np.array(feats, dtype=np.int64), np.array(counts, dtype=np.float64)))
+            doc_count += len(chunk)
+        if not parts:
+            return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                    np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64))
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+    @staticmethod
+    def _normalize(rows: np.ndarray, weights: np.ndarray, doc_count: int) -> np.ndarray:
+        norms = np.sqrt(np.bincount(rows, weights * weights, minlength=doc_count))
+        norms[norms == 0] = 1.0
+        return weights / norms[rows]
+
+    @Metrics.timed('similarity.build')
+    def build(self) -> int:
+        """
+        重新构建整个索引
+
+        Returns:
+            int: 索引中的图书数
+        """
+        ids, rows, feats, counts = self._vectors()
+        doc_freq = np.bincount(feats, minlength=DIMENSION)
+        idf = np.log((1 + len(ids)) / (1 + doc_freq)) + 1.0
+        weights = self._normalize(rows, counts * idf[feats], len(ids))
+
+        # 先在新的子目录中写完整份索引，正在使用的旧索引保持不变
+        generation = f"gen-{time.time_ns()}"
+        _Segment.write(self.index_dir / generation / 'seg-0', ids, rows, feats, weights)
+        np.save(self.index_dir / generation / 'idf.npy', idf.astype(np.float32))
+
+        with self._lock:
+            self.meta = {
+                'dimension': DIMENSION,
+                'generation': generation,
+                'segments': [f'{generation}/seg-0'],
+                'base_count': len(ids),
+                'doc_count': len(ids),
+                'max_id': int(ids.max()) if len(ids) else 0
+            }
+            self._save_meta()
+            self._load()
+            self._remove_stale(generation)
+        self.logger.info(f"相似图书索引已重建（{len(ids)} 本图书）")
+        return len(ids)
+
+    @Metrics.timed('similarity.update')
+    def update(self) -> int:
+        """
+        把上次建索引之后入库的图书追加为新分段，增量过大时整体重建
+
+        Returns:
+            int: 新加入索引的图书数
+        """
+        if self.meta is None:
+            return self.build()
+        ids, rows, feats, counts = self._vectors(self.meta['max_id'])
+        if not len(ids):
+            return 0
+        if self.meta['doc_count'] + len(ids) - self.meta['base_count'] > \
+                self.meta['base_count'] * Settings.SIMILARITY_REBUILD_RATIO:
+            self.build()
+            return len(ids)
+
+        weights = self._normalize(rows, counts * np.asarray(self.idf)[feats], len(ids))
+        with self._lock:
+            name = f"{self.meta.get('generation', '.')}/seg-{len(self.meta['segments'])}"
+            self.segments.append(_Segment.write(self.index_dir / name, ids, rows, feats, weights))
+            self.meta['segments'].append(name)
+            self.meta['doc_count'] += len(ids)
+            self.meta['max_id'] = int(ids.max())
+            self._save_meta()
+        return len(ids)
+
+    def _query_vector(self, title: str, author_info: str = None) -> Dict[int, float]:
+        counts = features(title, author_info)
+        weights = {feature: count * float(self.idf[feature]) for feature, count in counts.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {feature: w / norm for feature, w in weights.items()}
+
+    def _top_k(self, query: Dict[int, float], k: int, exclude: int = None) -> List[Tuple[int, float]]:
+        candidates = []
+        for segment in self.segments:
+            scores = segment.scores(query)
+            if exclude is not None:
+                scores[np.asarray(segment.ids) == exclude] = 0.0
+            count = min(k, len(scores))
+            if not count:
+                continue
+            top = np.argpartition(-scores, count - 1)[:count]
+            candidates.extend((int(segment.ids[i]), float(scores[i])) for i in top if scores[i] > 0)
+        return sorted(candidates, key=lambda item: (-item[1], item[0]))[:k]
+
+    def _with_books(self, matches: List[Tuple[int, float]]) -> List[Dict]:
+        """补充书名、作者和价格"""
+        if not matches:
+            return []
+        with self.db_manager.reader() as conn:
+            placeholders = ', '.join('?' for _ in matches)
+            books = {row[0]: row for row in conn.execute(
+                f'SELECT id, title, author, price, url FROM books WHERE id IN ({placeholders})',
+                [book_id for book_id, _ in matches]
+            )}
+        return [
+            {'id': book_id, 'title': books[book_id][1], 'author': books[book_id][2],
+             'price': books[book_id][3], 'url': books[book_id][4], 'score': score}
+            for book_id, score in matches if book_id in books
+        ]
+
+    @Metrics.timed('similarity.query')
+    def search(self, text: str, k: int = 10) -> List[Dict]:
+        """
+        查找与一段文字（书名，可附带作者/出版社）最相似的图书
+
+        Args:
+            text: 查询文字
+            k: 返回的图书数
+
+        Returns:
+            List[Dict]: 按相似度从高到低排列的图书，含 id、title、author、price、url、score
+        """
+        if self.meta is None:
+            return []
+        return self._with_books(self._top_k(self._query_vector(text, text), k))
+
+    @Metrics.timed('similarity.query')
+    def similar_to(self, book_id: int, k: int = 10) -> List[Dict]:
+        """查找与指定图书最相似的其他图书"""
+        if self.meta is None:
+            return []
+        with self.db_manager.reader() as conn:
+            row = conn.execute('SELECT title, author FROM books WHERE id = ?', (book_id,)).fetchone()
+        if row is None:
+            return []
+        return self._with_books(self._top_k(self._query_vector(*row), k, exclude=book_id))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="相似图书索引")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('build', help="重新构建索引")
+    subparsers.add_parser('update', help="把新入库的图书加入索引")
+    query_parser = subparsers.add_parser('query', help="查找相似图书")
+    query_parser.add_argument('text', help="书名或图书 id")
+    query_parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    from src.database.db_manager import DatabaseManager
+    from src.utils.logger import Logger
+
+    Logger.setup_logging()
+    index = SimilarityIndex(DatabaseManager.instance())
+    if args.command == 'build':
+        print(f"索引已重建，共 {index.build()} 本图书")
+    elif args.command == 'update':
+        print(f"新加入索引 {index.update()} 本图书")
+    else:
+        index.update()
+        if args.text.isdigit():
+            results = index.similar_to(int(args.text), args.top)
+        else:
+            results = index.search(args.text, args.top)
+        for book in results:
+            print(f"{book['score']:.3f}  [{book['id']}] {book['title']} / {book['price']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,333 @@
+"""
+端到端基准测试
+
+用法（在项目根目录执行）：
+    python -m src.benchmark.runner --scales 10k 100k
+    python -m src.benchmark.runner --scales 10k --compare data/benchmarks/旧结果.json
+    python -m src.benchmark.runner --scales 1m 10m --stages analysis
+
+结果以JSON保存到 data/benchmarks/，可用 --compare 与历史结果对比。
+"""
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict
+from src.config.settings import Settings
+from src.benchmark.synthetic_data import SyntheticDataGenerator
+
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000
+}
+
+STAGES = ('parse', 'decode', 'analysis', 'exports', 'charts')
+
+# 每页图书数量与当当网页面一致
+BANG_PAGE_SIZE = 20
+SEARCH_PAGE_SIZE = 60
+
+ANALYSIS_METHODS = (
+    'get_basic_stats', 'analyze_price_trends', 'analyze_publishers', 'analyze_categories',
+    'analyze_keywords', 'analyze_price_segments', 'generate_summary_report'
+)
+
+class BenchmarkRunner:
+    """在临时数据库上运行各阶段基准测试"""
+
+    def __init__(self, work_dir: Path, seed: int = 42, max_parse_pages: int = 2000, stages=STAGES):
+        self.work_dir = Path(work_dir)
+        self.seed = seed
+        self.max_parse_pages = max_parse_pages
+        self.stages = set(stages)
+
+    @staticmethod
+    def _measure(func: Callable, items: int, excluded: Callable[[], float] = None) -> Dict:
+        """
+        执行一次并记录耗时和吞吐量
+
+        Args:
+            func: 被测函数
+            items: 处理的条目数
+            excluded: 执行结束后调用，返回需要从耗时中扣除的秒数（如测试数据生成时间）
+        """
+        start = time.perf_counter()
+        try:
+            func()
+            error = None
+        except Exception as e:
+            error = str(e)
+        seconds = time.perf_counter() - start
+        if excluded is not None:
+            seconds = max(seconds - excluded(), 0.0)
+        result = {
+            'seconds': round(seconds, 6),
+            'items': items,
+            'items_per_second': round(items / seconds, 2) if seconds > 0 else None
+        }
+        if error:
+            result['error'] = error
+        return result
+
+    def _bench_parse(self, rows: int, results: Dict):
+        """页面解析吞吐量"""
+        from src.crawler.book_crawler import BookCrawler
+
+        crawler = BookCrawler()
+        generator = SyntheticDataGenerator(self.seed)
+        for name, page_size, render, search in (
+            ('parse.bang_list', BANG_PAGE_SIZE, generator.bang_list_html, False),
+            ('parse.search', SEARCH_PAGE_SIZE, generator.search_html, True)
+        ):
+            page_count = max(1, min(rows // page_size, self.max_parse_pages))
+            pages = [render(generator.books(page_size)) for _ in range(page_count)]
+            results[name] = self._measure(
+                lambda: [crawler.parse_page(html, search) for html in pages],
+                page_count * page_size
+            )
+            results[name]['pages'] = page_count
+
+    def _bench_decode(self, rows: int, results: Dict):
+        """GBK页面解码：requests 编码探测（response.text）与按声明编码直接解码的对比"""
+        import requests
+        from src.crawler.encoding import PageDecoder
+
+        generator = SyntheticDataGenerator(self.seed)
+        page_count = max(1, min(rows // BANG_PAGE_SIZE, self.max_parse_pages))
+        url = 'http://bang.dangdang.com/books/bestsellers/01.00.00.00.00.00-month-2023-0-1-1'
+        bodies = [
+            generator.bang_list_html(generator.books(BANG_PAGE_SIZE)).encode('gb18030')
+            for _ in range(page_count)
+        ]
+
+        def sniffed_text():
+            # 响应头未声明 charset 时 requests 会对整个页面做统计式编码探测
+            for body in bodies:
+                response = requests.Response()
+                response._content = body
+                response.encoding = None
+                response.text
+
+        def declared_decode():
+            decoder = PageDecoder()
+            for body in bodies:
+                decoder.decode(url, body, 'text/html')
+
+        for name, func in (('decode.response_text', sniffed_text),
+                           ('decode.page_decoder', declared_decode)):
+            results[name] = self._measure(func, page_count)
+            results[name]['seconds_per_page'] = round(results[name]['seconds'] / page_count, 6)
+
+    def _bench_database(self, rows: int, scale_dir: Path, results: Dict):
+        """入库、分析、导出和图表渲染"""
+        from src.database.db_manager import DatabaseManager
+        from src.analysis.book_analyzer import BookAnalyzer
+
+        db_manager = DatabaseManager(db_path=scale_dir / 'books.db')
+        generator = SyntheticDataGenerator(self.seed)
+
+        # 入库：逐批生成数据，避免整份数据常驻内存，生成耗时从结果中扣除
+        generation = [0.0]
+
+        def ingest():
+            batches = generator.iter_batches(rows)
+            while True:
+                start = time.perf_counter()
+                batch = next(batches, None)
+                generation[0] += time.perf_counter() - start
+                if batch is None:
+                    break
+                db_manager.save_books(batch)
+
+        results['ingest.save_books'] = self._measure(ingest, rows, excluded=lambda: generation[0])
+
+        analyzer = BookAnalyzer(db_manager)
+        # 关闭结果缓存，否则汇总报告会直接复用前面各项分析的结果
+        analyzer.result_cache = None
+        if 'analysis' in self.stages:
+            for method in ANALYSIS_METHODS:
+                results[f'analysis.{method}'] = self._measure(getattr(analyzer, method), rows)
+            self._bench_parallel(db_manager, rows, results)
+            self._bench_duckdb(db_manager, rows, scale_dir, results)
+
+        if 'exports' in self.stages:
+            self._bench_exports(db_manager, analyzer, rows, scale_dir, results)
+        if 'charts' in self.stages:
+            self._bench_charts(analyzer, rows, scale_dir, results)
+        db_manager.pool.close()
+
+    def _bench_parallel(self, db_manager, rows: int, results: Dict):
+        """多进程分块分析"""
+        from src.analysis.parallel_analyzer import ParallelAnalyzer
+
+        analyzer = ParallelAnalyzer(db_manager)
+        analyzer.result_cache = None
+        for method in ANALYSIS_METHODS:
+            results[f'analysis_parallel.{method}'] = self._measure(getattr(analyzer, method), rows)
+        results['analysis_parallel.get_basic_stats']['workers'] = analyzer.workers
+
+    def _bench_duckdb(self, db_manager, rows: int, scale_dir: Path, results: Dict):
+        """DuckDB 分析引擎（未安装 duckdb 时跳过）"""
+        from src.analysis.duckdb_engine import DuckDBAnalyzer, duckdb
+
+        if duckdb is None:
+            return
+        holder = {}
+        # 首次创建时挂载数据库或生成 Parquet 镜像
+        results['analysis_duckdb.setup'] = self._measure(
+            lambda: holder.setdefault('analyzer', DuckDBAnalyzer(db_manager, scale_dir / 'analytics')), rows
+        )
+        analyzer = holder.get('analyzer')
+        if analyzer is None:
+            return
+        analyzer.result_cache = None
+        results['analysis_duckdb.setup']['source'] = analyzer.source
+        for method in ANALYSIS_METHODS:
+            results[f'analysis_duckdb.{method}'] = self._measure(getattr(analyzer, method), rows)
+
+    def _bench_exports(self, db_manager, analyzer, rows: int, scale_dir: Path, results: Dict):
+        """各导出格式"""
+        from src.export.stream_exporter import StreamingExporter
+        from src.export.excel_exporter import ExcelExporter
+        from src.export.columnar_exporter import ColumnarExporter, pa
+        from src.export.report_exporter import ReportExporter
+
+        export_dir = scale_dir / 'exports'
+        export_dir.mkdir(exist_ok=True)
+        streaming = StreamingExporter(db_manager)
+        results['export.csv'] = self._measure(lambda: streaming.export_csv(export_dir / 'books.csv'), rows)
+        results['export.json'] = self._measure(lambda: streaming.export_json(export_dir / 'books.json'), rows)
+        results['export.jsonl'] = self._measure(lambda: streaming.export_jsonl(export_dir / 'books.jsonl'), rows)
+
+        excel = ExcelExporter(db_manager)
+        results['export.excel'] = self._measure(lambda: excel.export_excel(export_dir / 'books.xlsx'), rows)
+
+        if pa is not None:
+            columnar = ColumnarExporter(db_manager)
+            results['export.parquet'] = self._measure(lambda: columnar.export_parquet(export_dir / 'books.parquet'), rows)
+            results['export.feather'] = self._measure(lambda: columnar.export_feather(export_dir / 'books.feather'), rows)
+
+        report = analyzer.generate_summary_report()
+        reporter = ReportExporter(db_manager)
+        results['export.report'] = self._measure(lambda: reporter.export_report(export_dir / 'report.html', report), rows)
+
+    def _bench_charts(self, analyzer, rows: int, scale_dir: Path, results: Dict):
+        """图表渲染"""
+        from src.visualization.data_visualizer import DataVisualizer
+
+        visualizer = DataVisualizer()
+        visualizer.save_dir = scale_dir
+        category_stats = analyzer.analyze_categories()
+        distribution = dict(zip(category_stats['category'], category_stats['book_count']))
+        results['chart.category_distribution'] = self._measure(
+            lambda: visualizer.plot_category_distribution(distribution), rows
+        )
+
+    def run(self, scale_names) -> Dict:
+        """运行指定规模的全部基准测试"""
+        all_results = {}
+        for scale_name in scale_names:
+            rows = SCALES[scale_name]
+            scale_dir = self.work_dir / scale_name
+            scale_dir.mkdir(parents=True, exist_ok=True)
+            results = {}
+            if 'parse' in self.stages:
+                print(f"[{scale_name}] 解析基准...", flush=True)
+                self._bench_parse(rows, results)
+            if 'decode' in self.stages:
+                self._bench_decode(rows, results)
+            if self.stages & {'analysis', 'exports', 'charts'}:
+                print(f"[{scale_name}] 入库/分析/导出/图表基准...", flush=True)
+                self._bench_database(rows, scale_dir, results)
+            all_results[scale_name] = results
+        return all_results
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Settings.PROJECT_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return 'unknown'
+
+def compare_results(old: Dict, new: Dict, threshold: float = 0.1) -> int:
+    """
+    对比两次基准结果并打印，耗时增加超过阈值的条目标记为回归
+
+    Returns:
+        int: 回归条目数量
+    """
+    regressions = 0
+    for scale, results in new['results'].items():
+        old_results = old.get('results', {}).get(scale, {})
+        for name, result in sorted(results.items()):
+            if name not in old_results:
+                continue
+            before = old_results[name]['seconds']
+            after = result['seconds']
+            ratio = after / before if before else float('inf')
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = '  <-- 回归'
+                regressions += 1
+            print(f"{scale:>5} {name:<40} {before:>10.4f}s -> {after:>10.4f}s  x{ratio:.2f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="图书数据系统基准测试")
+    parser.add_argument('--scales', nargs='+', default=['10k'], choices=list(SCALES),
+                        help="数据规模")
+    parser.add_argument('--stages', nargs='+', default=list(STAGES), choices=STAGES,
+                        help="要运行的基准阶段（analysis/exports/charts 都包含入库）")
+    parser.add_argument('--seed', type=int, default=42, help="合成数据随机种子")
+    parser.add_argument('--max-parse-pages', type=int, default=2000,
+                        help="解析基准最多生成的页面数")
+    parser.add_argument('--output', help="结果文件路径，默认 data/benchmarks/benchmark_<时间>.json")
+    parser.add_argument('--compare', help="与之对比的历史结果文件")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="耗时增加超过该比例视为回归")
+    parser.add_argument('--keep-data', action='store_true', help="保留临时数据库和导出文件")
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix='book_bench_'))
+    results = BenchmarkRunner(work_dir, args.seed, args.max_parse_pages, args.stages).run(args.scales)
+
+    payload = {
+        'app_version': Settings.APP_VERSION,
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'results': results
+    }
+
+    output = Path(args.output) if args.output else (
+        Settings.DATA_DIR / 'benchmarks' / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"基准结果已保存至: {output}")
+
+    if not args.keep_data:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    else:
+        print(f"临时数据保留在: {work_dir}")
+
+    if args.compare:
+        old = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        if compare_results(old, payload, args.threshold):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
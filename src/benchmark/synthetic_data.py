@@ -0,0 +1,111 @@
+import random
+from datetime import datetime, timedelta
+from html import escape
+from typing import Dict, Iterator, List
+
+# 组合生成书名、作者和出版社所用的词表
+TITLE_PREFIXES = ['新编', '图解', '深入理解', '趣味', '经典', '实用', '全彩', '精装', '少儿', '零基础学']
+TITLE_SUBJECTS = [
+    '小说', '散文集', '中国历史', '世界经济', '投资理财', '管理学', 'Python编程', '人工智能',
+    '儿童绘本', '养生之道', '家常美食', '旅游指南', '西方哲学', '音乐鉴赏', '素描基础',
+    '高考数学', '英语词汇', '心理学', '唐诗三百首', '红楼梦'
+]
+TITLE_SUFFIXES = ['', '（第2版）', '（全3册）', '（精装典藏版）', '入门与实践', '：从入门到精通', '（附赠音频）', '']
+SURNAMES = ['王', '李', '张', '刘', '陈', '杨', '赵', '黄', '周', '吴', '徐', '孙', '马', '朱', '胡']
+GIVEN_NAMES = ['伟', '芳', '娜', '敏', '静', '强', '磊', '洋', '艳', '勇', '军', '杰', '涛', '明', '超']
+PUBLISHERS = [
+    '人民文学出版社', '中信出版社', '机械工业出版社', '电子工业出版社', '清华大学出版社',
+    '北京大学出版社', '商务印书馆', '中华书局', '上海译文出版社', '接力出版社',
+    '人民邮电出版社', '长江文艺出版社', '译林出版社', '新星出版社', '化学工业出版社'
+]
+
+class SyntheticDataGenerator:
+    """生成与当当网页面结构一致的合成数据，随机种子固定以保证结果可复现"""
+
+    def __init__(self, seed: int = 42):
+        self.random = random.Random(seed)
+        self.base_time = datetime(2024, 1, 1)
+        self.sequence = 0
+
+    def _title(self) -> str:
+        r = self.random
+        return f"{r.choice(TITLE_PREFIXES)}{r.choice(TITLE_SUBJECTS)}{r.choice(TITLE_SUFFIXES)}"
+
+    def _author(self) -> str:
+        r = self.random
+        return f"{r.choice(SURNAMES)}{r.choice(GIVEN_NAMES)}{r.choice(GIVEN_NAMES) if r.random() < 0.5 else ''}"
+
+    def book(self) -> Dict:
+        """生成一条图书记录，字段与 BookCrawler 的解析结果一致"""
+        r = self.random
+        self.sequence += 1
+        publish_date = (self.base_time - timedelta(days=r.randint(0, 3650))).strftime('%Y-%m-%d')
+        crawl_time = self.base_time + timedelta(minutes=self.sequence)
+        return {
+            'title': self._title(),
+            'author': f"{self._author()} 著 /{publish_date}/{r.choice(PUBLISHERS)}",
+            'price': f"¥{r.lognormvariate(3.6, 0.6):.2f}",
+            'rating': f"{r.randint(10, 99999)}条评论{r.randint(80, 100)}%推荐" if r.random() < 0.9 else "暂无评分",
+            'url': f"http://product.dangdang.com/{20000000 + self.sequence}.html",
+            'platform': '当当网',
+            'crawl_time': crawl_time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def books(self, count: int) -> List[Dict]:
+        """生成指定数量的图书记录"""
+        return [self.book() for _ in range(count)]
+
+    def iter_batches(self, count: int, batch_size: int = 10000) -> Iterator[List[Dict]]:
+        """分批生成图书记录，避免一次性占用大量内存"""
+        remaining = count
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            yield self.books(size)
+            remaining -= size
+
+    def bang_list_html(self, books: List[Dict]) -> str:
+        """生成畅销榜页面（.bang_list li）"""
+        items = []
+        for index, book in enumerate(books, 1):
+            items.append(f"""
+            <li>
+                <div class="list_num">{index}.</div>
+                <div class="pic"><a href="{escape(book['url'])}" target="_blank"><img src="x.jpg"></a></div>
+                <div class="name"><a href="{escape(book['url'])}" title="{escape(book['title'])}">{escape(book['title'])}</a></div>
+                <div class="star"><span class="level"><span style="width: 96%;"></span></span><a href="#">{escape(book['rating'])}</a></div>
+                <div class="publisher_info">{escape(book['author'])}</div>
+                <div class="price"><p><span class="price_n">{escape(book['price'])}</span><span class="price_r">¥99.00</span></p></div>
+            </li>""")
+        return (
+            '<!DOCTYPE html><html><head><meta http-equiv="Content-Type" content="text/html; charset=GB2312">'
+            '<title>图书畅销榜</title></head><body><div class="bang_list_box"><ul class="bang_list clearfix bang_list_mode">'
+            + ''.join(items) +
+            '</ul></div></body></html>'
+        )
+
+    def search_html(self, books: List[Dict]) -> str:
+        """生成搜索结果页面（#search_nature_rg ul.bigimg li）"""
+        items = []
+        for book in books:
+            author, _, rest = book['author'].partition(' /')
+            items.append(f"""
+            <li>
+                <a class="pic" href="{escape(book['url'])}"><img src="x.jpg"></a>
+                <p class="name"><a href="{escape(book['url'])}" title="{escape(book['title'])}">{escape(book['title'])}</a></p>
+                <p class="price"><span class="search_now_price">{escape(book['price'])}</span></p>
+                <p class="search_book_author"><span>{escape(author)}</span><span>/{escape(rest)}</span></p>
+            </li>""")
+        return (
+            '<!DOCTYPE html><html><head><meta http-equiv="Content-Type" content="text/html; charset=GB2312">'
+            '<title>搜索结果</title></head><body><div id="search_nature_rg"><ul class="bigimg" id="component_59">'
+            + ''.join(items) +
+            '</ul></div></body></html>'
+        )
+
+    def populate_database(self, db_manager, count: int, batch_size: int = 10000) -> int:
+        """向数据库写入指定数量的合成图书记录"""
+        inserted = 0
+        for batch in self.iter_batches(count, batch_size):
+            db_manager.save_books(batch)
+            inserted += len(batch)
+        return inserted
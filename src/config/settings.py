@@ -16,4 +16,70 @@ class Settings:
     # 日志配置
     LOG_FILE = LOGS_DIR / "app.log"
     LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    LOG_LEVEL = "INFO" 
\ No newline at end of file
+    LOG_LEVEL = "INFO"
+    CRAWLER_LOG_FILE = LOGS_DIR / "crawler.log"
+    LOG_MAX_BYTES = 10 * 1024 * 1024  # 单个日志文件上限，超过后滚动
+    LOG_BACKUP_COUNT = 5
+
+    # 性能指标配置
+    METRICS_FILE = LOGS_DIR / "metrics.prom"  # 扩展名为 .json 时输出JSON
+    PROFILE_DIR = LOGS_DIR / "profile"
+
+    # 页面存档配置
+    ARCHIVE_ENABLED = True
+    ARCHIVE_DIR = DATA_DIR / "archive"
+    ARCHIVE_SEGMENT_BYTES = 256 * 1024 * 1024  # 单个存档分段文件上限
+
+    # URL调度队列配置
+    FRONTIER_DB = DATA_DIR / "frontier.db"
+    FRONTIER_BLOOM_FILE = DATA_DIR / "frontier.bloom"
+    FRONTIER_CAPACITY = 10_000_000   # 布隆过滤器按此URL数量分配位数组
+    FRONTIER_ERROR_RATE = 0.001      # 布隆过滤器误判率，误判时再查 SQLite 确认
+    FRONTIER_HOST_DELAY = 1.0        # 同一站点两次抓取的最小间隔（秒）
+    FRONTIER_LEASE_TIMEOUT = 300.0   # 出队URL的租约时长（秒），超时未确认则重新出队
+    FRONTIER_MAX_ATTEMPTS = 3        # 同一URL最多抓取失败的次数，超过后移出队列
+
+    # 代理池配置
+    PROXY_LIST = []                            # 代理地址，如 http://用户名:密码@主机:端口
+    PROXY_FILE = DATA_DIR / "proxies.txt"      # 每行一个代理地址，存在时追加到 PROXY_LIST
+    PROXY_INCLUDE_DIRECT = True                # 本机直连也作为一个出口
+    PROXY_QUARANTINE_SECONDS = 60              # 首次隔离时长，连续隔离时翻倍
+    PROXY_MAX_QUARANTINE_SECONDS = 30 * 60     # 隔离时长上限
+    PROXY_MAX_TRIES = 3                        # 单个请求最多尝试的出口数
+
+    # 详情页补充配置
+    DETAIL_MAX_WORKERS = 4      # 同时抓取详情页的线程数
+    DETAIL_TTL_DAYS = 30        # 有效期内已补充过详情的图书不再抓取
+    DETAIL_REQUEST_DELAY = 0.5  # 每个线程两次请求之间的间隔（秒）
+
+    # 分布式采集配置
+    TASK_QUEUE_URL = f"sqlite:///{DATA_DIR / 'tasks.db'}"  # 多节点部署时使用 redis://主机:端口/库
+    TASK_LEASE_SECONDS = 120  # 任务租约时长，工作进程需在此期间内续租
+    TASK_MAX_ATTEMPTS = 3     # 任务最多尝试次数，超过后标记为失败
+
+    # 数据库配置
+    DB_READER_COUNT = 4  # 连接池中只读连接的数量
+    DB_STORAGE_LAYOUT = "legacy"  # 新建数据库的图书表存储方式：legacy（单表）/ normalized（维度表+整数外键，books 为兼容视图）
+
+    # 按月分区与数据保留配置
+    PARTITION_RETENTION_MONTHS = 6  # 保留原始数据的整月数（不含当月，最多 8），更早的月份按天汇总后移出
+    PARTITION_ARCHIVE = True  # 移出保留期的原始数据归档到 data/partitions/archive/，False 时直接删除
+
+    # 分析引擎配置
+    ANALYTICS_ENGINE = "auto"  # auto：安装了 duckdb 时使用 DuckDB，否则多进程分块分析；duckdb / parallel / pandas：强制指定
+    ANALYSIS_WORKERS = None  # 多进程分块分析的进程数，None 表示使用全部CPU核心
+    ANALYSIS_CHUNK_ROWS = 200000  # 多进程分块分析时每块的行数（按 id 区间划分）
+    ANALYSIS_CACHE_SIZE = 32  # 分析结果缓存的最大条目数，数据库有新写入时自动失效
+
+    # 相似图书索引配置
+    SIMILARITY_INDEX_DIR = DATA_DIR / "similarity"  # 索引文件目录
+    SIMILARITY_REBUILD_RATIO = 0.2  # 增量部分超过主索引图书数的该比例时整体重建（重新计算IDF）
+
+    # 近似重复图书聚类配置
+    DEDUP_NUM_PERM = 32  # MinHash 签名长度
+    DEDUP_BANDS = 8  # LSH 分段数（每段 DEDUP_NUM_PERM / DEDUP_BANDS 个值）
+    DEDUP_THRESHOLD = 0.6  # 估计的 Jaccard 相似度达到该值时视为同一作品
+
+    # 导出配置
+    EXPORT_CHUNK_SIZE = 5000  # 流式导出时每批读取的行数
+    REPORT_PAGE_SIZE = 1000   # HTML报告中每页原始数据的行数
@@ -1,39 +1,134 @@
-import requests
 from bs4 import BeautifulSoup
 import logging
 import time
 import random
-from typing import List, Dict
+from typing import Callable, Iterator, List, Dict
 from datetime import datetime, timedelta
 from pathlib import Path
 from src.utils.path_manager import PathManager
+from src.utils.logger import Logger, EventCounter
+from src.utils.metrics import Metrics
+from src.config.settings import Settings
+from src.crawler.page_archive import PageArchive
+from src.crawler.encoding import PageDecoder
+from src.crawler.proxy_pool import ProxyPool
+from src.crawler.url_frontier import URLFrontier
+from src.crawler.platforms.base import PlatformPlugin
+from src.crawler.platforms.registry import DEFAULT_PLATFORM, get_platform, platform_for_url
 
 class BookCrawler:
     def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
         self.logger = logging.getLogger(__name__)
         self.paths = PathManager.initialize_project_directories()
+        self.decoder = PageDecoder()
+        self.last_summary = {}
+        self.archive = PageArchive(Settings.ARCHIVE_DIR) if Settings.ARCHIVE_ENABLED else None
+        # 轮换代理和请求身份（User-Agent 等请求头）
+        self.proxy_pool = ProxyPool.from_settings()
         self.setup_logging()
         
     def setup_logging(self):
-        """配置日志"""
-        log_file = self.paths['logs_dir'] / 'crawler.log'
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler()
-            ]
-        )
+        """配置日志（全局只配置一次，写入由后台线程完成）"""
+        Logger.setup_logging()
 
     def _random_sleep(self):
         """随机延时，避免被反爬"""
         time.sleep(random.uniform(1, 3))
 
-    def crawl_dangdang(self, keywords: str = None, pages: int = 1, start_date: str = None, end_date: str = None) -> List[Dict]:
+    @staticmethod
+    def parse_page(html: str, search: bool, start_date: str = None, end_date: str = None,
+                   events: EventCounter = None, crawl_time: str = None,
+                   platform: PlatformPlugin = None) -> List[Dict]:
+        """
+        解析一页列表页面
+        
+        Args:
+            html: 页面HTML
+            search: 是否为搜索结果页（否则为排行榜页面）
+            start_date: 开始日期，格式：YYYY-MM-DD
+            end_date: 结束日期，格式：YYYY-MM-DD
+            events: 事件计数器，用于汇总每页的解析结果
+            crawl_time: 采集时间，默认为当前时间（重新解析存档时使用页面的抓取时间）
+            platform: 平台插件，默认为当当网
+            
+        Returns:
+            List[Dict]: 本页解析出的图书数据
+        """
+        events = events if events is not None else EventCounter()
+        platform = platform or get_platform(DEFAULT_PLATFORM)
+        books = []
+        
+        with Metrics.timer('parse'):
+            soup = BeautifulSoup(html, 'html.parser')
+            items = platform.select_items(soup, search)
+        
+        extract_start = time.perf_counter()
+        for item in items:
+            try:
+                book = platform.extract_item(item, search)
+                book['platform'] = platform.display_name
+                book['crawl_time'] = crawl_time or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                
+                # 检查是否在日期范围内
+                if start_date and end_date:
+                    book_time = datetime.strptime(book['crawl_time'], '%Y-%m-%d %H:%M:%S')
+                    start = datetime.strptime(start_date, '%Y-%m-%d')
+                    end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+                    
+                    if start <= book_time <= end:
+                        books.append(book)
+                        events.add("成功", book['title'])
+                    else:
+                        events.add("超出日期范围")
+                else:
+                    books.append(book)
+                    events.add("成功", book['title'])
+                
+            except Exception as e:
+                events.add("解析失败", str(e))
+                continue
+        
+        Metrics.observe('extract', time.perf_counter() - extract_start)
+        return books
+
+    def fetch_page(self, url: str, start_date: str = None, end_date: str = None, events: EventCounter = None,
+                   platform: PlatformPlugin = None, proxy_pool: ProxyPool = None) -> List[Dict]:
+        """
+        抓取、存档、解码并解析一个列表页面
+        
+        Args:
+            url: 列表页URL
+            start_date: 开始日期，格式：YYYY-MM-DD
+            end_date: 结束日期，格式：YYYY-MM-DD
+            events: 事件计数器
+            platform: 平台插件，默认按URL的域名确定
+            proxy_pool: 出口池，默认使用本爬虫的出口池
+            
+        Returns:
+            List[Dict]: 本页解析出的图书数据
+        """
+        platform = platform or platform_for_url(url) or get_platform(DEFAULT_PLATFORM)
+        with Metrics.timer('fetch'):
+            response = (proxy_pool or self.proxy_pool).get(url)
+        Metrics.inc('pages_fetched_total', stage=platform.name)
+        Metrics.inc('bytes_fetched_total', len(response.content))
+        
+        # 保存原始页面，便于日后离线重新解析
+        if self.archive is not None:
+            self.archive.append(url, response.content, response.headers.get('Content-Type', ''))
+        
+        # 直接按声明的编码解码原始字节，不使用 response.text 的编码探测
+        html = self.decoder.decode(url, response.content, response.headers.get('Content-Type'))
+        page_books = self.parse_page(html, platform.is_search(url), start_date, end_date, events,
+                                     platform=platform)
+        
+        if events is not None:
+            Metrics.inc('books_parsed_total', events.counts['成功'])
+            Metrics.inc('parse_errors_total', events.counts['解析失败'])
+        return page_books
+
+    def crawl_dangdang(self, keywords: str = None, pages: int = 1, start_date: str = None, end_date: str = None,
+                       change_detector: Callable[[List[Dict]], Dict[str, List[Dict]]] = None) -> List[Dict]:
         """
         爬取当当网图书数据
         
@@ -42,73 +137,54 @@ class BookCrawler:
             pages: 爬取页数
             start_date: 开始日期，格式：YYYY-MM-DD
             end_date: 结束日期，格式：YYYY-MM-DD
+            change_detector: 增量采集时使用，把一页图书分为 new/changed/unchanged 三类
+                （如 PriceHistoryStore.classify）；传入后只返回新书和价格变化的图书，
+                并在某页全部为已知且未变化的图书时停止翻页
             
         Returns:
-            List[Dict]: 图书数据列表
+            List[Dict]: 图书数据列表，本次运行的统计信息保存在 self.last_summary
         """
         books = []
-        # 如果有关键词，使用搜索URL，否则使用畅销榜URL
-        if keywords:
-            base_url = "http://search.dangdang.com/"
-        else:
-            base_url = "http://bang.dangdang.com/books/bestsellers"
-        
+        events = EventCounter()
+        summary = {
+            'incremental': change_detector is not None,
+            'pages_requested': pages,
+            'pages_fetched': 0,
+            'pages_saved': 0,
+            'new_books': 0,
+            'changed_books': 0,
+            'unchanged_books': 0,
+            'stopped_early': False
+        }
+        self.last_summary = summary
+        platform = get_platform('dangdang')
         try:
             for page in range(1, pages + 1):
                 self._random_sleep()
                 
-                if keywords:
-                    url = f"{base_url}?key={keywords}&act=input&page_index={page}"
-                else:
-                    url = f"{base_url}/01.00.00.00.00.00-month-2023-0-1-{page}"
-                    
-                response = requests.get(url, headers=self.headers)
-                soup = BeautifulSoup(response.text, 'html.parser')
+                # 如果有关键词，使用搜索URL，否则使用畅销榜URL
+                url = platform.search_url(keywords, page) if keywords else platform.ranking_url(page)
                 
-                # 根据不同页面使用不同的选择器
-                items = soup.select('.bang_list li' if not keywords else '#search_nature_rg ul.bigimg li')
+                page_books = self.fetch_page(url, start_date, end_date, events, platform)
+                summary['pages_fetched'] += 1
+                events.flush(self.logger, f"第{page}页解析结果")
                 
-                for item in items:
-                    try:
-                        if keywords:
-                            # 搜索页面的数据提取
-                            book = {
-                                'title': item.select_one('.name a').text.strip(),
-                                'author': item.select_one('.search_book_author span').text.strip(),
-                                'price': item.select_one('.search_now_price').text.strip(),
-                                'rating': "暂无评分",  # 搜索页面可能没有评分
-                                'url': item.select_one('.name a')['href'],
-                                'platform': '当当网',
-                                'crawl_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                            }
-                        else:
-                            # 畅销榜页面的数据提取
-                            book = {
-                                'title': item.select_one('.name a').text.strip(),
-                                'author': item.select_one('.publisher_info').text.strip(),
-                                'price': item.select_one('.price .price_n').text.strip(),
-                                'rating': item.select_one('.star').text.strip() if item.select_one('.star') else "暂无评分",
-                                'url': item.select_one('.name a')['href'],
-                                'platform': '当当网',
-                                'crawl_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                            }
-                        
-                        # 检查是否在日期范围内
-                        if start_date and end_date:
-                            book_time = datetime.strptime(book['crawl_time'], '%Y-%m-%d %H:%M:%S')
-                            start = datetime.strptime(start_date, '%Y-%m-%d')
-                            end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-                            
-                            if start <= book_time <= end:
-                                books.append(book)
-                                self.logger.info(f"成功爬取图书: {book['title']}")
-                        else:
-                            books.append(book)
-                            self.logger.info(f"成功爬取图书: {book['title']}")
-                        
-                    except Exception as e:
-                        self.logger.error(f"解析图书数据时出错: {str(e)}")
-                        continue
+                if change_detector is None:
+                    books.extend(page_books)
+                else:
+                    groups = change_detector(page_books)
+                    summary['new_books'] += len(groups['new'])
+                    summary['changed_books'] += len(groups['changed'])
+                    summary['unchanged_books'] += len(groups['unchanged'])
+                    books.extend(groups['new'])
+                    books.extend(groups['changed'])
+                    
+                    # 整页都是已知且价格未变的图书，说明后续页面也没有更新
+                    if page_books and not groups['new'] and not groups['changed']:
+                        summary['stopped_early'] = page < pages
+                        summary['pages_saved'] = pages - page
+                        self.logger.info(f"第{page}页没有新书或价格变化，停止翻页")
+                        break
                 
                 self.logger.info(f"已完成第{page}页数据爬取，当前获取{len(books)}条数据")
                 
@@ -116,4 +192,69 @@ class BookCrawler:
                 
         except Exception as e:
             self.logger.error(f"爬取过程中出现错误: {str(e)}")
-            return books
\ No newline at end of file
+            return books
+        
+        finally:
+            message = f"采集结束: 请求{summary['pages_requested']}页, 实际抓取{summary['pages_fetched']}页"
+            if summary['incremental']:
+                Metrics.inc('pages_saved_total', summary['pages_saved'])
+                message += (
+                    f", 节省{summary['pages_saved']}页, 新书{summary['new_books']}本, "
+                    f"价格变化{summary['changed_books']}本, 未变化{summary['unchanged_books']}本"
+                )
+            self.logger.info(message)
+
+    def crawl_urls(self, urls: List[str], should_continue: Callable[[], bool] = None) -> List[Dict]:
+        """
+        依次抓取给定页面（用于分布式采集任务），抓取失败时抛出异常
+        
+        Args:
+            urls: 列表页URL
+            should_continue: 每页抓取后调用，返回 False 时停止
+            
+        Returns:
+            List[Dict]: 图书数据列表
+        """
+        books = []
+        events = EventCounter()
+        for url in urls:
+            self._random_sleep()
+            books.extend(self.fetch_page(url, events=events))
+            events.flush(self.logger, f"{url} 解析结果")
+            if should_continue is not None and not should_continue():
+                break
+        return books
+
+    def crawl_frontier(self, frontier: URLFrontier, max_pages: int = None) -> Iterator[List[Dict]]:
+        """
+        按URL调度队列抓取（用于分类 × 时间窗口的大规模扫描）
+        
+        队列中的URL在加入时已经判重，每个URL只会被抓取一次；同一站点的抓取间隔由队列控制。
+        调用方处理完本页数据后URL才从队列删除，抓取失败的URL放回队列稍后重试。
+        
+        Args:
+            frontier: URL调度队列
+            max_pages: 本次最多抓取的页数，默认抓完整个队列
+            
+        Yields:
+            List[Dict]: 每个页面解析出的图书数据
+        """
+        events = EventCounter()
+        fetched = 0
+        while max_pages is None or fetched < max_pages:
+            item = frontier.pop()
+            if item is None:
+                break
+            url, _ = item
+            try:
+                page_books = self.fetch_page(url, events=events)
+            except Exception as e:
+                self.logger.error(f"抓取 {url} 失败: {str(e)}")
+                frontier.retry(url)
+                continue
+            finally:
+                fetched += 1
+            events.flush(self.logger, f"{url} 解析结果")
+            yield page_books
+            frontier.done(url)
+        self.logger.info(f"队列采集结束: 抓取{fetched}页, 队列剩余{frontier.pending()}页")
@@ -0,0 +1,201 @@
+"""
+商品详情页补充采集
+
+列表页只有书名、作者/出版社混合字符串、价格和评分；本模块抓取商品详情页，
+解析 ISBN、出版社、出版日期、页数和分类路径并写入 book_details 表。
+有效期（Settings.DETAIL_TTL_DAYS）内已补充过的图书会被跳过。
+
+命令行用法（在项目根目录执行）：
+    python -m src.crawler.detail_enricher [--limit N] [--workers N]
+"""
+import argparse
+import logging
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+import requests
+from bs4 import BeautifulSoup
+from src.config.settings import Settings
+from src.crawler.encoding import PageDecoder
+from src.crawler.page_archive import PageArchive
+from src.crawler.proxy_pool import ProxyPool
+from src.utils.metrics import Metrics
+
+_ISBN = re.compile(r'ISBN[：:\s]*([0-9Xx-]{10,17})')
+_PUBLISHER = re.compile(r'出版社[：:]\s*([^\s：:]+)')
+_PUBLISH_DATE = re.compile(r'出版时间[：:]\s*(\d{4})年(\d{1,2})月(?:(\d{1,2})日)?')
+_PAGE_COUNT = re.compile(r'页\s*数[：:]\s*(\d+)')
+
+class DetailEnricher:
+    """并发抓取商品详情页"""
+
+    def __init__(self, db_manager, max_workers: int = None, ttl_days: float = None,
+                 request_delay: float = None):
+        self.db_manager = db_manager
+        self.max_workers = max_workers or Settings.DETAIL_MAX_WORKERS
+        self.ttl_days = Settings.DETAIL_TTL_DAYS if ttl_days is None else ttl_days
+        self.request_delay = Settings.DETAIL_REQUEST_DELAY if request_delay is None else request_delay
+        self.logger = logging.getLogger(__name__)
+        self.decoder = PageDecoder()
+        self.archive = PageArchive(Settings.ARCHIVE_DIR) if Settings.ARCHIVE_ENABLED else None
+        self.proxy_pool = ProxyPool.from_settings()
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        """每个工作线程复用自己的连接"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    @staticmethod
+    def parse_detail(html: str) -> Dict:
+        """
+        解析商品详情页
+
+        Args:
+            html: 详情页HTML
+
+        Returns:
+            Dict: isbn、publisher、publish_date（YYYY-MM 或 YYYY-MM-DD）、page_count、
+                category_path（多个分类路径以 ; 分隔，层级以 > 分隔），未找到的字段为 None
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        info = soup.select_one('#product_info') or soup
+        key_list = soup.select_one('ul.key') or soup
+        text = f"{info.get_text(' ', strip=True)} {key_list.get_text(' ', strip=True)}"
+
+        publisher = None
+        publisher_tag = soup.select_one('[dd_name="出版社"] a')
+        if publisher_tag:
+            publisher = publisher_tag.get_text(strip=True)
+        else:
+            match = _PUBLISHER.search(text)
+            publisher = match.group(1) if match else None
+
+        publish_date = None
+        match = _PUBLISH_DATE.search(text)
+        if match:
+            year, month, day = match.groups()
+            publish_date = f"{year}-{int(month):02d}" + (f"-{int(day):02d}" if day else '')
+
+        isbn = None
+        match = _ISBN.search(text)
+        if match:
+            isbn = match.group(1).replace('-', '').upper()
+
+        match = _PAGE_COUNT.search(text)
+        page_count = int(match.group(1)) if match else None
+
+        paths = []
+        for path_tag in soup.select('#detail-category-path .lie'):
+            names = [a.get_text(strip=True) for a in path_tag.select('a')]
+            if names:
+                paths.append('>'.join(names))
+        if not paths:
+            names = [a.get_text(strip=True) for a in soup.select('#breadcrumb a')]
+            if names:
+                paths.append('>'.join(names))
+
+        return {
+            'isbn': isbn,
+            'publisher': publisher,
+            'publish_date': publish_date,
+            'page_count': page_count,
+            'category_path': ';'.join(paths) or None
+        }
+
+    def fetch_detail(self, url: str) -> Optional[Dict]:
+        """抓取并解析单个详情页，失败时返回 None"""
+        try:
+            with Metrics.timer('detail.fetch'):
+                response = self.proxy_pool.get(url, session=self._session(), timeout=15)
+            response.raise_for_status()
+            Metrics.inc('detail_pages_fetched_total')
+            Metrics.inc('bytes_fetched_total', len(response.content))
+
+            if self.archive is not None:
+                self.archive.append(url, response.content, response.headers.get('Content-Type', ''))
+
+            html = self.decoder.decode(url, response.content, response.headers.get('Content-Type'))
+            with Metrics.timer('detail.parse'):
+                detail = self.parse_detail(html)
+            detail['url'] = url
+            return detail
+        except Exception as e:
+            Metrics.inc('detail_errors_total')
+            self.logger.warning(f"抓取详情页 {url} 失败: {str(e)}")
+            return None
+        finally:
+            if self.request_delay:
+                time.sleep(self.request_delay)
+
+    def enrich(self, urls: List[str] = None, limit: int = None,
+               progress_callback: Callable[[int], None] = None) -> Dict:
+        """
+        补充一批图书的详情
+
+        Args:
+            urls: 商品URL列表（其中有效期内已补充过的会被跳过），
+                默认为有效期外或从未补充过详情的全部图书
+            limit: 最多抓取的数量
+            progress_callback: 进度回调函数，参数为0-100的整数
+
+        Returns:
+            Dict: 统计信息（requested、enriched、failed）
+        """
+        if urls is None:
+            urls = self.db_manager.book_details.stale_urls(self.ttl_days, limit)
+        else:
+            urls = list(dict.fromkeys(urls))
+            fresh = self.db_manager.book_details.fresh_urls(urls, self.ttl_days)
+            urls = [url for url in urls if url not in fresh][:limit]
+
+        summary = {'requested': len(urls), 'enriched': 0, 'failed': 0}
+        if not urls:
+            return summary
+
+        pending = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.fetch_detail, url) for url in urls]
+            for done, future in enumerate(as_completed(futures), 1):
+                detail = future.result()
+                if detail is None:
+                    summary['failed'] += 1
+                else:
+                    pending.append(detail)
+                # 分批写入，中途停止时已抓取的详情不会丢失
+                if len(pending) >= 100:
+                    summary['enriched'] += self.db_manager.book_details.save(pending)
+                    pending = []
+                if progress_callback:
+                    progress_callback(int(done * 100 / len(urls)))
+        summary['enriched'] += self.db_manager.book_details.save(pending)
+
+        self.logger.info(
+            f"详情补充结束: 请求{summary['requested']}本, 成功{summary['enriched']}本, 失败{summary['failed']}本"
+        )
+        return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="补充商品详情信息")
+    parser.add_argument('--limit', type=int, default=None, help="本次最多抓取的详情页数量")
+    parser.add_argument('--workers', type=int, default=None, help="并发线程数")
+    parser.add_argument('--ttl-days', type=float, default=None, help="详情有效期（天）")
+    args = parser.parse_args(argv)
+
+    from src.database.db_manager import DatabaseManager
+    from src.utils.logger import Logger
+
+    Logger.setup_logging()
+    enricher = DetailEnricher(DatabaseManager.instance(), args.workers, args.ttl_days)
+    summary = enricher.enrich(limit=args.limit)
+    print(f"共补充 {summary['enriched']} 本图书详情，失败 {summary['failed']} 本")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
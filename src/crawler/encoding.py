@@ -0,0 +1,82 @@
+import re
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+# 只在页面开头的这段字节中查找 <meta> 声明的字符集
+META_SCAN_BYTES = 4096
+DEFAULT_ENCODING = 'gb18030'  # 当当网页面默认为GBK编码
+
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+
+# GB18030 兼容 GBK/GB2312，并能解码更多字符（如 ¥）
+_ENCODING_ALIASES = {
+    'gbk': 'gb18030',
+    'gb2312': 'gb18030',
+    'x-gbk': 'gb18030',
+    'utf8': 'utf-8'
+}
+
+def normalize_encoding(encoding: str) -> str:
+    """统一编码名称"""
+    encoding = encoding.strip().lower()
+    return _ENCODING_ALIASES.get(encoding, encoding)
+
+class PageDecoder:
+    """
+    直接对响应原始字节解码，避免 requests 的统计式编码探测和 BeautifulSoup 的二次解码
+
+    编码来源依次为：响应头中的 charset、页面开头 <meta> 标签、该站点上次声明的编码、默认编码。
+    页面自身的声明总是优先于站点缓存，缓存只用于没有任何声明的页面。
+    """
+
+    def __init__(self, default_encoding: str = DEFAULT_ENCODING):
+        self.default_encoding = default_encoding
+        self._host_encodings: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def charset_from_header(content_type: Optional[str]) -> Optional[str]:
+        """从 Content-Type 响应头中提取字符集"""
+        if not content_type:
+            return None
+        match = _HEADER_CHARSET.search(content_type)
+        return normalize_encoding(match.group(1)) if match else None
+
+    @staticmethod
+    def charset_from_meta(body: bytes) -> Optional[str]:
+        """在页面开头查找 <meta charset> / <meta http-equiv> 声明"""
+        match = _META_CHARSET.search(body[:META_SCAN_BYTES])
+        return normalize_encoding(match.group(1).decode('ascii', 'ignore')) if match else None
+
+    def detect(self, url: str, body: bytes, content_type: Optional[str] = None) -> str:
+        """确定页面编码，页面声明的编码按站点缓存，供未声明编码的页面使用"""
+        host = urlsplit(url).hostname or ''
+        encoding = self.charset_from_header(content_type) or self.charset_from_meta(body)
+        if encoding:
+            with self._lock:
+                self._host_encodings[host] = encoding
+            return encoding
+
+        with self._lock:
+            cached = self._host_encodings.get(host)
+        return cached or self.default_encoding
+
+    def decode(self, url: str, body: bytes, content_type: Optional[str] = None) -> str:
+        """
+        将响应字节解码为文本（只解码一次）
+
+        Args:
+            url: 页面URL
+            body: 响应原始字节
+            content_type: 响应的 Content-Type
+
+        Returns:
+            str: 页面文本
+        """
+        encoding = self.detect(url, body, content_type)
+        try:
+            return body.decode(encoding, errors='replace')
+        except LookupError:
+            return body.decode(self.default_encoding, errors='replace')
@@ -0,0 +1,90 @@
+"""
+多平台并发采集引擎
+
+每个平台使用独立的线程池（并发数 = 插件的 max_concurrency）、独立的限速器
+（两次请求的最小间隔 = 插件的 request_interval）和独立的出口池，
+因此一个平台被限速或封禁不会拖慢其他平台。
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Tuple, Union
+from src.crawler.book_crawler import BookCrawler
+from src.crawler.platforms.base import PlatformPlugin
+from src.crawler.platforms.registry import get_platform
+from src.crawler.proxy_pool import ProxyPool
+from src.utils.logger import EventCounter
+
+class RateLimiter:
+    """保证两次请求之间至少间隔 interval 秒（线程安全）"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+class CrawlEngine:
+    """并发运行多个平台插件"""
+
+    def __init__(self, platforms: List[Union[str, PlatformPlugin]], crawler: BookCrawler = None):
+        self.platforms = [get_platform(p) if isinstance(p, str) else p for p in platforms]
+        self.crawler = crawler or BookCrawler()
+        self.logger = logging.getLogger(__name__)
+        self.limiters = {p.name: RateLimiter(p.request_interval) for p in self.platforms}
+        self.proxy_pools = {p.name: ProxyPool.from_settings() for p in self.platforms}
+
+    def _crawl_page(self, platform: PlatformPlugin, url: str,
+                    start_date: str, end_date: str) -> List[Dict]:
+        self.limiters[platform.name].wait()
+        events = EventCounter()
+        books = self.crawler.fetch_page(url, start_date, end_date, events, platform,
+                                        self.proxy_pools[platform.name])
+        events.flush(self.logger, f"[{platform.display_name}] {url} 解析结果")
+        return books
+
+    def crawl(self, keywords: str = None, pages: int = 1, start_date: str = None,
+              end_date: str = None) -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        在所有平台上同时采集
+
+        Args:
+            keywords: 搜索关键词，为空时采集各平台的排行榜
+            pages: 每个平台的页数
+            start_date: 开始日期，格式：YYYY-MM-DD
+            end_date: 结束日期，格式：YYYY-MM-DD
+
+        Yields:
+            Tuple[str, List[Dict]]: (平台标识, 一页图书数据)，按完成顺序返回
+        """
+        executors = {p.name: ThreadPoolExecutor(max_workers=p.max_concurrency,
+                                                thread_name_prefix=f"crawl-{p.name}")
+                     for p in self.platforms}
+        try:
+            futures = {}
+            for platform in self.platforms:
+                for url in platform.list_urls(keywords, pages):
+                    future = executors[platform.name].submit(self._crawl_page, platform, url, start_date, end_date)
+                    futures[future] = (platform, url)
+
+            for future in as_completed(futures):
+                platform, url = futures[future]
+                try:
+                    yield platform.name, future.result()
+                except Exception as e:
+                    self.logger.error(f"[{platform.display_name}] 抓取 {url} 失败: {str(e)}")
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    def proxy_stats(self) -> Dict[str, List[Dict]]:
+        """各平台出口池的健康状态"""
+        return {name: pool.stats() for name, pool in self.proxy_pools.items()}
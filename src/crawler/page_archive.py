@@ -0,0 +1,253 @@
+"""
+原始页面存档
+
+每个抓取到的响应以 WARC 风格的 resource 记录单独压缩为一个 gzip 成员，
+追加写入分段文件 pages-XXXXX.warc.gz；同时在 pages.idx 中追加一条定长索引
+（分段号、偏移、长度、抓取时间），读取时通过 mmap 按偏移直接解压单条记录。
+采集界面、详情补充和分布式工作进程可能同时写入同一存档目录，追加时持有
+pages.lock 上的系统文件锁，保证偏移和索引在多个进程之间一致。
+
+命令行用法（在项目根目录执行）：
+    python -m src.crawler.page_archive reparse [--workers N] [--dry-run]
+"""
+import argparse
+import gzip
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+from src.config.settings import Settings
+from src.crawler.encoding import PageDecoder
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 索引项：分段号(uint16) + 偏移(uint64) + 压缩长度(uint32) + 抓取时间戳(uint32)
+INDEX_ENTRY = struct.Struct('<HQII')
+
+class ArchiveEntry(NamedTuple):
+    segment: int
+    offset: int
+    length: int
+    fetched_at: int
+
+class ArchiveRecord(NamedTuple):
+    url: str
+    fetched_at: int
+    content_type: str
+    body: bytes
+
+class PageArchive:
+    """只追加的压缩页面存档"""
+
+    def __init__(self, archive_dir: Path, segment_bytes: int = None):
+        self.archive_dir = Path(archive_dir)
+        self.segment_bytes = segment_bytes or Settings.ARCHIVE_SEGMENT_BYTES
+        self.index_path = self.archive_dir / 'pages.idx'
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._segment = None
+
+    @contextmanager
+    def _process_lock(self):
+        """跨进程的写锁（pages.lock 上的系统文件锁）"""
+        with open(self.archive_dir / 'pages.lock', 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def segment_path(self, segment: int) -> Path:
+        """分段文件路径"""
+        return self.archive_dir / f'pages-{segment:05d}.warc.gz'
+
+    def _current_segment(self) -> int:
+        """当前可写入的分段号，超过大小上限时开启新分段"""
+        if self._segment is None:
+            segments = sorted(self.archive_dir.glob('pages-*.warc.gz'))
+            self._segment = int(segments[-1].name[6:11]) if segments else 1
+        path = self.segment_path(self._segment)
+        if path.exists() and path.stat().st_size >= self.segment_bytes:
+            self._segment += 1
+        return self._segment
+
+    @staticmethod
+    def _encode_record(url: str, body: bytes, content_type: str, fetched_at: datetime) -> bytes:
+        """构造 WARC resource 记录"""
+        header = (
+            'WARC/1.1\r\n'
+            'WARC-Type: resource\r\n'
+            f'WARC-Target-URI: {url}\r\n'
+            f'WARC-Date: {fetched_at.strftime("%Y-%m-%dT%H:%M:%SZ")}\r\n'
+            f'Content-Type: {content_type or "text/html"}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            '\r\n'
+        ).encode('utf-8')
+        return header + body + b'\r\n\r\n'
+
+    @staticmethod
+    def _decode_record(data: bytes, fetched_at: int) -> ArchiveRecord:
+        """解析 WARC 记录"""
+        header, _, rest = data.partition(b'\r\n\r\n')
+        fields = {}
+        for line in header.decode('utf-8').split('\r\n')[1:]:
+            name, _, value = line.partition(':')
+            fields[name.strip().lower()] = value.strip()
+        length = int(fields.get('content-length', len(rest)))
+        return ArchiveRecord(
+            url=fields.get('warc-target-uri', ''),
+            fetched_at=fetched_at,
+            content_type=fields.get('content-type', ''),
+            body=rest[:length]
+        )
+
+    def append(self, url: str, body: bytes, content_type: str = '') -> bool:
+        """
+        追加一条页面记录
+
+        Args:
+            url: 页面URL
+            body: 响应原始字节
+            content_type: 响应的 Content-Type
+
+        Returns:
+            bool: 是否写入成功
+        """
+        try:
+            fetched_at = datetime.now(timezone.utc)
+            compressed = gzip.compress(self._encode_record(url, body, content_type, fetched_at))
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            with self._lock, self._process_lock():
+                segment = self._current_segment()
+                with open(self.segment_path(segment), 'ab') as f:
+                    offset = f.tell()
+                    f.write(compressed)
+                with open(self.index_path, 'ab') as f:
+                    f.write(INDEX_ENTRY.pack(segment, offset, len(compressed), int(fetched_at.timestamp())))
+            return True
+        except Exception as e:
+            self.logger.error(f"写入页面存档失败: {str(e)}")
+            return False
+
+    def entries(self) -> List[ArchiveEntry]:
+        """读取全部索引项"""
+        if not self.index_path.exists():
+            return []
+        data = self.index_path.read_bytes()
+        usable = len(data) - len(data) % INDEX_ENTRY.size  # 忽略写入中断留下的残缺索引项
+        return [ArchiveEntry(*fields) for fields in INDEX_ENTRY.iter_unpack(data[:usable])]
+
+    def read_entries(self, segment: int, entries: List[ArchiveEntry]) -> Iterator[ArchiveRecord]:
+        """通过 mmap 读取同一分段中的多条记录"""
+        with open(self.segment_path(segment), 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for entry in entries:
+                    data = gzip.decompress(mapped[entry.offset:entry.offset + entry.length])
+                    yield self._decode_record(data, entry.fetched_at)
+
+    def __iter__(self) -> Iterator[ArchiveRecord]:
+        for segment, entries in self._group_by_segment(self.entries()):
+            yield from self.read_entries(segment, entries)
+
+    @staticmethod
+    def _group_by_segment(entries: List[ArchiveEntry]) -> List[Tuple[int, List[ArchiveEntry]]]:
+        groups: Dict[int, List[ArchiveEntry]] = {}
+        for entry in entries:
+            groups.setdefault(entry.segment, []).append(entry)
+        return sorted(groups.items())
+
+    def reparse(self, workers: int = None, batch_size: int = 200) -> Iterator[List[Dict]]:
+        """
+        并行重新解析存档中的全部页面（不访问网络）
+
+        Args:
+            workers: 进程数，默认使用全部CPU核心
+            batch_size: 每个任务包含的页面数
+
+        Yields:
+            List[Dict]: 每个任务解析出的图书数据
+        """
+        tasks = []
+        for segment, entries in self._group_by_segment(self.entries()):
+            for start in range(0, len(entries), batch_size):
+                tasks.append((str(self.archive_dir), segment, entries[start:start + batch_size]))
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            yield from executor.map(_reparse_task, tasks)
+
+def _reparse_task(task: Tuple[str, int, List[ArchiveEntry]]) -> List[Dict]:
+    """子进程任务：解析一组存档记录"""
+    from src.crawler.book_crawler import BookCrawler
+    from src.crawler.platforms.registry import platform_for_url
+
+    archive_dir, segment, entries = task
+    archive = PageArchive(Path(archive_dir))
+    decoder = PageDecoder()
+    books = []
+    for record in archive.read_entries(segment, entries):
+        crawl_time = datetime.fromtimestamp(record.fetched_at).strftime('%Y-%m-%d %H:%M:%S')
+        platform = platform_for_url(record.url)
+        if platform is None:
+            continue
+        html = decoder.decode(record.url, record.body, record.content_type)
+        books.extend(BookCrawler.parse_page(
+            html,
+            search=platform.is_search(record.url),
+            crawl_time=crawl_time,
+            platform=platform
+        ))
+    return books
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="页面存档工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    reparse_parser = subparsers.add_parser('reparse', help="从存档重新解析全部图书并写入新的数据库")
+    reparse_parser.add_argument('--archive-dir', default=str(Settings.ARCHIVE_DIR))
+    reparse_parser.add_argument('--db', help="写入的目标数据库文件，必须是新文件或空库（不能是正在使用的数据库）")
+    reparse_parser.add_argument('--workers', type=int, default=None, help="进程数，默认为CPU核心数")
+    reparse_parser.add_argument('--dry-run', action='store_true', help="只解析不写入数据库")
+    args = parser.parse_args(argv)
+    if not args.dry_run and not args.db:
+        parser.error("reparse 需要 --db 指定目标数据库，或使用 --dry-run")
+
+    archive = PageArchive(Path(args.archive_dir))
+    db_manager = None
+    if not args.dry_run:
+        from src.database.db_manager import DatabaseManager
+        # 存档中的页面大多已入库，写回原库会重复插入图书和价格历史
+        db_manager = DatabaseManager(db_path=Path(args.db))
+        if db_manager.count_books() > 0:
+            print(f"目标数据库 {args.db} 已有数据，请指定新的数据库文件", file=sys.stderr)
+            return 1
+
+    total = 0
+    for books in archive.reparse(args.workers):
+        total += len(books)
+        if db_manager is not None and books:
+            db_manager.save_books(books)
+    if db_manager is not None:
+        db_manager.pool.close()
+    print(f"共重新解析 {len(archive.entries())} 个页面，{total} 条图书数据")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
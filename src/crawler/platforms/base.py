@@ -0,0 +1,57 @@
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+class PlatformPlugin:
+    """
+    采集平台插件
+
+    每个平台提供：
+    - URL构造：search_url（关键词搜索）和 ranking_url（排行榜/分类列表）；
+    - 页面解析：select_items 选出列表中的图书节点，extract_item 从单个节点提取字段；
+    - 抓取节奏：request_interval（同一平台两次请求的最小间隔）和 max_concurrency（并发请求数）。
+
+    通用的抓取、解码、日期过滤和统计由 CrawlEngine / BookCrawler.parse_page 完成。
+    """
+
+    name = ''              # 插件标识，如 dangdang
+    display_name = ''      # 写入 books.platform 的平台名称
+    hosts = ()             # 平台页面所在的域名
+    search_hosts = ()      # 搜索结果页所在的域名
+    request_interval = 1.0
+    max_concurrency = 2
+
+    def search_url(self, keywords: str, page: int) -> str:
+        """搜索结果页URL"""
+        raise NotImplementedError
+
+    def ranking_url(self, page: int) -> str:
+        """排行榜/默认列表页URL"""
+        raise NotImplementedError
+
+    def list_urls(self, keywords: Optional[str], pages: int) -> List[str]:
+        """一次采集需要抓取的列表页URL：有关键词时为搜索页，否则为排行榜"""
+        if keywords:
+            return [self.search_url(keywords, page) for page in range(1, pages + 1)]
+        return [self.ranking_url(page) for page in range(1, pages + 1)]
+
+    def is_search(self, url: str) -> bool:
+        """URL是否为搜索结果页"""
+        return (urlsplit(url).hostname or '') in self.search_hosts
+
+    def matches(self, url: str) -> bool:
+        """URL是否属于本平台"""
+        host = urlsplit(url).hostname or ''
+        return any(host == h or host.endswith('.' + h) for h in self.hosts)
+
+    def select_items(self, soup, search: bool) -> List:
+        """选出页面中的图书节点"""
+        raise NotImplementedError
+
+    def extract_item(self, item, search: bool) -> Dict:
+        """
+        从单个图书节点提取字段
+
+        Returns:
+            Dict: title、author、price、rating、url（platform 和 crawl_time 由调用方补充）
+        """
+        raise NotImplementedError
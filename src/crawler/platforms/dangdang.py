@@ -0,0 +1,42 @@
+from typing import Dict, List
+from src.crawler.platforms.base import PlatformPlugin
+from src.crawler.url_frontier import bestseller_url, search_url
+
+class DangdangPlatform(PlatformPlugin):
+    """当当网：搜索结果页和图书畅销榜"""
+
+    name = 'dangdang'
+    display_name = '当当网'
+    hosts = ('dangdang.com',)
+    search_hosts = ('search.dangdang.com',)
+    request_interval = 2.0
+    max_concurrency = 2
+
+    def search_url(self, keywords: str, page: int) -> str:
+        return search_url(keywords, page)
+
+    def ranking_url(self, page: int) -> str:
+        return bestseller_url(page=page)
+
+    def select_items(self, soup, search: bool) -> List:
+        # 根据不同页面使用不同的选择器
+        return soup.select('#search_nature_rg ul.bigimg li' if search else '.bang_list li')
+
+    def extract_item(self, item, search: bool) -> Dict:
+        if search:
+            # 搜索页面的数据提取
+            return {
+                'title': item.select_one('.name a').text.strip(),
+                'author': item.select_one('.search_book_author span').text.strip(),
+                'price': item.select_one('.search_now_price').text.strip(),
+                'rating': "暂无评分",  # 搜索页面可能没有评分
+                'url': item.select_one('.name a')['href']
+            }
+        # 畅销榜页面的数据提取
+        return {
+            'title': item.select_one('.name a').text.strip(),
+            'author': item.select_one('.publisher_info').text.strip(),
+            'price': item.select_one('.price .price_n').text.strip(),
+            'rating': item.select_one('.star').text.strip() if item.select_one('.star') else "暂无评分",
+            'url': item.select_one('.name a')['href']
+        }
@@ -0,0 +1,43 @@
+from typing import Dict, List
+from urllib.parse import quote
+from src.crawler.platforms.base import PlatformPlugin
+
+class DoubanPlatform(PlatformPlugin):
+    """
+    豆瓣读书：标签列表页（book.douban.com/tag/<标签>）
+
+    豆瓣的搜索结果页由脚本渲染，因此关键词按标签处理；没有关键词时抓取"小说"标签。
+    """
+
+    name = 'douban'
+    display_name = '豆瓣读书'
+    hosts = ('douban.com',)
+    search_hosts = ()
+    request_interval = 3.0
+    max_concurrency = 1
+    page_size = 20
+    default_tag = '小说'
+
+    def search_url(self, keywords: str, page: int) -> str:
+        start = (page - 1) * self.page_size
+        return f"https://book.douban.com/tag/{quote(keywords)}?start={start}&type=T"
+
+    def ranking_url(self, page: int) -> str:
+        return self.search_url(self.default_tag, page)
+
+    def select_items(self, soup, search: bool) -> List:
+        return soup.select('#subject_list li.subject-item')
+
+    def extract_item(self, item, search: bool) -> Dict:
+        link = item.select_one('.info h2 a')
+        # .pub 形如 "作者 / 译者 / 出版社 / 出版日期 / 价格"
+        pub = item.select_one('.info .pub').text.strip()
+        parts = [part.strip() for part in pub.split('/')]
+        rating = item.select_one('.rating_nums')
+        return {
+            'title': ' '.join(link.get('title', link.text).split()),
+            'author': pub,
+            'price': parts[-1] if len(parts) > 1 else '',
+            'rating': rating.text.strip() if rating and rating.text.strip() else "暂无评分",
+            'url': link['href']
+        }
@@ -0,0 +1,28 @@
+from typing import Dict, List, Optional
+from src.crawler.platforms.base import PlatformPlugin
+from src.crawler.platforms.dangdang import DangdangPlatform
+from src.crawler.platforms.douban import DoubanPlatform
+
+# 已注册的平台插件，新增平台时在此登记
+PLATFORMS: Dict[str, PlatformPlugin] = {
+    plugin.name: plugin for plugin in (DangdangPlatform(), DoubanPlatform())
+}
+
+DEFAULT_PLATFORM = 'dangdang'
+
+def get_platform(name: str) -> PlatformPlugin:
+    """按标识获取平台插件"""
+    try:
+        return PLATFORMS[name]
+    except KeyError:
+        raise ValueError(f"未知的平台: {name}（可选: {', '.join(PLATFORMS)}）")
+
+def platform_for_url(url: str) -> Optional[PlatformPlugin]:
+    """按URL的域名查找平台插件"""
+    for plugin in PLATFORMS.values():
+        if plugin.matches(url):
+            return plugin
+    return None
+
+def available_platforms() -> List[PlatformPlugin]:
+    return list(PLATFORMS.values())
@@ -0,0 +1,286 @@
+"""
+代理与请求身份池
+
+每个出口（代理或直连）维护延迟和错误率的指数滑动平均，并检测封禁页面（403/429、验证码跳转等）。
+5xx 和 407（代理要求认证）响应计为该出口的失败，换出口重试。
+被封禁或连续失败的出口进入隔离期，隔离时长随连续隔离次数指数增长；隔离期满后放行一次试探请求，
+成功即恢复。请求按 延迟 × 错误率 × 并发数 计算的权重分配到健康出口上。
+
+每个出口绑定一组请求身份（User-Agent 及配套请求头），出口被封禁时更换身份。
+
+命令行用法（在项目根目录执行）：
+    python -m src.crawler.proxy_pool check [--url URL]
+"""
+import argparse
+import logging
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import requests
+from src.config.settings import Settings
+from src.utils.metrics import Metrics
+
+IDENTITIES = [
+    {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
+    },
+    {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36 Edg/119.0.0.0',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7'
+    },
+    {
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'zh-CN,zh-Hans;q=0.9'
+    },
+    {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+        'Accept-Language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2'
+    },
+    {
+        'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+        'Accept-Language': 'zh-CN,zh;q=0.9'
+    }
+]
+
+# 封禁判断：状态码、跳转地址关键字、页面开头的关键字
+BLOCK_STATUS_CODES = {403, 429, 503}
+BLOCK_URL_MARKERS = ('captcha', 'verify', 'antispider', 'login.dangdang.com')
+BLOCK_BODY_MARKERS = ('验证码'.encode('gb18030'), '验证码'.encode('utf-8'), b'captcha', b'antispider')
+BLOCK_SCAN_BYTES = 8192
+
+# 计为出口失败的状态码（封禁之外）：代理要求认证，以及代理或目标站点的服务端错误
+FAILURE_STATUS_CODES = {407}
+
+# 指数滑动平均的权重
+EWMA_ALPHA = 0.3
+
+class BlockedError(Exception):
+    """请求被目标站点拦截"""
+
+def is_blocked(response: requests.Response) -> bool:
+    """判断响应是否为封禁/验证码页面"""
+    if response.status_code in BLOCK_STATUS_CODES:
+        return True
+    final_url = response.url.lower()
+    if any(marker in final_url for marker in BLOCK_URL_MARKERS):
+        return True
+    head = response.content[:BLOCK_SCAN_BYTES].lower()
+    return any(marker in head for marker in BLOCK_BODY_MARKERS)
+
+def is_failure(response: requests.Response) -> bool:
+    """判断响应是否应计为出口失败（5xx、407）"""
+    return response.status_code >= 500 or response.status_code in FAILURE_STATUS_CODES
+
+class ProxyExit:
+    """一个出口（代理或直连）的健康状态"""
+
+    def __init__(self, proxy: Optional[str], identity: Dict[str, str]):
+        self.proxy = proxy
+        self.name = proxy or 'direct'
+        self.identity = identity
+        self.latency = None          # 成功请求延迟的滑动平均（秒）
+        self.error_rate = 0.0        # 失败率的滑动平均
+        self.requests = 0
+        self.failures = 0
+        self.blocks = 0
+        self.consecutive_failures = 0
+        self.strikes = 0             # 连续被隔离的次数，决定下次隔离时长
+        self.quarantined_until = 0.0
+        self.probing = False         # 隔离期满后的试探请求进行中
+        self.in_flight = 0
+
+    @property
+    def proxies(self) -> Optional[Dict[str, str]]:
+        return {'http': self.proxy, 'https': self.proxy} if self.proxy else None
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.quarantined_until and not self.probing
+
+    def weight(self) -> float:
+        """分配请求的权重：延迟越低、错误率越低、并发越少权重越高"""
+        latency = self.latency if self.latency is not None else 1.0
+        return (1.0 - self.error_rate) ** 2 / (latency + 0.1) / (1 + self.in_flight)
+
+    def snapshot(self) -> Dict:
+        return {
+            'exit': self.name,
+            'requests': self.requests,
+            'failures': self.failures,
+            'blocks': self.blocks,
+            'latency': round(self.latency, 4) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 4),
+            'quarantined_for': max(0.0, round(self.quarantined_until - time.time(), 1)),
+            'user_agent': self.identity['User-Agent']
+        }
+
+class ProxyPool:
+    """带健康评分、自动隔离与恢复的出口池"""
+
+    def __init__(self, proxies: List[str] = None, include_direct: bool = None,
+                 quarantine_seconds: float = None, max_quarantine_seconds: float = None,
+                 failure_threshold: int = 3, max_tries: int = None):
+        include_direct = Settings.PROXY_INCLUDE_DIRECT if include_direct is None else include_direct
+        proxies = list(proxies or [])
+        if include_direct or not proxies:
+            proxies.append(None)
+        self.exits = [ProxyExit(proxy, random.choice(IDENTITIES)) for proxy in proxies]
+        self.quarantine_seconds = quarantine_seconds or Settings.PROXY_QUARANTINE_SECONDS
+        self.max_quarantine_seconds = max_quarantine_seconds or Settings.PROXY_MAX_QUARANTINE_SECONDS
+        self.failure_threshold = failure_threshold
+        self.max_tries = max_tries or Settings.PROXY_MAX_TRIES
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> 'ProxyPool':
+        """按 Settings.PROXY_LIST 和 Settings.PROXY_FILE（每行一个代理地址）创建"""
+        proxies = list(Settings.PROXY_LIST)
+        path = Path(Settings.PROXY_FILE)
+        if path.exists():
+            for line in path.read_text(encoding='utf-8').splitlines():
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    proxies.append(line)
+        return cls(proxies)
+
+    def acquire(self) -> ProxyExit:
+        """按权重选择一个健康出口；全部被隔离时选择最早期满的出口做试探"""
+        with self._lock:
+            now = time.time()
+            candidates = [exit_ for exit_ in self.exits if exit_.healthy(now)]
+            if candidates:
+                chosen = random.choices(candidates, weights=[exit_.weight() for exit_ in candidates])[0]
+            else:
+                idle = [exit_ for exit_ in self.exits if not exit_.probing] or self.exits
+                chosen = min(idle, key=lambda exit_: exit_.quarantined_until)
+            if chosen.quarantined_until:
+                # 隔离期满（或全部出口都在隔离中）：本次请求作为试探
+                chosen.probing = True
+            chosen.in_flight += 1
+            return chosen
+
+    def report(self, exit_: ProxyExit, success: bool, latency: float = None, blocked: bool = False):
+        """记录一次请求结果并更新出口的健康状态"""
+        with self._lock:
+            exit_.in_flight -= 1
+            exit_.requests += 1
+            exit_.probing = False
+            exit_.error_rate = EWMA_ALPHA * (0.0 if success else 1.0) + (1 - EWMA_ALPHA) * exit_.error_rate
+
+            if success:
+                exit_.latency = latency if exit_.latency is None else (
+                    EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * exit_.latency
+                )
+                exit_.consecutive_failures = 0
+                if exit_.quarantined_until:
+                    self.logger.info(f"出口 {exit_.name} 已恢复")
+                exit_.quarantined_until = 0.0
+                exit_.strikes = 0
+                return
+
+            exit_.failures += 1
+            exit_.consecutive_failures += 1
+            if blocked:
+                exit_.blocks += 1
+                Metrics.inc('proxy_blocked_total')
+                # 被封禁时更换该出口的请求身份
+                exit_.identity = random.choice([i for i in IDENTITIES if i is not exit_.identity] or IDENTITIES)
+
+            if blocked or exit_.consecutive_failures >= self.failure_threshold or exit_.quarantined_until:
+                exit_.strikes += 1
+                duration = min(self.quarantine_seconds * 2 ** (exit_.strikes - 1), self.max_quarantine_seconds)
+                exit_.quarantined_until = time.time() + duration
+                Metrics.inc('proxy_quarantined_total')
+                self.logger.warning(
+                    f"出口 {exit_.name} 隔离 {duration:.0f} 秒（{'被封禁' if blocked else '连续失败'}，"
+                    f"错误率 {exit_.error_rate:.2f}）"
+                )
+
+    def get(self, url: str, session: requests.Session = None, timeout: float = 15, **kwargs) -> requests.Response:
+        """
+        通过健康出口发送 GET 请求，失败或被封禁时换出口重试
+
+        Args:
+            url: 请求地址
+            session: 可选的会话，用于复用连接
+            timeout: 超时时间（秒）
+
+        Returns:
+            requests.Response: 响应
+
+        Raises:
+            BlockedError: 所有尝试均被封禁
+            requests.RequestException: 所有尝试均失败
+        """
+        last_error = None
+        for _ in range(self.max_tries):
+            exit_ = self.acquire()
+            start = time.perf_counter()
+            try:
+                response = (session or requests).get(
+                    url, headers=exit_.identity, proxies=exit_.proxies, timeout=timeout, **kwargs
+                )
+            except requests.RequestException as e:
+                self.report(exit_, False)
+                last_error = e
+                continue
+
+            latency = time.perf_counter() - start
+            if is_blocked(response):
+                self.report(exit_, False, latency, blocked=True)
+                last_error = BlockedError(f"{url} 被拦截（出口 {exit_.name}，状态码 {response.status_code}）")
+                continue
+            if is_failure(response):
+                self.report(exit_, False, latency)
+                last_error = requests.HTTPError(
+                    f"{url} 请求失败（出口 {exit_.name}，状态码 {response.status_code}）", response=response
+                )
+                continue
+            self.report(exit_, True, latency)
+            return response
+        raise last_error
+
+    def check(self, url: str, timeout: float = 10) -> List[Dict]:
+        """对每个出口发送一次试探请求并更新健康状态（忽略隔离期）"""
+        for exit_ in self.exits:
+            with self._lock:
+                exit_.in_flight += 1
+            start = time.perf_counter()
+            try:
+                response = requests.get(url, headers=exit_.identity, proxies=exit_.proxies, timeout=timeout)
+                blocked = is_blocked(response)
+                success = not blocked and not is_failure(response)
+                self.report(exit_, success, time.perf_counter() - start, blocked=blocked)
+            except requests.RequestException:
+                self.report(exit_, False)
+        return self.stats()
+
+    def stats(self) -> List[Dict]:
+        """各出口的健康状态"""
+        with self._lock:
+            return [exit_.snapshot() for exit_ in self.exits]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="代理池工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    check_parser = subparsers.add_parser('check', help="检查所有出口的健康状态")
+    check_parser.add_argument('--url', default='http://bang.dangdang.com/books/', help="试探请求地址")
+    args = parser.parse_args(argv)
+
+    pool = ProxyPool.from_settings()
+    for item in pool.check(args.url):
+        status = f"隔离 {item['quarantined_for']} 秒" if item['quarantined_for'] else '正常'
+        print(f"{item['exit']:<40} {status:<12} 延迟 {item['latency']}s 错误率 {item['error_rate']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""
+持久化URL调度队列（frontier）
+
+- 所有URL先规范化，再用 64 位哈希判重；
+- 判重集合由内存映射的布隆过滤器（快速排除未见过的URL）加 SQLite 表（精确确认）组成，
+  内存占用与URL数量无关；
+- 待抓取URL按站点分队列、队列内按优先级出队，站点之间轮询并遵守最小抓取间隔；
+- 出队只是租出URL，抓取成功后调用 done() 才删除；抓取失败调用 retry() 放回队列，
+  进程崩溃时租约到期后URL会重新出队，不会丢失。
+
+命令行用法（在项目根目录执行）：
+    python -m src.crawler.url_frontier seed --windows recent30 month-2023-0 --pages 25
+    python -m src.crawler.url_frontier sweep --max-pages 1000
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import mmap
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+from src.config.settings import Settings
+
+BESTSELLER_BASE_URL = "http://bang.dangdang.com/books/bestsellers"
+SEARCH_BASE_URL = "http://search.dangdang.com/"
+
+# 图书畅销榜的一级分类编码
+BESTSELLER_CATEGORIES = [
+    '01.00.00.00.00.00',  # 图书总榜
+    '01.01.00.00.00.00',  # 童书
+    '01.03.00.00.00.00',  # 小说
+    '01.05.00.00.00.00',  # 文学
+    '01.07.00.00.00.00',  # 艺术
+    '01.21.00.00.00.00',  # 成功/励志
+    '01.22.00.00.00.00',  # 管理
+    '01.25.00.00.00.00',  # 经济
+    '01.28.00.00.00.00',  # 政治/军事
+    '01.31.00.00.00.00',  # 心理学
+    '01.36.00.00.00.00',  # 历史
+    '01.38.00.00.00.00',  # 哲学/宗教
+    '01.41.00.00.00.00',  # 考试
+    '01.43.00.00.00.00',  # 教材
+    '01.45.00.00.00.00',  # 中小学教辅
+    '01.49.00.00.00.00',  # 科普读物
+    '01.52.00.00.00.00',  # 计算机/网络
+    '01.54.00.00.00.00',  # 医学
+]
+
+# 排行榜时间窗口，如 recent7、recent30、year-2023-0、month-2023-5
+BESTSELLER_WINDOWS = ['recent7-0-0', 'recent30-0-0']
+
+# 规范化时丢弃的跟踪参数
+TRACKING_PARAMS = {'_ddclickunion', 'ddclick_reco', 'utm_source', 'utm_medium', 'utm_campaign', 'spm'}
+
+def bestseller_url(category: str = BESTSELLER_CATEGORIES[0], window: str = 'month-2023-0', page: int = 1) -> str:
+    """构造畅销榜URL"""
+    return f"{BESTSELLER_BASE_URL}/{category}-{window}-1-{page}"
+
+def search_url(keywords: str, page: int = 1) -> str:
+    """构造搜索结果页URL"""
+    return canonicalize_url(f"{SEARCH_BASE_URL}?{urlencode({'key': keywords, 'act': 'input', 'page_index': page})}")
+
+def canonicalize_url(url: str) -> str:
+    """
+    URL规范化：小写协议和域名、去掉默认端口和锚点、去掉跟踪参数、查询参数排序
+
+    Args:
+        url: 原始URL
+
+    Returns:
+        str: 规范化后的URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'http').lower()
+    host = (parts.hostname or '').lower()
+    port = parts.port
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+    path = quote(parts.path or '/', safe="/%:@!$&'()*+,;=-._~")
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunsplit((scheme, host, path, query, ''))
+
+def url_hash(url: str) -> int:
+    """规范化URL的64位有符号哈希（可直接作为SQLite整数主键）"""
+    digest = hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+class BloomFilter:
+    """基于内存映射文件的布隆过滤器"""
+
+    def __init__(self, path: Path, capacity: int, error_rate: float):
+        self.path = Path(path)
+        self.bit_count = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        size = (self.bit_count + 7) // 8
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.created = not self.path.exists() or self.path.stat().st_size != size
+        if self.created:
+            with open(self.path, 'wb') as f:
+                f.truncate(size)
+        self._file = open(self.path, 'r+b')
+        self._bits = mmap.mmap(self._file.fileno(), size)
+
+    def _positions(self, key: int):
+        # 双重哈希：h1 + i * h2
+        h1 = key & 0xFFFFFFFF
+        h2 = (key >> 32) & 0xFFFFFFFF | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.bit_count
+
+    def add(self, key: int):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: int) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def flush(self):
+        self._bits.flush()
+
+    def close(self):
+        self._bits.flush()
+        self._bits.close()
+        self._file.close()
+
+class URLFrontier:
+    """按站点分队列的持久化URL调度器"""
+
+    def __init__(self, db_path: Path = None, bloom_path: Path = None,
+                 capacity: int = None, error_rate: float = None, host_delay: float = None,
+                 lease_timeout: float = None, max_attempts: int = None):
+        self.db_path = Path(db_path or Settings.FRONTIER_DB)
+        self.host_delay = Settings.FRONTIER_HOST_DELAY if host_delay is None else host_delay
+        self.lease_timeout = Settings.FRONTIER_LEASE_TIMEOUT if lease_timeout is None else lease_timeout
+        self.max_attempts = max_attempts or Settings.FRONTIER_MAX_ATTEMPTS
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._next_fetch: Dict[str, float] = {}
+        self._leases: Dict[str, int] = {}  # 已租出的URL -> frontier 行 id
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS seen_urls (url_hash INTEGER PRIMARY KEY)')
+            self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS frontier (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                host TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                url TEXT NOT NULL,
+                meta TEXT,
+                leased_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+            ''')
+            columns = {row[1] for row in self.conn.execute('PRAGMA table_info(frontier)')}
+            if 'leased_until' not in columns:
+                self.conn.execute('ALTER TABLE frontier ADD COLUMN leased_until REAL')
+                self.conn.execute('ALTER TABLE frontier ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_frontier_host ON frontier(host, priority DESC, id)')
+        # 有待抓取URL的站点，只在启动时查询一次，之后随入队/出队维护
+        self._hosts = {row[0] for row in self.conn.execute('SELECT DISTINCT host FROM frontier')}
+
+        self.bloom = BloomFilter(
+            bloom_path or Settings.FRONTIER_BLOOM_FILE,
+            capacity or Settings.FRONTIER_CAPACITY,
+            error_rate or Settings.FRONTIER_ERROR_RATE
+        )
+        if self.bloom.created:
+            self._rebuild_bloom()
+
+    def _rebuild_bloom(self):
+        """布隆过滤器文件缺失或参数变化时，从 SQLite 判重表重建"""
+        cursor = self.conn.execute('SELECT url_hash FROM seen_urls')
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            for (key,) in rows:
+                self.bloom.add(key)
+        self.bloom.flush()
+
+    def seen(self, url: str) -> bool:
+        """URL是否已经加入过调度队列"""
+        key = url_hash(canonicalize_url(url))
+        with self._lock:
+            if key not in self.bloom:
+                return False
+            return self.conn.execute('SELECT 1 FROM seen_urls WHERE url_hash = ?', (key,)).fetchone() is not None
+
+    def add_many(self, urls: Iterable, priority: int = 0) -> int:
+        """
+        批量加入URL，已见过的URL会被忽略
+
+        Args:
+            urls: URL，或 (URL, 附加信息dict) 元组
+            priority: 优先级，数值越大越先抓取
+
+        Returns:
+            int: 实际加入的URL数量
+        """
+        added = 0
+        with self._lock, self.conn:
+            for item in urls:
+                url, meta = item if isinstance(item, tuple) else (item, None)
+                url = canonicalize_url(url)
+                key = url_hash(url)
+                if key in self.bloom:
+                    exists = self.conn.execute('SELECT 1 FROM seen_urls WHERE url_hash = ?', (key,)).fetchone()
+                    if exists:
+                        continue
+                # 布隆过滤器没有记录也以判重表为准（映射文件丢失刷盘等情况下会漏记）
+                if self.conn.execute('INSERT OR IGNORE INTO seen_urls (url_hash) VALUES (?)', (key,)).rowcount == 0:
+                    self.bloom.add(key)
+                    continue
+                host = urlsplit(url).hostname or ''
+                self.conn.execute(
+                    'INSERT INTO frontier (host, priority, url, meta) VALUES (?, ?, ?, ?)',
+                    (host, priority, url, json.dumps(meta, ensure_ascii=False) if meta else None)
+                )
+                self._hosts.add(host)
+                self.bloom.add(key)
+                added += 1
+        return added
+
+    def add(self, url: str, priority: int = 0, meta: Dict = None) -> bool:
+        """加入单个URL，返回是否为新URL"""
+        return self.add_many([(url, meta)], priority) == 1
+
+    def pop(self) -> Optional[Tuple[str, Dict]]:
+        """
+        租出下一个待抓取URL：在站点之间按下次允许抓取的时间轮询，站点内按优先级
+
+        URL在租约期内不会再次出队，抓取成功后须调用 done()，失败调用 retry()。
+        等待站点抓取间隔时不持有锁。
+
+        Returns:
+            Optional[Tuple[str, Dict]]: (URL, 附加信息)，没有可租出的URL时返回 None
+        """
+        while True:
+            with self._lock:
+                wait = None
+                for host in sorted(self._hosts, key=lambda h: self._next_fetch.get(h, 0.0)):
+                    row = self.conn.execute('''
+                    SELECT id, url, meta FROM frontier
+                    WHERE host = ? AND (leased_until IS NULL OR leased_until < ?)
+                    ORDER BY priority DESC, id LIMIT 1
+                    ''', (host, time.time())).fetchone()
+                    if row is None:
+                        # 只剩已租出的URL时保留站点，租约到期后还要重新出队
+                        if self.conn.execute('SELECT 1 FROM frontier WHERE host = ? LIMIT 1', (host,)).fetchone() is None:
+                            self._hosts.discard(host)
+                        continue
+                    wait = self._next_fetch.get(host, 0.0) - time.monotonic()
+                    if wait > 0:
+                        break
+                    with self.conn:
+                        self.conn.execute('UPDATE frontier SET leased_until = ? WHERE id = ?',
+                                          (time.time() + self.lease_timeout, row[0]))
+                    self._leases[row[1]] = row[0]
+                    self._next_fetch[host] = time.monotonic() + self.host_delay
+                    return row[1], json.loads(row[2]) if row[2] else {}
+                if wait is None:
+                    return None
+            time.sleep(wait)
+
+    def done(self, url: str):
+        """URL抓取成功，从队列中删除"""
+        with self._lock:
+            row_id = self._leases.pop(url, None)
+            if row_id is not None:
+                with self.conn:
+                    self.conn.execute('DELETE FROM frontier WHERE id = ?', (row_id,))
+
+    def retry(self, url: str) -> bool:
+        """
+        URL抓取失败，放回队列；失败次数达到上限后丢弃
+
+        Returns:
+            bool: 是否已放回队列
+        """
+        with self._lock:
+            row_id = self._leases.pop(url, None)
+            if row_id is None:
+                return False
+            with self.conn:
+                self.conn.execute(
+                    'UPDATE frontier SET leased_until = NULL, attempts = attempts + 1 WHERE id = ?', (row_id,)
+                )
+                cursor = self.conn.execute(
+                    'DELETE FROM frontier WHERE id = ? AND attempts >= ?', (row_id, self.max_attempts)
+                )
+            if cursor.rowcount:
+                self.logger.warning(f"{url} 连续失败{self.max_attempts}次，已从队列移除")
+                return False
+            return True
+
+    def pending(self) -> int:
+        """待抓取URL数量"""
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM frontier').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.bloom.close()
+            self.conn.close()
+
+    def seed_bestsellers(self, categories: List[str] = None, windows: List[str] = None,
+                         pages: int = 25, priority: int = 0) -> int:
+        """按分类 × 时间窗口 × 页码生成畅销榜URL"""
+        categories = categories or BESTSELLER_CATEGORIES
+        windows = windows or BESTSELLER_WINDOWS
+        return self.add_many((
+            (bestseller_url(category, window, page), {'category': category, 'window': window, 'page': page})
+            for category in categories
+            for window in windows
+            for page in range(1, pages + 1)
+        ), priority)
+
+    def seed_search(self, keywords: List[str], pages: int = 10, priority: int = 0) -> int:
+        """按关键词 × 页码生成搜索结果页URL"""
+        return self.add_many((
+            (search_url(keyword, page), {'keywords': keyword, 'page': page})
+            for keyword in keywords
+            for page in range(1, pages + 1)
+        ), priority)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="URL调度队列")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help="生成待抓取URL")
+    seed_parser.add_argument('--categories', nargs='*', help="畅销榜分类编码，默认全部一级分类")
+    seed_parser.add_argument('--windows', nargs='*', help="时间窗口，如 recent7-0-0 month-2023-5")
+    seed_parser.add_argument('--keywords', nargs='*', default=[], help="搜索关键词")
+    seed_parser.add_argument('--pages', type=int, default=25, help="每个分类/关键词的页数")
+
+    sweep_parser = subparsers.add_parser('sweep', help="按队列抓取并入库")
+    sweep_parser.add_argument('--max-pages', type=int, default=None, help="本次最多抓取的页数")
+
+    args = parser.parse_args(argv)
+    frontier = URLFrontier()
+    try:
+        if args.command == 'seed':
+            added = frontier.seed_bestsellers(args.categories, args.windows, args.pages)
+            if args.keywords:
+                added += frontier.seed_search(args.keywords, args.pages)
+            print(f"新增 {added} 个URL，队列中共 {frontier.pending()} 个待抓取")
+        else:
+            from src.crawler.book_crawler import BookCrawler
+            from src.database.db_manager import DatabaseManager
+
+            db_manager = DatabaseManager.instance()
+            crawler = BookCrawler()
+            total = 0
+            for books in crawler.crawl_frontier(frontier, args.max_pages):
+                if books:
+                    db_manager.save_books(books)
+                    total += len(books)
+            print(f"共采集 {total} 条图书数据，队列中剩余 {frontier.pending()} 个URL")
+    finally:
+        frontier.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import sqlite3
+import logging
+import time
+from typing import Dict, List, Optional, Set
+
+class BookDetailStore:
+    """
+    商品详情页补充信息
+
+    每个商品URL一行，保存从详情页解析出的 ISBN、出版社、出版日期、页数和分类路径，
+    fetched_at 记录抓取时间（Unix时间戳），用于在有效期内跳过已补充过的图书。
+    """
+
+    COLUMNS = ['isbn', 'publisher', 'publish_date', 'page_count', 'category_path']
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def init_tables(conn: sqlite3.Connection):
+        """创建详情表和索引"""
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS book_details (
+            url TEXT PRIMARY KEY,
+            isbn TEXT,
+            publisher TEXT,
+            publish_date TEXT,
+            page_count INTEGER,
+            category_path TEXT,
+            fetched_at INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_book_details_isbn ON book_details(isbn)')
+
+    def save(self, details: List[Dict]) -> int:
+        """
+        写入或更新一批详情记录
+
+        Args:
+            details: 详情列表，每项包含 url 和 COLUMNS 中的字段
+
+        Returns:
+            int: 写入的记录数
+        """
+        if not details:
+            return 0
+        now = int(time.time())
+        with self.db_manager.writer() as conn:
+            conn.executemany(f'''
+            INSERT OR REPLACE INTO book_details (url, {', '.join(self.COLUMNS)}, fetched_at)
+            VALUES (?, {', '.join('?' for _ in self.COLUMNS)}, ?)
+            ''', [
+                (detail['url'], *(detail.get(name) for name in self.COLUMNS), detail.get('fetched_at', now))
+                for detail in details
+            ])
+        return len(details)
+
+    def stale_urls(self, ttl_days: float, limit: int = None) -> List[str]:
+        """
+        需要（重新）补充详情的商品URL：从未抓取过，或上次抓取已超过有效期
+
+        Args:
+            ttl_days: 有效期（天）
+            limit: 最多返回的数量
+
+        Returns:
+            List[str]: 商品URL列表，最近出现的图书优先
+        """
+        cutoff = int(time.time() - ttl_days * 86400)
+        query = '''
+        SELECT p.url FROM price_books p
+        LEFT JOIN book_details d ON d.url = p.url
+        WHERE d.url IS NULL OR d.fetched_at < ?
+        ORDER BY p.first_seen DESC
+        '''
+        params = (cutoff,)
+        if limit:
+            query += ' LIMIT ?'
+            params += (limit,)
+        with self.db_manager.reader() as conn:
+            return [row[0] for row in conn.execute(query, params)]
+
+    def fresh_urls(self, urls: List[str], ttl_days: float) -> Set[str]:
+        """给定URL中在有效期内已补充过详情的部分"""
+        cutoff = int(time.time() - ttl_days * 86400)
+        fresh = set()
+        with self.db_manager.reader() as conn:
+            for start in range(0, len(urls), 500):
+                batch = urls[start:start + 500]
+                fresh.update(row[0] for row in conn.execute(f'''
+                SELECT url FROM book_details
+                WHERE fetched_at >= ? AND url IN ({', '.join('?' for _ in batch)})
+                ''', (cutoff, *batch)))
+        return fresh
+
+    def get(self, url: str) -> Optional[Dict]:
+        """获取单个商品的详情"""
+        with self.db_manager.reader() as conn:
+            row = conn.execute(f'''
+            SELECT {', '.join(self.COLUMNS)}, fetched_at FROM book_details WHERE url = ?
+            ''', (url,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(self.COLUMNS + ['fetched_at'], row))
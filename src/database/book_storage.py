@@ -0,0 +1,290 @@
+"""
+图书表的规范化存储
+
+原来的 books 表每一行都重复保存完整的字符串：作者信息（"作者 著 /出版日期/出版社"）、
+固定为"当当网"的平台名称和格式化的采集时间。规范化存储把作者署名、出版社和平台
+放进字典维度表，图书行只保存整数外键；出版日期保存为天数，采集时间和入库时间
+保存为整数时间戳。同名视图 books 把这些列还原成原来的文本，SELECT * FROM books
+等已有查询不需要修改，通过视图的 INSERT 也会由触发器转换后写入。
+
+新建的数据库在 Settings.DB_STORAGE_LAYOUT = "normalized" 时使用规范化存储（默认仍为单表），
+已有的数据库需要手动迁移。命令行用法（在项目根目录执行）：
+    python -m src.database.book_storage show
+    python -m src.database.book_storage migrate
+"""
+import argparse
+import logging
+import re
+import sqlite3
+import sys
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.utils.metrics import Metrics
+
+# 可以无损拆分的作者信息："署名 /YYYY-MM-DD/出版社"
+AUTHOR_INFO_PATTERN = re.compile(r'([^/]*) /(\d{4}-\d{2}-\d{2})/([^/]*)')
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# 把本地时间文本转换为整数时间戳的SQL表达式；只有能原样还原的文本才转换，否则保存原文
+EPOCH_SQL = (
+    "CASE WHEN strftime('%Y-%m-%d %H:%M:%S', {0}) = {0} "
+    "THEN CAST(strftime('%s', {0}, 'utc') AS INTEGER) ELSE {0} END"
+)
+# 入库时间（UTC 文本，与 CURRENT_TIMESTAMP 一致）转换为整数时间戳，缺省为当前时间
+CREATED_AT_SQL = "COALESCE(CAST(strftime('%s', {0}) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER))"
+
+DIMENSION_TABLES = ('book_authors', 'book_publishers', 'book_platforms')
+
+# book_rows 的列（按月分区的文件使用同样的列）
+BOOK_ROW_COLUMNS = (
+    'id', 'title', 'author_id', 'published_day', 'publisher_id', 'author_raw',
+    'price', 'rating', 'url', 'platform_id', 'crawl_time', 'created_at'
+)
+# book_rows 中 id 之外的列定义
+BOOK_ROW_COLUMNS_SQL = """title TEXT NOT NULL,
+            author_id INTEGER REFERENCES book_authors(id),        -- 署名（如"王伟 著"）
+            published_day INTEGER,                                -- 出版日期，距1970-01-01的天数
+            publisher_id INTEGER REFERENCES book_publishers(id),
+            author_raw TEXT,                                      -- 无法拆分时保存原始作者信息
+            price TEXT,
+            rating TEXT,
+            url TEXT,
+            platform_id INTEGER REFERENCES book_platforms(id),
+            crawl_time,                                           -- 整数时间戳，无法转换时保存原文
+            created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))"""
+
+# books 视图：维度列通过 LEFT JOIN 维度表取得。SQLite 不会在聚合查询中省去用不到的
+# 连接，COUNT(*) 等经过视图的扫描仍会逐行查维度表；只需要行数或 id 时应查询
+# DatabaseManager.book_rows_table。{rows} 为图书行所在的表或视图
+BOOKS_VIEW_SQL = """
+SELECT r.id, r.title,
+       COALESCE(r.author_raw,
+                a.name || ' /' || date(r.published_day * 86400, 'unixepoch') || '/' || p.name) AS author,
+       r.price, r.rating, r.url,
+       f.name AS platform,
+       CASE typeof(r.crawl_time)
+           WHEN 'integer' THEN strftime('%Y-%m-%d %H:%M:%S', r.crawl_time, 'unixepoch', 'localtime')
+           ELSE r.crawl_time
+       END AS crawl_time,
+       datetime(r.created_at, 'unixepoch') AS created_at
+FROM {rows} r
+LEFT JOIN book_authors a ON a.id = r.author_id
+LEFT JOIN book_publishers p ON p.id = r.publisher_id
+LEFT JOIN book_platforms f ON f.id = r.platform_id
+"""
+
+# 其他程序直接写入视图时：平台和时间照常转换，作者信息原样保存
+INSERT_TRIGGER_SQL = f"""
+CREATE {{temp}} TRIGGER IF NOT EXISTS books_insert INSTEAD OF INSERT ON books
+BEGIN
+    INSERT OR IGNORE INTO book_platforms (name) SELECT NEW.platform WHERE NEW.platform IS NOT NULL;
+    INSERT INTO book_rows (id, title, author_raw, price, rating, url, platform_id, crawl_time, created_at)
+    VALUES (NEW.id, NEW.title, NEW.author, NEW.price, NEW.rating, NEW.url,
+            (SELECT id FROM book_platforms WHERE name = NEW.platform),
+            {EPOCH_SQL.format('NEW.crawl_time')},
+            {CREATED_AT_SQL.format('NEW.created_at')});
+END
+"""
+
+def split_author_info(author_info: str) -> Optional[Tuple[str, int, str]]:
+    """
+    把作者信息拆分为署名、出版日期和出版社
+
+    Returns:
+        Optional[Tuple[str, int, str]]: (署名, 出版日期距1970-01-01的天数, 出版社)，
+        格式不符时返回 None（原文保存在 author_raw 中）
+    """
+    match = AUTHOR_INFO_PATTERN.fullmatch(author_info or '')
+    if not match:
+        return None
+    byline, published, publisher = match.groups()
+    try:
+        day = date.fromisoformat(published).toordinal() - EPOCH_ORDINAL
+    except ValueError:
+        return None
+    return byline, day, publisher
+
+class NormalizedBookStore:
+    """规范化的图书存储：book_rows 行表 + 作者/出版社/平台维度表 + books 兼容视图"""
+
+    COLUMNS = ('id', 'title', 'author', 'price', 'rating', 'url', 'platform', 'crawl_time', 'created_at')
+
+    INSERT_SQL = f'''
+    INSERT INTO book_rows (id, title, author_id, published_day, publisher_id, author_raw,
+                           price, rating, url, platform_id, crawl_time, created_at)
+    VALUES (:id, :title, :author_id, :published_day, :publisher_id, :author_raw,
+            :price, :rating, :url, :platform_id, {EPOCH_SQL.format(':crawl_time')},
+            {CREATED_AT_SQL.format(':created_at')})
+    '''
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def layout(conn: sqlite3.Connection) -> Optional[str]:
+        """
+        当前数据库的图书表存储方式
+
+        Returns:
+            Optional[str]: 'legacy'（books 为普通表）、'normalized'（books 为视图），尚未建表时为 None
+        """
+        row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'books'").fetchone()
+        if row is None:
+            return None
+        return 'normalized' if row[0] == 'view' else 'legacy'
+
+    @staticmethod
+    def init_tables(conn: sqlite3.Connection):
+        """创建维度表、图书行表、books 视图和写入触发器"""
+        for table in DIMENSION_TABLES:
+            conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+            ''')
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS book_rows (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            {BOOK_ROW_COLUMNS_SQL}
+        )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_book_rows_title ON book_rows(title)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_book_rows_platform ON book_rows(platform_id)')
+        view_sql = f"CREATE VIEW books AS {BOOKS_VIEW_SQL.format(rows='book_rows')}"
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = 'books'").fetchone()
+        if row is not None and row[0] != view_sql:
+            # 视图定义有更新：重建视图（其上的触发器随视图删除，下面重新创建）；
+            # 连接上按分区创建的临时视图会遮住主库的视图和触发器，一并删除，由连接池重新挂载
+            conn.execute('DROP VIEW IF EXISTS temp.books')
+            conn.execute('DROP VIEW main.books')
+            row = None
+        if row is None:
+            conn.execute(view_sql)
+        conn.execute(INSERT_TRIGGER_SQL.format(temp=''))
+
+    @staticmethod
+    def _dimension_ids(conn: sqlite3.Connection, table: str, names: Iterable[str]) -> Dict[str, int]:
+        """确保维度值存在并返回 名称 -> id"""
+        names = {name for name in names if name is not None}
+        conn.executemany(f'INSERT OR IGNORE INTO {table} (name) VALUES (?)', [(name,) for name in names])
+        return {
+            name: conn.execute(f'SELECT id FROM {table} WHERE name = ?', (name,)).fetchone()[0]
+            for name in names
+        }
+
+    def insert(self, conn: sqlite3.Connection, books: List[Dict]):
+        """
+        在调用方的写事务中写入一批图书
+
+        Args:
+            conn: 写连接（调用方负责提交）
+            books: 图书数据列表，键与 books 视图的列名一致，缺少的列为空
+        """
+        if not books:
+            return
+        parts = [split_author_info(book.get('author')) for book in books]
+        authors = self._dimension_ids(conn, 'book_authors', (part[0] for part in parts if part))
+        publishers = self._dimension_ids(conn, 'book_publishers', (part[2] for part in parts if part))
+        platforms = self._dimension_ids(conn, 'book_platforms', (book.get('platform') for book in books))
+
+        rows = []
+        for book, part in zip(books, parts):
+            row = {column: book.get(column) for column in self.COLUMNS}
+            if part:
+                byline, published_day, publisher = part
+                row.update(author_id=authors[byline], published_day=published_day,
+                           publisher_id=publishers[publisher], author_raw=None)
+            else:
+                row.update(author_id=None, published_day=None, publisher_id=None, author_raw=row['author'])
+            row['platform_id'] = platforms.get(row['platform'])
+            rows.append(row)
+        conn.executemany(self.INSERT_SQL, rows)
+
+    @Metrics.timed('db.migrate_normalized')
+    def migrate(self, chunk_size: int = 50000, vacuum: bool = True) -> int:
+        """
+        把旧的单表 books 迁移为规范化存储，图书 id 保持不变
+
+        整个迁移在一个事务中完成，失败时数据库保持原样。
+
+        Returns:
+            int: 迁移的图书数
+        """
+        migrated = 0
+        with self.db_manager.writer() as conn:
+            if self.layout(conn) != 'legacy':
+                self.logger.info("图书表已是规范化存储，无需迁移")
+                return 0
+            # DDL 默认不会开启事务，显式开启以保证整体回滚
+            conn.execute('BEGIN')
+            conn.execute('ALTER TABLE books RENAME TO books_legacy')
+            conn.execute('DROP INDEX IF EXISTS idx_title')
+            conn.execute('DROP INDEX IF EXISTS idx_platform')
+            self.init_tables(conn)
+
+            cursor = conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM books_legacy ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                self.insert(conn, [dict(zip(self.COLUMNS, row)) for row in rows])
+                migrated += len(rows)
+
+            conn.execute('DROP TABLE books_legacy')
+            # book_rows 的自增序号由带 id 的写入自动更新，去掉旧表的序号记录
+            conn.execute("DELETE FROM sqlite_sequence WHERE name IN ('books', 'books_legacy')")
+        self.db_manager.normalized_layout = True
+        # 为所有连接创建合并分区的临时视图
+        self.db_manager.pool.refresh()
+
+        if vacuum:
+            with self.db_manager.writer() as conn:
+                conn.execute('VACUUM')
+        self.logger.info(f"已迁移 {migrated} 本图书到规范化存储")
+        return migrated
+
+    def storage_info(self) -> Dict:
+        """数据库文件大小和各表行数"""
+        with self.db_manager.reader() as conn:
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+            page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+            freelist = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            layout = self.layout(conn)
+            tables = ('book_rows',) + DIMENSION_TABLES if layout == 'normalized' else ('books',)
+            counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in tables}
+        return {
+            'layout': layout,
+            'file_bytes': page_size * page_count,
+            'free_bytes': page_size * freelist,
+            'rows': counts
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="图书表的规范化存储")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('show', help="显示存储方式、文件大小和各表行数")
+    migrate_parser = subparsers.add_parser('migrate', help="把旧的单表 books 迁移为规范化存储")
+    migrate_parser.add_argument('--no-vacuum', action='store_true', help="迁移后不执行 VACUUM")
+    args = parser.parse_args(argv)
+
+    from src.database.db_manager import DatabaseManager
+    from src.utils.logger import Logger
+
+    Logger.setup_logging()
+    store = DatabaseManager.instance().book_store
+    if args.command == 'migrate':
+        before = store.storage_info()['file_bytes']
+        migrated = store.migrate(vacuum=not args.no_vacuum)
+        after = store.storage_info()['file_bytes']
+        print(f"已迁移 {migrated} 本图书，数据库文件 {before / 1e6:.1f}MB -> {after / 1e6:.1f}MB")
+    info = store.storage_info()
+    print(f"存储方式: {info['layout']}")
+    print(f"文件大小: {info['file_bytes'] / 1e6:.1f}MB（空闲页 {info['free_bytes'] / 1e6:.1f}MB）")
+    for table, count in info['rows'].items():
+        print(f"{table}: {count} 行")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import queue
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable
+
+class ConnectionPool:
+    """
+    SQLite 连接池：一个写连接 + 若干只读连接，数据库使用 WAL 模式
+
+    连接在池中长期保持打开，sqlite3 会按SQL文本在每个连接上缓存预编译语句
+    （cached_statements），因此连接建立和语句准备的开销只发生一次。
+    所有连接均允许跨线程使用，但同一时刻只会借给一个线程。
+    setup 为每个连接建立后调用的函数 setup(conn, read_only)，用于挂载附加数据库等
+    连接级的配置，配置变化后可调用 refresh() 对所有连接重新执行。
+    """
+
+    def __init__(self, db_path: Path, readers: int = 4, cached_statements: int = 256,
+                 busy_timeout: float = 30.0, setup: Callable = None):
+        self.db_path = Path(db_path)
+        self.cached_statements = cached_statements
+        self.busy_timeout = busy_timeout
+        self.setup = setup
+        self.logger = logging.getLogger(__name__)
+
+        self._write_lock = threading.RLock()
+        self._writer = self._connect()
+        # 只对新建的空数据库生效，之后删除数据释放的页可以用 PRAGMA incremental_vacuum 归还
+        self._writer.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self._writer.execute('PRAGMA journal_mode=WAL')
+        self._writer.execute('PRAGMA synchronous=NORMAL')
+
+        self._readers = queue.Queue()
+        self._all_readers = []
+        # 记录当前线程借出的只读连接数，用于发现 maintenance 的自锁
+        self._local = threading.local()
+        for _ in range(max(1, readers)):
+            conn = self._connect(read_only=True)
+            self._readers.put(conn)
+            self._all_readers.append(conn)
+
+        # 专用于读取 PRAGMA data_version：其他任何连接（包括其他进程）提交后该值都会变化
+        self._version_lock = threading.Lock()
+        self._version_conn = self._connect(read_only=True, with_setup=False)
+
+    def _connect(self, read_only: bool = False, with_setup: bool = True) -> sqlite3.Connection:
+        """创建并配置一个连接"""
+        if read_only:
+            conn = sqlite3.connect(
+                f"{self.db_path.resolve().as_uri()}?mode=ro",
+                uri=True,
+                timeout=self.busy_timeout,
+                check_same_thread=False,
+                cached_statements=self.cached_statements
+            )
+        else:
+            conn = sqlite3.connect(
+                self.db_path.resolve().as_uri(),
+                uri=True,
+                timeout=self.busy_timeout,
+                check_same_thread=False,
+                cached_statements=self.cached_statements
+            )
+        conn.execute('PRAGMA temp_store=MEMORY')
+        if with_setup and self.setup is not None:
+            self.setup(conn, read_only)
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """借出一个只读连接，使用完毕后自动归还"""
+        conn = self._readers.get()
+        self._local.borrowed = getattr(self._local, 'borrowed', 0) + 1
+        try:
+            yield conn
+        finally:
+            self._local.borrowed -= 1
+            # 结束可能残留的读事务，避免长期持有旧快照
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    @contextmanager
+    def writer(self):
+        """独占写连接，正常退出时提交事务，异常时回滚"""
+        with self._write_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+
+    @contextmanager
+    def maintenance(self, timeout: float = None):
+        """
+        独占写连接并收回全部只读连接（会等待借出的连接归还），用于维护操作
+
+        写连接不会自动提交，由调用方管理事务；退出时对所有连接重新执行 setup。
+        不能在持有只读连接（reader() 块内）时调用，否则会等待自己归还连接而死锁，
+        这种情况会直接抛出 RuntimeError。
+
+        Args:
+            timeout: 等待其他线程归还只读连接的最长秒数，默认使用 busy_timeout，
+                超时抛出 TimeoutError
+        """
+        if getattr(self._local, 'borrowed', 0):
+            raise RuntimeError("当前线程持有只读连接，不能进入维护模式")
+        timeout = self.busy_timeout if timeout is None else timeout
+        with self._write_lock:
+            readers = []
+            try:
+                for _ in self._all_readers:
+                    readers.append(self._readers.get(timeout=timeout))
+            except queue.Empty:
+                for conn in readers:
+                    self._readers.put(conn)
+                raise TimeoutError(f"等待只读连接归还超时（{timeout}秒）")
+            try:
+                yield self._writer
+            finally:
+                if self._writer.in_transaction:
+                    self._writer.rollback()
+                try:
+                    if self.setup is not None:
+                        self.setup(self._writer, False)
+                        for conn in readers:
+                            self.setup(conn, True)
+                finally:
+                    for conn in readers:
+                        self._readers.put(conn)
+
+    def refresh(self):
+        """对所有连接重新执行 setup"""
+        with self.maintenance():
+            pass
+
+    def data_version(self) -> int:
+        """数据库的数据版本号，任何连接提交写事务后都会改变"""
+        with self._version_lock:
+            return self._version_conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def close(self):
+        """关闭池中所有连接"""
+        with self._write_lock:
+            self._writer.close()
+        with self._version_lock:
+            self._version_conn.close()
+        for conn in self._all_readers:
+            conn.close()
@@ -1,48 +1,114 @@
-import sqlite3
-import pandas as pd
 from typing import List, Dict
 import logging
-from datetime import datetime
 from src.utils.path_manager import PathManager
+from src.config.settings import Settings
+from src.export.stream_exporter import StreamingExporter
+from src.database.price_history import PriceHistoryStore
+from src.database.book_details import BookDetailStore
+from src.database.stat_sketches import StatSketchStore
+from src.database.book_storage import NormalizedBookStore
+from src.database.partitions import PartitionStore
+from src.analysis.near_duplicates import NearDuplicateDetector
+from src.database.connection_pool import ConnectionPool
+from src.utils.metrics import Metrics
+import threading
+
+# 将文本价格（如"¥45.60"）转换为数值的SQL表达式
+PRICE_VALUE_SQL = "CAST(LTRIM(TRIM(price), '¥￥') AS REAL)"
 
 class DatabaseManager:
-    def __init__(self):
-        paths = PathManager.initialize_project_directories()
-        self.db_path = paths['data_dir'] / 'books.db'
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, db_path=None):
+        if db_path is None:
+            paths = PathManager.initialize_project_directories()
+            db_path = paths['data_dir'] / 'books.db'
+        self.db_path = db_path
         self.logger = logging.getLogger(__name__)
+        # 每个连接建立时挂载按月分区的文件（见 PartitionStore.attach）
+        self.pool = ConnectionPool(self.db_path, readers=Settings.DB_READER_COUNT, setup=PartitionStore.attach)
+        self.price_history = PriceHistoryStore(self)
+        self.book_details = BookDetailStore(self)
+        self.stat_sketches = StatSketchStore(self)
+        self.book_store = NormalizedBookStore(self)
+        self.partitions = PartitionStore(self)
+        self.normalized_layout = False
         self.init_database()
+
+    @classmethod
+    def instance(cls) -> 'DatabaseManager':
+        """获取进程内共享的数据库管理器，目录和表结构只初始化一次"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
         
     def init_database(self):
         """初始化数据库，创建必要的表"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.writer() as conn:
                 cursor = conn.cursor()
                 
-                # 创建图书表
+                # 创建图书表：新数据库按配置选择存储方式，已有的旧单表保持不变（可手动迁移）
+                layout = NormalizedBookStore.layout(conn)
+                if layout is None:
+                    layout = Settings.DB_STORAGE_LAYOUT
+                if layout == 'normalized':
+                    NormalizedBookStore.init_tables(conn)
+                else:
+                    cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS books (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        title TEXT NOT NULL,
+                        author TEXT,
+                        price TEXT,
+                        rating TEXT,
+                        url TEXT,
+                        platform TEXT,
+                        crawl_time DATETIME,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                    )
+                    ''')
+                    
+                    # 创建索引
+                    cursor.execute('CREATE INDEX IF NOT EXISTS idx_title ON books(title)')
+                    cursor.execute('CREATE INDEX IF NOT EXISTS idx_platform ON books(platform)')
+                self.normalized_layout = layout == 'normalized'
+                
+                # 创建按月分区目录表和每日汇总表
+                PartitionStore.init_tables(conn)
+                
+                # 创建价格时间序列表
+                PriceHistoryStore.init_tables(conn)
+                
+                # 创建商品详情表
+                BookDetailStore.init_tables(conn)
+                
+                # 创建统计摘要表
+                StatSketchStore.init_tables(conn)
+                
+                # 创建近似重复图书聚类表
+                NearDuplicateDetector.init_tables(conn)
+                
+                # 分布式采集已入库的任务
                 cursor.execute('''
-                CREATE TABLE IF NOT EXISTS books (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    author TEXT,
-                    price TEXT,
-                    rating TEXT,
-                    url TEXT,
-                    platform TEXT,
-                    crawl_time DATETIME,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
+                CREATE TABLE IF NOT EXISTS ingested_tasks (
+                    task_id TEXT PRIMARY KEY,
+                    book_count INTEGER NOT NULL,
+                    ingested_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                ) WITHOUT ROWID
                 ''')
                 
-                # 创建索引
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_title ON books(title)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_platform ON books(platform)')
-                
-                conn.commit()
-                self.logger.info("数据库初始化成功")
+            # 表结构就绪后为所有连接挂载分区、创建合并视图
+            self.pool.refresh()
+            self.logger.info("数据库初始化成功")
                 
         except Exception as e:
             self.logger.error(f"数据库初始化失败: {str(e)}")
             
+    @Metrics.timed('insert')
     def save_books(self, books: List[Dict]) -> bool:
         """
         保存图书数据到数据库
@@ -54,52 +120,206 @@ class DatabaseManager:
             bool: 是否保存成功
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                for book in books:
-                    cursor.execute('''
-                    INSERT INTO books (title, author, price, rating, url, platform, crawl_time)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        book['title'],
-                        book['author'],
-                        book['price'],
-                        book['rating'],
-                        book['url'],
-                        book['platform'],
-                        book['crawl_time']
-                    ))
-                
-                conn.commit()
+            with self.writer() as conn:
+                self._insert_books(conn, books)
                 self.logger.info(f"成功保存 {len(books)} 条图书数据")
                 return True
                 
         except Exception as e:
             self.logger.error(f"保存图书数据失败: {str(e)}")
             return False
+
+    def _insert_books(self, conn, books: List[Dict]):
+        """在调用方的事务中写入图书数据和价格变化"""
+        if self.normalized_layout:
+            self.book_store.insert(conn, books)
+        else:
+            conn.executemany('''
+            INSERT INTO books (title, author, price, rating, url, platform, crawl_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                book['title'],
+                book['author'],
+                book['price'],
+                book['rating'],
+                book['url'],
+                book['platform'],
+                book['crawl_time']
+            ) for book in books])
+        
+        # 记录价格/评分变化
+        self.price_history.record(conn, books)
+        
+        # 更新价格分位数和作者/出版社数量的摘要
+        self.stat_sketches.record(conn, books)
+        
+        Metrics.inc('books_saved_total', len(books))
+
+    @Metrics.timed('insert')
+    def ingest_task_result(self, task_id: str, books: List[Dict]) -> bool:
+        """
+        写入分布式采集任务的结果，每个任务只会入库一次
+        
+        任务编号与图书数据在同一事务中写入，重复提交同一任务的结果会被忽略。
+        
+        Args:
+            task_id: 任务编号
+            books: 图书数据列表
             
-    def export_to_csv(self, output_path: str) -> bool:
+        Returns:
+            bool: 本次是否实际写入（任务已入库过时返回 False）
         """
-        导出数据库数据到CSV文件
+        with self.writer() as conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO ingested_tasks (task_id, book_count) VALUES (?, ?)',
+                (task_id, len(books))
+            )
+            if cursor.rowcount == 0:
+                self.logger.info(f"任务 {task_id} 的结果已入库，跳过")
+                return False
+            self._insert_books(conn, books)
+            self.logger.info(f"任务 {task_id}: 成功保存 {len(books)} 条图书数据")
+            return True
+            
+    def insert_rows(self, columns: List[str], rows: List[tuple], conn=None) -> int:
+        """
+        按列名批量插入原始数据行（用于快照导入）
+
+        Args:
+            columns: 列名列表，必须是图书表中已有的列
+            rows: 数据行列表，顺序与 columns 一致
+            conn: 调用方已持有的写连接（由调用方提交），默认自行开启并提交一个写事务
+
+        Returns:
+            int: 插入的行数
+        """
+        if conn is None:
+            with self.writer() as conn:
+                return self.insert_rows(columns, rows, conn)
+
+        table_columns = {row[1] for row in conn.execute("PRAGMA table_info(books)")}
+        unknown = [name for name in columns if name not in table_columns]
+        if unknown:
+            raise ValueError(f"图书表中不存在列: {', '.join(unknown)}")
+
+        books = [dict(zip(columns, row)) for row in rows]
+        if self.normalized_layout:
+            self.book_store.insert(conn, books)
+        else:
+            placeholders = ', '.join('?' for _ in columns)
+            conn.executemany(
+                f"INSERT INTO books ({', '.join(columns)}) VALUES ({placeholders})",
+                rows
+            )
+        self.stat_sketches.record(conn, books)
+        return len(rows)
+
+    def export_to_csv(self, output_path: str, progress_callback=None) -> bool:
+        """
+        导出数据库数据到CSV文件（分批流式写入）
         
         Args:
             output_path: CSV文件保存路径
+            progress_callback: 进度回调函数，参数为0-100的整数
             
         Returns:
             bool: 是否导出成功
         """
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                df = pd.read_sql_query("SELECT * FROM books", conn)
-                df.to_csv(output_path, index=False, encoding='utf-8-sig')
-                self.logger.info(f"成功导出数据到 {output_path}")
-                return True
-                
-        except Exception as e:
-            self.logger.error(f"导出CSV文件失败: {str(e)}")
-            return False 
+        exporter = StreamingExporter(self, progress_callback=progress_callback)
+        return exporter.export_csv(output_path)
+
+    @property
+    def book_rows_table(self) -> str:
+        """
+        只需要行数或 id 时查询的表：规范化存储直接读图书行（含各分区），
+        避免 books 视图为每一行连接维度表
+        """
+        return 'book_rows_all' if self.normalized_layout else 'books'
+
+    def count_books(self) -> int:
+        """获取图书表的总行数"""
+        with self.reader() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {self.book_rows_table}").fetchone()[0]
+
+    def get_book_columns(self) -> List[str]:
+        """获取图书表的列名"""
+        with self.reader() as conn:
+            cursor = conn.execute("SELECT * FROM books LIMIT 0")
+            return [desc[0] for desc in cursor.description]
+
+    def iter_book_chunks(self, chunk_size: int = None,
+                         query: str = "SELECT * FROM books", params: tuple = ()):
+        """
+        按固定批次大小遍历查询结果，避免一次性加载整张表
+        
+        Args:
+            chunk_size: 每批行数，默认使用 Settings.EXPORT_CHUNK_SIZE
+            query: 查询语句
+            params: 查询参数
+            
+        Yields:
+            Tuple[List[str], List[tuple]]: (列名列表, 当前批次的数据行)
+        """
+        chunk_size = chunk_size or Settings.EXPORT_CHUNK_SIZE
+        with self.reader() as conn:
+            cursor = conn.execute(query, params)
+            columns = [desc[0] for desc in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield columns, rows
+
+    def get_price_summary(self) -> Dict:
+        """使用SQL聚合计算价格统计量，无需把整张表读入内存"""
+        with self.reader() as conn:
+            row = conn.execute(f'''
+            SELECT COUNT(*), AVG(v), MIN(v), MAX(v), AVG(v * v)
+            FROM (SELECT {PRICE_VALUE_SQL} AS v FROM books WHERE price IS NOT NULL)
+            ''').fetchone()
+            count, mean, min_price, max_price, mean_sq = row
+            std = None
+            if count > 1:
+                # 样本标准差，与 pandas.describe 保持一致
+                variance = (mean_sq - mean * mean) * count / (count - 1)
+                std = max(variance, 0.0) ** 0.5
+            return {
+                'count': count,
+                'mean': mean,
+                'std': std,
+                'min': min_price,
+                'max': max_price
+            }
+
+    def get_platform_counts(self) -> Dict[str, int]:
+        """按平台统计图书数量"""
+        with self.reader() as conn:
+            if self.normalized_layout:
+                # 按平台外键分组，不必还原平台名称（未分区时只需扫描 idx_book_rows_platform 索引）
+                rows = conn.execute('''
+                SELECT f.name, COUNT(*) AS cnt FROM book_rows_all r
+                LEFT JOIN book_platforms f ON f.id = r.platform_id
+                GROUP BY r.platform_id ORDER BY cnt DESC
+                ''').fetchall()
+            else:
+                rows = conn.execute('''
+                SELECT platform, COUNT(*) AS cnt FROM books
+                GROUP BY platform ORDER BY cnt DESC
+                ''').fetchall()
+            return dict(rows)
+
+    def data_version(self) -> int:
+        """数据版本号，数据库有新的写入（包括其他进程的写入）后会改变"""
+        return self.pool.data_version()
+
+    def reader(self):
+        """借用连接池中的只读连接（上下文管理器）"""
+        return self.pool.reader()
+
+    def writer(self):
+        """独占连接池中的写连接（上下文管理器，退出时提交）"""
+        return self.pool.writer()
 
     def get_connection(self):
-        """获取数据库连接"""
-        return sqlite3.connect(self.db_path)
\ No newline at end of file
+        """获取数据库只读连接，需配合 with 语句使用"""
+        return self.pool.reader()
\ No newline at end of file
@@ -0,0 +1,333 @@
+"""
+按月分区的图书存储与数据保留
+
+主数据库中的 book_rows 只保存当月（以及尚未轮转）的采集数据。轮转时把之前各月的
+数据按采集时间移到 partitions/books_YYYYMM.db；连接池中的每个连接建立时 ATTACH
+保留期内的分区，并用临时视图 book_rows_all（主库与各分区 UNION ALL）和 books
+覆盖主库中的同名视图，因此通过连接池的查询仍然能看到保留期内的全部数据。
+
+超过保留期的月份按天、平台和出版社汇总到主库的 book_daily_stats，原始数据归档到
+partitions/archive/ 或直接删除。主库使用增量 VACUUM，移出数据后空出的页立即归还，
+活跃文件保持较小，容易常驻页缓存。
+
+分区只支持规范化存储（见 book_storage）。建议每月执行一次轮转，命令行用法（在项目根目录执行）：
+    python -m src.database.partitions show
+    python -m src.database.partitions rotate
+"""
+import argparse
+import logging
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+from src.config.settings import Settings
+from src.database.book_storage import (
+    BOOK_ROW_COLUMNS, BOOK_ROW_COLUMNS_SQL, BOOKS_VIEW_SQL, INSERT_TRIGGER_SQL, NormalizedBookStore
+)
+from src.utils.metrics import Metrics
+
+# SQLite 默认最多 ATTACH 10 个数据库，轮转时还要临时挂载目标分区和归档文件
+MAX_ATTACHED_PARTITIONS = 8
+
+# 采集时间（整数时间戳）所在的本地月份和日期（距1970-01-01的天数）
+MONTH_SQL = "strftime('%Y%m', crawl_time, 'unixepoch', 'localtime')"
+DAY_SQL = "CAST(julianday(crawl_time, 'unixepoch', 'localtime') - 2440587.5 AS INTEGER)"
+ROW_COLUMNS = ', '.join(BOOK_ROW_COLUMNS)
+
+def partition_dir(db_path: Path) -> Path:
+    """主数据库对应的分区目录"""
+    return Path(db_path).resolve().parent / 'partitions'
+
+class PartitionStore:
+    """按月分区的图书数据：分区目录、轮转、汇总和归档"""
+
+    def __init__(self, db_manager):
+        if Settings.PARTITION_RETENTION_MONTHS > MAX_ATTACHED_PARTITIONS:
+            raise ValueError(f"PARTITION_RETENTION_MONTHS 不能超过 {MAX_ATTACHED_PARTITIONS}")
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+        self.directory = partition_dir(db_manager.db_path)
+
+    @staticmethod
+    def init_tables(conn: sqlite3.Connection):
+        """创建分区目录表和每日汇总表"""
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS book_partitions (
+            month TEXT PRIMARY KEY,         -- YYYYMM
+            file_name TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            state TEXT NOT NULL,            -- attached（挂载中）/ archived（已归档）/ dropped（已删除）
+            updated_at INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''')
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS book_daily_stats (
+            day INTEGER NOT NULL,           -- 采集日期（本地时间），距1970-01-01的天数
+            platform_id INTEGER NOT NULL,   -- 0 表示未知
+            publisher_id INTEGER NOT NULL,  -- 0 表示未知
+            observations INTEGER NOT NULL,
+            priced INTEGER NOT NULL,
+            price_sum REAL NOT NULL,
+            price_min REAL,
+            price_max REAL,
+            PRIMARY KEY (day, platform_id, publisher_id)
+        ) WITHOUT ROWID
+        ''')
+
+    @staticmethod
+    def _detach_all(conn: sqlite3.Connection):
+        conn.execute('DROP VIEW IF EXISTS temp.books')
+        conn.execute('DROP VIEW IF EXISTS temp.book_rows_all')
+        for row in conn.execute('PRAGMA database_list').fetchall():
+            if row[1].startswith('part_'):
+                conn.execute(f'DETACH DATABASE {row[1]}')
+
+    @classmethod
+    def attach(cls, conn: sqlite3.Connection, read_only: bool = True):
+        """
+        挂载保留期内的分区，并创建合并主库和各分区的临时视图（作为连接池的 setup）
+
+        Args:
+            conn: 主数据库连接
+            read_only: 是否以只读方式挂载
+        """
+        cls._detach_all(conn)
+        tables = {row[0] for row in conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE name IN ('book_rows', 'book_partitions')")}
+        if tables != {'book_rows', 'book_partitions'}:
+            return
+        main_path = next(row[2] for row in conn.execute('PRAGMA database_list') if row[1] == 'main')
+        directory = partition_dir(main_path)
+        arms = [f'SELECT {ROW_COLUMNS} FROM main.book_rows']
+        for month, file_name in conn.execute(
+                "SELECT month, file_name FROM book_partitions WHERE state = 'attached' ORDER BY month").fetchall():
+            path = directory / file_name
+            if not path.exists():
+                logging.getLogger(__name__).warning(f"分区文件不存在，已跳过: {path}")
+                continue
+            uri = path.as_uri() + ('?mode=ro' if read_only else '')
+            conn.execute(f'ATTACH DATABASE ? AS part_{month}', (uri,))
+            arms.append(f'SELECT {ROW_COLUMNS} FROM part_{month}.book_rows')
+        conn.execute(f"CREATE TEMP VIEW book_rows_all AS {' UNION ALL '.join(arms)}")
+        conn.execute(f"CREATE TEMP VIEW books AS {BOOKS_VIEW_SQL.format(rows='book_rows_all')}")
+        conn.execute(INSERT_TRIGGER_SQL.format(temp='TEMP'))
+
+    @staticmethod
+    def _attach_file(conn: sqlite3.Connection, path: Path, alias: str):
+        """读写方式挂载一个分区文件（不存在时创建）"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn.execute(f'ATTACH DATABASE ? AS {alias}', (str(path),))
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {alias}.book_rows (id INTEGER PRIMARY KEY, {BOOK_ROW_COLUMNS_SQL})')
+
+    @staticmethod
+    def _rollup(conn: sqlite3.Connection, source: str, where: str, params: tuple):
+        """把原始数据按天、平台和出版社累加到 book_daily_stats"""
+        from src.database.db_manager import PRICE_VALUE_SQL
+
+        conn.execute(f'''
+        INSERT INTO book_daily_stats (day, platform_id, publisher_id, observations, priced, price_sum, price_min, price_max)
+        SELECT day, platform_id, publisher_id, COUNT(*), COUNT(v), TOTAL(v), MIN(v), MAX(v)
+        FROM (
+            SELECT {DAY_SQL} AS day, COALESCE(platform_id, 0) AS platform_id,
+                   COALESCE(publisher_id, 0) AS publisher_id,
+                   CASE WHEN price IS NOT NULL THEN {PRICE_VALUE_SQL} END AS v
+            FROM {source} WHERE {where}
+        )
+        GROUP BY day, platform_id, publisher_id
+        ON CONFLICT (day, platform_id, publisher_id) DO UPDATE SET
+            observations = observations + excluded.observations,
+            priced = priced + excluded.priced,
+            price_sum = price_sum + excluded.price_sum,
+            price_min = MIN(COALESCE(price_min, excluded.price_min), COALESCE(excluded.price_min, price_min)),
+            price_max = MAX(COALESCE(price_max, excluded.price_max), COALESCE(excluded.price_max, price_max))
+        ''', params)
+
+    def _set_state(self, conn: sqlite3.Connection, month: str, row_count: int, state: str):
+        conn.execute('''
+        INSERT OR REPLACE INTO book_partitions (month, file_name, row_count, state, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (month, f'books_{month}.db', row_count, state, int(time.time())))
+
+    def _expire(self, conn: sqlite3.Connection, source: str, where: str = '1', params: tuple = ()):
+        """
+        在当前事务中汇总原始数据，并按配置归档
+
+        归档文件与主库分别提交，中途失败时重新执行轮转即可（归档按 id 覆盖写入）。
+        """
+        self._rollup(conn, source, where, params)
+        if Settings.PARTITION_ARCHIVE:
+            conn.execute(f'INSERT OR REPLACE INTO part_archive.book_rows ({ROW_COLUMNS}) '
+                         f'SELECT {ROW_COLUMNS} FROM {source} WHERE {where}', params)
+
+    @Metrics.timed('db.rotate_partitions')
+    def rotate(self, now: datetime = None) -> Dict[str, int]:
+        """
+        轮转：把当月之前的数据移到分区文件，超过保留期的月份汇总后归档或删除，最后归还空闲页
+
+        轮转期间收回连接池中的全部连接，查询会等待轮转完成。
+
+        Args:
+            now: 当前时间，默认为系统时间
+
+        Returns:
+            Dict[str, int]: moved（移入分区的行数）、expired（汇总后移出的行数）、freed_pages（归还的页数）
+        """
+        now = now or datetime.now()
+        month_start = int(datetime(now.year, now.month, 1).timestamp())
+        # 最早仍保留原始数据的月份
+        first_kept = now.year * 12 + now.month - 1 - Settings.PARTITION_RETENTION_MONTHS
+        cutoff = f'{first_kept // 12:04d}{first_kept % 12 + 1:02d}'
+        summary = {'moved': 0, 'expired': 0, 'freed_pages': 0}
+
+        with self.db_manager.pool.maintenance() as conn:
+            if NormalizedBookStore.layout(conn) != 'normalized':
+                raise ValueError("按月分区需要规范化存储，请先执行 python -m src.database.book_storage migrate")
+            self._detach_all(conn)
+            archive_dir = self.directory / 'archive'
+
+            # 1. 主库中当月之前的数据按月移出
+            where = f"typeof(crawl_time) = 'integer' AND crawl_time < ? AND {MONTH_SQL} = ?"
+            months = [row[0] for row in conn.execute(
+                f"SELECT DISTINCT {MONTH_SQL} FROM book_rows WHERE typeof(crawl_time) = 'integer' AND crawl_time < ?",
+                (month_start,))]
+            for month in sorted(months):
+                params = (month_start, month)
+                expired = month < cutoff
+                if expired:
+                    if Settings.PARTITION_ARCHIVE:
+                        self._attach_file(conn, archive_dir / f'books_{month}.db', 'part_archive')
+                else:
+                    self._attach_file(conn, self.directory / f'books_{month}.db', 'part_target')
+                try:
+                    conn.execute('BEGIN')
+                    if expired:
+                        self._expire(conn, 'main.book_rows', where, params)
+                    else:
+                        conn.execute(f'INSERT OR REPLACE INTO part_target.book_rows ({ROW_COLUMNS}) '
+                                     f'SELECT {ROW_COLUMNS} FROM main.book_rows WHERE {where}', params)
+                        row_count = conn.execute('SELECT COUNT(*) FROM part_target.book_rows').fetchone()[0]
+                        self._set_state(conn, month, row_count, 'attached')
+                    moved = conn.execute(f'DELETE FROM main.book_rows WHERE {where}', params).rowcount
+                    conn.commit()
+                finally:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    self._detach_all(conn)
+                summary['expired' if expired else 'moved'] += moved
+                self.logger.info(f"{month}: {'汇总并移出' if expired else '移入分区'} {moved} 行")
+
+            # 2. 超过保留期的分区汇总后归档或删除
+            for month, file_name, row_count in conn.execute(
+                    "SELECT month, file_name, row_count FROM book_partitions "
+                    "WHERE state = 'attached' AND month < ? ORDER BY month", (cutoff,)).fetchall():
+                path = self.directory / file_name
+                if path.exists():
+                    self._attach_file(conn, path, 'part_source')
+                    if Settings.PARTITION_ARCHIVE:
+                        self._attach_file(conn, archive_dir / file_name, 'part_archive')
+                    try:
+                        conn.execute('BEGIN')
+                        self._expire(conn, 'part_source.book_rows')
+                        self._set_state(conn, month, row_count, 'archived' if Settings.PARTITION_ARCHIVE else 'dropped')
+                        conn.commit()
+                    finally:
+                        if conn.in_transaction:
+                            conn.rollback()
+                        self._detach_all(conn)
+                    path.unlink()
+                else:
+                    self.logger.warning(f"分区文件不存在，仅更新状态: {path}")
+                    self._set_state(conn, month, row_count, 'dropped')
+                    conn.commit()
+                summary['expired'] += row_count
+                self.logger.info(f"{month}: 分区超过保留期，已汇总并{'归档' if Settings.PARTITION_ARCHIVE else '删除'}")
+
+            # 3. 归还空闲页
+            summary['freed_pages'] = self._vacuum(conn)
+        return summary
+
+    def _vacuum(self, conn: sqlite3.Connection) -> int:
+        """增量 VACUUM 主库；启用增量 VACUUM 之前创建的数据库先整体 VACUUM 一次"""
+        freed = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            self.logger.info("主库尚未启用增量 VACUUM，执行一次完整 VACUUM")
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.execute('VACUUM')
+        else:
+            # sqlite3 模块的 execute 只执行一步（每步只归还一页），executescript 会执行到底
+            conn.executescript('PRAGMA incremental_vacuum')
+        # 截断 WAL 文件
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+        return freed
+
+    def attached_months(self) -> List[str]:
+        """当前挂载的分区月份"""
+        with self.db_manager.reader() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT month FROM book_partitions WHERE state = 'attached' ORDER BY month")]
+
+    def partitions(self) -> List[Dict]:
+        """全部分区的状态"""
+        with self.db_manager.reader() as conn:
+            rows = conn.execute(
+                'SELECT month, file_name, row_count, state, updated_at FROM book_partitions ORDER BY month').fetchall()
+        return [dict(zip(('month', 'file_name', 'row_count', 'state', 'updated_at'), row)) for row in rows]
+
+    def daily_stats(self, start: date = None, end: date = None) -> List[Dict]:
+        """
+        按天汇总的历史数据（只包含已移出保留期的月份）
+
+        Args:
+            start: 起始日期（含），默认不限
+            end: 结束日期（含），默认不限
+
+        Returns:
+            List[Dict]: 每天、每个平台和出版社一行，含 observations、avg_price、min_price、max_price
+        """
+        epoch = date(1970, 1, 1)
+        low = (start - epoch).days if start else -2 ** 31
+        high = (end - epoch).days if end else 2 ** 31
+        with self.db_manager.reader() as conn:
+            rows = conn.execute('''
+            SELECT s.day, f.name, p.name, s.observations, s.priced, s.price_sum, s.price_min, s.price_max
+            FROM book_daily_stats s
+            LEFT JOIN book_platforms f ON f.id = s.platform_id
+            LEFT JOIN book_publishers p ON p.id = s.publisher_id
+            WHERE s.day BETWEEN ? AND ? ORDER BY s.day, s.platform_id, s.publisher_id
+            ''', (low, high)).fetchall()
+        return [{
+            'date': epoch + timedelta(days=day),
+            'platform': platform,
+            'publisher': publisher,
+            'observations': observations,
+            'avg_price': price_sum / priced if priced else None,
+            'min_price': price_min,
+            'max_price': price_max
+        } for day, platform, publisher, observations, priced, price_sum, price_min, price_max in rows]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按月分区的图书存储")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('show', help="显示各分区的状态")
+    subparsers.add_parser('rotate', help="把当月之前的数据移到分区，汇总并移出超过保留期的月份")
+    args = parser.parse_args(argv)
+
+    from src.database.db_manager import DatabaseManager
+    from src.utils.logger import Logger
+
+    Logger.setup_logging()
+    db_manager = DatabaseManager.instance()
+    store = db_manager.partitions
+    if args.command == 'rotate':
+        summary = store.rotate()
+        print(f"移入分区 {summary['moved']} 行，汇总并移出 {summary['expired']} 行，归还 {summary['freed_pages']} 页")
+    for partition in store.partitions():
+        print(f"{partition['month']}: {partition['state']}, {partition['row_count']} 行")
+    info = db_manager.book_store.storage_info()
+    print(f"主库: {info['rows'].get('book_rows', 0)} 行, {info['file_bytes'] / 1e6:.1f}MB")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
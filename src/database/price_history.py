@@ -0,0 +1,262 @@
+import re
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+class PriceHistoryStore:
+    """
+    图书价格/评分时间序列存储
+
+    每本图书（以商品URL为键）在 price_books 中占一行，保存最近一次观测值；
+    price_series 只在价格或评分发生变化时追加一条记录，并保存相对上一条记录的
+    价格差值（delta_cents），因此"N天内降价/涨价"可以直接在覆盖索引上完成。
+    价格以"分"、评分以"十分之一分"的整数存储。
+    """
+
+    TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def init_tables(conn: sqlite3.Connection):
+        """创建时间序列相关的表和索引"""
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS price_books (
+            book_id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL UNIQUE,
+            title TEXT,
+            last_price_cents INTEGER,
+            last_rating_x10 INTEGER,
+            first_seen INTEGER NOT NULL,
+            last_seen INTEGER NOT NULL
+        )
+        ''')
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS price_series (
+            book_id INTEGER NOT NULL,
+            observed_at INTEGER NOT NULL,
+            price_cents INTEGER,
+            rating_x10 INTEGER,
+            delta_cents INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (book_id, observed_at)
+        ) WITHOUT ROWID
+        ''')
+        # 覆盖索引：按时间窗口汇总价格变化时无需回表
+        conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_price_series_changes
+        ON price_series(observed_at, book_id, delta_cents)
+        ''')
+
+    @staticmethod
+    def _to_cents(price: str) -> Optional[int]:
+        """将文本价格转换为以分为单位的整数"""
+        match = re.search(r'\d+\.?\d*', price or '')
+        return int(round(float(match.group()) * 100)) if match else None
+
+    @staticmethod
+    def _to_rating_x10(rating: str) -> Optional[int]:
+        """将文本评分转换为放大10倍的整数"""
+        match = re.search(r'\d+\.?\d*', rating or '')
+        return int(round(float(match.group()) * 10)) if match else None
+
+    @classmethod
+    def _to_epoch(cls, crawl_time) -> int:
+        """将采集时间转换为Unix时间戳"""
+        if isinstance(crawl_time, (int, float)):
+            return int(crawl_time)
+        return int(datetime.strptime(crawl_time, cls.TIME_FORMAT).timestamp())
+
+    def record(self, conn: sqlite3.Connection, books: List[Dict]) -> int:
+        """
+        记录一批观测值，仅在价格或评分变化时追加时间序列记录
+
+        Args:
+            conn: 数据库连接（由调用方负责提交事务）
+            books: 图书数据列表
+
+        Returns:
+            int: 新增的时间序列记录数
+        """
+        appended = 0
+        for book in books:
+            url = book.get('url')
+            if not url:
+                continue
+            try:
+                observed_at = self._to_epoch(book.get('crawl_time'))
+            except (TypeError, ValueError):
+                continue
+            price_cents = self._to_cents(book.get('price'))
+            rating_x10 = self._to_rating_x10(book.get('rating'))
+
+            row = conn.execute(
+                'SELECT book_id, last_price_cents, last_rating_x10, last_seen '
+                'FROM price_books WHERE url = ?', (url,)
+            ).fetchone()
+
+            if row is None:
+                cursor = conn.execute('''
+                INSERT INTO price_books (url, title, last_price_cents, last_rating_x10, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', (url, book.get('title'), price_cents, rating_x10, observed_at, observed_at))
+                conn.execute('''
+                INSERT OR REPLACE INTO price_series (book_id, observed_at, price_cents, rating_x10, delta_cents)
+                VALUES (?, ?, ?, ?, 0)
+                ''', (cursor.lastrowid, observed_at, price_cents, rating_x10))
+                appended += 1
+                continue
+
+            book_id, last_price, last_rating, last_seen = row
+            if observed_at < last_seen:
+                # 乱序的历史观测不改变"最新值"，直接忽略
+                continue
+
+            if price_cents != last_price or rating_x10 != last_rating:
+                # 价格无法解析（如"暂无"、缺货）时不计差值，否则会记成一次整价的降价和随后的涨价
+                delta = price_cents - last_price if price_cents is not None and last_price is not None else 0
+                conn.execute('''
+                INSERT OR REPLACE INTO price_series (book_id, observed_at, price_cents, rating_x10, delta_cents)
+                VALUES (?, ?, ?, ?, ?)
+                ''', (book_id, observed_at, price_cents, rating_x10, delta))
+                appended += 1
+
+            conn.execute('''
+            UPDATE price_books
+            SET last_price_cents = ?, last_rating_x10 = ?, last_seen = ?
+            WHERE book_id = ?
+            ''', (price_cents, rating_x10, observed_at, book_id))
+
+        return appended
+
+    def classify(self, books: List[Dict]) -> Dict[str, List[Dict]]:
+        """
+        将一批图书与已存储的最新价格比较，分为新书、价格变化和未变化三类
+
+        Args:
+            books: 图书数据列表
+
+        Returns:
+            Dict[str, List[Dict]]: {'new': [...], 'changed': [...], 'unchanged': [...]}
+        """
+        result = {'new': [], 'changed': [], 'unchanged': []}
+        urls = list({book['url'] for book in books if book.get('url')})
+        known = {}
+        with self.db_manager.reader() as conn:
+            # 分批查询，避免超过SQLite参数个数上限
+            for start in range(0, len(urls), 500):
+                batch = urls[start:start + 500]
+                placeholders = ', '.join('?' for _ in batch)
+                known.update(conn.execute(
+                    f'SELECT url, last_price_cents FROM price_books WHERE url IN ({placeholders})',
+                    batch
+                ).fetchall())
+
+        for book in books:
+            url = book.get('url')
+            if url not in known:
+                result['new'].append(book)
+            elif self._to_cents(book.get('price')) != known[url]:
+                result['changed'].append(book)
+            else:
+                result['unchanged'].append(book)
+        return result
+
+    def rebuild_from_books(self) -> int:
+        """根据 books 表中已有的数据重建时间序列（按采集时间顺序回放）"""
+        with self.db_manager.writer() as conn:
+            conn.execute('DELETE FROM price_series')
+            conn.execute('DELETE FROM price_books')
+            cursor = conn.execute('''
+            SELECT title, price, rating, url, crawl_time FROM books
+            WHERE url IS NOT NULL AND crawl_time IS NOT NULL
+            ORDER BY crawl_time, id
+            ''')
+            appended = 0
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    break
+                appended += self.record(conn, [
+                    dict(zip(('title', 'price', 'rating', 'url', 'crawl_time'), row))
+                    for row in rows
+                ])
+        self.logger.info(f"价格时间序列重建完成，共 {appended} 条记录")
+        return appended
+
+    def get_price_changes(self, days: int = 7, direction: str = 'drop',
+                          limit: int = 50) -> List[Dict]:
+        """
+        查询最近N天内价格下降或上涨的图书
+
+        Args:
+            days: 时间窗口（天）
+            direction: 'drop' 降价 / 'rise' 涨价
+            limit: 返回条数
+
+        Returns:
+            List[Dict]: 按变化幅度排序的图书列表
+        """
+        if direction not in ('drop', 'rise'):
+            raise ValueError(f"不支持的变化方向: {direction}")
+
+        since = int((datetime.now() - timedelta(days=days)).timestamp())
+        having = 'change_cents < 0' if direction == 'drop' else 'change_cents > 0'
+        order = 'ASC' if direction == 'drop' else 'DESC'
+
+        with self.db_manager.reader() as conn:
+            rows = conn.execute(f'''
+            SELECT c.book_id, b.title, b.url, b.last_price_cents, c.change_cents, c.changes
+            FROM (
+                SELECT book_id, SUM(delta_cents) AS change_cents, COUNT(*) AS changes
+                FROM price_series INDEXED BY idx_price_series_changes
+                WHERE observed_at >= ? AND delta_cents != 0
+                GROUP BY book_id
+                HAVING {having}
+                ORDER BY change_cents {order}
+                LIMIT ?
+            ) AS c
+            JOIN price_books AS b ON b.book_id = c.book_id
+            ORDER BY c.change_cents {order}
+            ''', (since, limit)).fetchall()
+
+        return [
+            {
+                'book_id': book_id,
+                'title': title,
+                'url': url,
+                'current_price': last_price / 100 if last_price is not None else None,
+                'change': change / 100,
+                'change_count': changes
+            }
+            for book_id, title, url, last_price, change, changes in rows
+        ]
+
+    def get_sparkline(self, url: str, days: int = None) -> List[Tuple[str, Optional[float]]]:
+        """
+        获取单本图书的价格走势（仅包含变化点）
+
+        Args:
+            url: 图书商品URL
+            days: 只返回最近N天，默认返回全部
+
+        Returns:
+            List[Tuple[str, float]]: [(观测时间, 价格), ...]
+        """
+        since = int((datetime.now() - timedelta(days=days)).timestamp()) if days else 0
+        with self.db_manager.reader() as conn:
+            rows = conn.execute('''
+            SELECT s.observed_at, s.price_cents
+            FROM price_books AS b
+            JOIN price_series AS s ON s.book_id = b.book_id
+            WHERE b.url = ? AND s.observed_at >= ?
+            ORDER BY s.observed_at
+            ''', (url, since)).fetchall()
+
+        return [
+            (datetime.fromtimestamp(observed_at).strftime(self.TIME_FORMAT),
+             price_cents / 100 if price_cents is not None else None)
+            for observed_at, price_cents in rows
+        ]
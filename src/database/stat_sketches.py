@@ -0,0 +1,179 @@
+"""
+图书统计摘要：价格分位数和作者/出版社数量
+
+命令行用法（在项目根目录执行）：
+    python -m src.database.stat_sketches show
+    python -m src.database.stat_sketches rebuild
+    python -m src.database.stat_sketches merge 其他机器/books.db
+"""
+import argparse
+import logging
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+from src.analysis.book_analyzer import clean_price, extract_author, extract_publisher
+from src.utils.sketches import HyperLogLog, KLLSketch
+
+class StatSketchStore:
+    """
+    随入库增量更新的统计摘要
+
+    每次写入图书时，在同一事务中更新价格的 KLL 分位数摘要和作者、出版社的
+    HyperLogLog，并保存在 stat_sketches 表中。查询中位数、P90/P99 价格和
+    作者/出版社数量时只需读取摘要，不必扫描图书表。
+    """
+
+    SKETCH_TYPES = {
+        'price': KLLSketch,
+        'authors': HyperLogLog,
+        'publishers': HyperLogLog,
+    }
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def init_tables(conn: sqlite3.Connection):
+        """创建摘要表"""
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS stat_sketches (
+            name TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            item_count INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''')
+
+    @classmethod
+    def _load(cls, conn: sqlite3.Connection) -> Dict:
+        """读取已保存的摘要，缺少的摘要为空"""
+        stored = dict(conn.execute('SELECT name, data FROM stat_sketches').fetchall())
+        return {
+            name: sketch_type.from_bytes(stored[name]) if name in stored else sketch_type()
+            for name, sketch_type in cls.SKETCH_TYPES.items()
+        }
+
+    @staticmethod
+    def _save(conn: sqlite3.Connection, sketches: Dict, item_count: int):
+        now = int(time.time())
+        conn.executemany('''
+        INSERT OR REPLACE INTO stat_sketches (name, data, item_count, updated_at) VALUES (?, ?, ?, ?)
+        ''', [(name, sketch.to_bytes(), item_count, now) for name, sketch in sketches.items()])
+
+    @staticmethod
+    def _update(sketches: Dict, books: List[Dict]):
+        for book in books:
+            author_info = book.get('author')
+            sketches['price'].update(clean_price(book.get('price')))
+            author = extract_author(author_info)
+            if author:
+                sketches['authors'].add(author)
+            publisher = extract_publisher(author_info)
+            if publisher != "未知出版社":
+                sketches['publishers'].add(publisher)
+
+    def record(self, conn: sqlite3.Connection, books: List[Dict]):
+        """
+        在调用方的写事务中把一批图书计入摘要
+
+        Args:
+            conn: 写连接（调用方负责提交）
+            books: 图书数据列表
+        """
+        if not books:
+            return
+        sketches = self._load(conn)
+        self._update(sketches, books)
+        self._save(conn, sketches, sketches['price'].n)
+
+    def merge(self, sketches: Dict):
+        """把其他数据库（或工作进程）的摘要合并进来"""
+        with self.db_manager.writer() as conn:
+            current = self._load(conn)
+            for name, sketch in sketches.items():
+                current[name].merge(sketch)
+            self._save(conn, current, current['price'].n)
+
+    def merge_from(self, db_path: Path):
+        """合并另一个数据库文件中保存的摘要"""
+        conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            self.merge(self._load(conn))
+        finally:
+            conn.close()
+
+    def rebuild(self) -> int:
+        """
+        扫描图书表重新生成摘要（用于启用摘要之前已有数据的数据库）
+
+        Returns:
+            int: 计入摘要的图书数
+        """
+        # 持有写锁，扫描期间不会有新的图书写入
+        with self.db_manager.writer() as conn:
+            sketches = {name: sketch_type() for name, sketch_type in self.SKETCH_TYPES.items()}
+            cursor = conn.execute('SELECT author, price FROM books')
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                self._update(sketches, [{'author': author, 'price': price} for author, price in rows])
+            self._save(conn, sketches, sketches['price'].n)
+        self.logger.info(f"已重新生成统计摘要（{sketches['price'].n} 本图书）")
+        return sketches['price'].n
+
+    def summary(self) -> Dict:
+        """
+        从摘要读取价格分位数和作者/出版社数量（均为近似值）
+
+        数据库中有图书但还没有摘要时，先扫描一次图书表生成摘要。
+        """
+        with self.db_manager.reader() as conn:
+            has_sketches = conn.execute('SELECT 1 FROM stat_sketches LIMIT 1').fetchone()
+            has_books = conn.execute('SELECT 1 FROM books LIMIT 1').fetchone()
+        if has_books and not has_sketches:
+            self.rebuild()
+        with self.db_manager.reader() as conn:
+            sketches = self._load(conn)
+        price = sketches['price']
+        return {
+            'median_price': price.quantile(0.5),
+            'p90_price': price.quantile(0.9),
+            'p99_price': price.quantile(0.99),
+            'distinct_authors': sketches['authors'].count(),
+            'distinct_publishers': sketches['publishers'].count()
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="图书统计摘要")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('show', help="显示价格分位数和作者/出版社数量")
+    subparsers.add_parser('rebuild', help="扫描图书表重新生成摘要")
+    merge_parser = subparsers.add_parser('merge', help="合并其他数据库中的摘要")
+    merge_parser.add_argument('db_paths', nargs='+', help="其他 books.db 的路径")
+    args = parser.parse_args(argv)
+
+    from src.database.db_manager import DatabaseManager
+    from src.utils.logger import Logger
+
+    Logger.setup_logging()
+    store = DatabaseManager.instance().stat_sketches
+    if args.command == 'rebuild':
+        print(f"已重新生成摘要，共 {store.rebuild()} 本图书")
+    elif args.command == 'merge':
+        for db_path in args.db_paths:
+            store.merge_from(Path(db_path))
+        print(f"已合并 {len(args.db_paths)} 个数据库的摘要")
+    summary = store.summary()
+    print(f"价格中位数: {summary['median_price']:.2f}元")
+    print(f"P90 价格: {summary['p90_price']:.2f}元")
+    print(f"P99 价格: {summary['p99_price']:.2f}元")
+    print(f"作者数: {summary['distinct_authors']}")
+    print(f"出版社数: {summary['distinct_publishers']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
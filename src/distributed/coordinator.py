@@ -0,0 +1,150 @@
+"""
+分布式采集协调器：拆分采集任务、汇总结果入库
+
+命令行用法（在项目根目录执行）：
+    python -m src.distributed.coordinator submit --keywords Python 人工智能 --pages 50 --pages-per-task 5
+    python -m src.distributed.coordinator submit --windows recent7-0-0 recent30-0-0 --pages 25
+    python -m src.distributed.coordinator collect --follow
+    python -m src.distributed.coordinator status
+
+工作进程见 src.distributed.worker。
+"""
+import argparse
+import logging
+import sys
+import time
+from typing import Dict, List
+from src.crawler.platforms.registry import DEFAULT_PLATFORM, get_platform
+from src.crawler.url_frontier import BESTSELLER_CATEGORIES, BESTSELLER_WINDOWS, bestseller_url
+from src.distributed.task_queue import TaskQueue, open_queue
+
+def task_urls(payload: Dict) -> List[str]:
+    """任务对应的列表页URL"""
+    pages = range(payload['start_page'], payload['end_page'] + 1)
+    if payload['kind'] == 'search':
+        platform = get_platform(payload.get('platform', DEFAULT_PLATFORM))
+        return [platform.search_url(payload['keywords'], page) for page in pages]
+    if payload['kind'] == 'bestseller':
+        return [bestseller_url(payload['category'], payload['window'], page) for page in pages]
+    raise ValueError(f"未知的任务类型: {payload['kind']}")
+
+def _page_ranges(pages: int, pages_per_task: int):
+    for start in range(1, pages + 1, pages_per_task):
+        yield start, min(start + pages_per_task - 1, pages)
+
+class Coordinator:
+    """拆分采集任务并汇总结果"""
+
+    def __init__(self, queue: TaskQueue, db_manager=None):
+        self.queue = queue
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+
+    def submit_search(self, keywords: List[str], pages: int, pages_per_task: int = 5,
+                      platforms: List[str] = None) -> List[str]:
+        """按平台 × 关键词 × 页码区间拆分搜索任务"""
+        return self.queue.put([
+            {'kind': 'search', 'platform': platform, 'keywords': keyword, 'start_page': start, 'end_page': end}
+            for platform in platforms or [DEFAULT_PLATFORM]
+            for keyword in keywords
+            for start, end in _page_ranges(pages, pages_per_task)
+        ])
+
+    def submit_bestsellers(self, categories: List[str] = None, windows: List[str] = None,
+                           pages: int = 25, pages_per_task: int = 5) -> List[str]:
+        """按分类 × 时间窗口 × 页码区间拆分畅销榜任务"""
+        return self.queue.put([
+            {'kind': 'bestseller', 'category': category, 'window': window, 'start_page': start, 'end_page': end}
+            for category in categories or BESTSELLER_CATEGORIES
+            for window in windows or BESTSELLER_WINDOWS
+            for start, end in _page_ranges(pages, pages_per_task)
+        ])
+
+    def collect(self, batch_size: int = 100) -> Dict[str, int]:
+        """
+        将已完成任务的结果写入数据库
+
+        结果先按任务编号去重入库，再在队列中确认；若在两步之间中断，
+        下次汇总时同一任务不会被重复写入。
+
+        Returns:
+            Dict[str, int]: tasks（处理的任务数）、books（新写入的图书数）、duplicates（已入库过的任务数）
+        """
+        summary = {'tasks': 0, 'books': 0, 'duplicates': 0}
+        while True:
+            results = self.queue.completed(batch_size)
+            if not results:
+                break
+            for task_id, books in results:
+                if self.db_manager.ingest_task_result(task_id, books):
+                    summary['books'] += len(books)
+                else:
+                    summary['duplicates'] += 1
+                self.queue.ack(task_id)
+                summary['tasks'] += 1
+        if summary['tasks']:
+            self.logger.info(
+                f"汇总结果: 任务{summary['tasks']}个, 图书{summary['books']}条, 重复任务{summary['duplicates']}个"
+            )
+        return summary
+
+    def follow(self, interval: float = 10.0):
+        """持续汇总结果，直到没有待处理和处理中的任务"""
+        while True:
+            self.collect()
+            stats = self.queue.stats()
+            if not stats.get('pending') and not stats.get('leased') and not stats.get('done'):
+                break
+            time.sleep(interval)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="分布式采集协调器")
+    parser.add_argument('--queue', default=None, help="任务队列地址，默认使用 Settings.TASK_QUEUE_URL")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    submit_parser = subparsers.add_parser('submit', help="拆分并提交采集任务")
+    submit_parser.add_argument('--keywords', nargs='*', default=[], help="搜索关键词，不指定时提交畅销榜任务")
+    submit_parser.add_argument('--categories', nargs='*', help="畅销榜分类编码")
+    submit_parser.add_argument('--windows', nargs='*', help="畅销榜时间窗口")
+    submit_parser.add_argument('--platforms', nargs='*', help="搜索任务的平台，如 dangdang douban")
+    submit_parser.add_argument('--pages', type=int, default=25, help="每个关键词/分类的页数")
+    submit_parser.add_argument('--pages-per-task', type=int, default=5, help="每个任务包含的页数")
+
+    collect_parser = subparsers.add_parser('collect', help="将已完成任务的结果写入数据库")
+    collect_parser.add_argument('--follow', action='store_true', help="持续汇总直到全部任务结束")
+    collect_parser.add_argument('--interval', type=float, default=10.0, help="持续汇总的轮询间隔（秒）")
+
+    subparsers.add_parser('status', help="查看各状态任务数量")
+
+    args = parser.parse_args(argv)
+    queue = open_queue(args.queue)
+    try:
+        if args.command == 'submit':
+            coordinator = Coordinator(queue)
+            if args.keywords:
+                task_ids = coordinator.submit_search(args.keywords, args.pages, args.pages_per_task,
+                                                     args.platforms)
+            else:
+                task_ids = coordinator.submit_bestsellers(args.categories, args.windows,
+                                                          args.pages, args.pages_per_task)
+            print(f"已提交 {len(task_ids)} 个任务")
+        elif args.command == 'collect':
+            from src.database.db_manager import DatabaseManager
+            from src.utils.logger import Logger
+
+            Logger.setup_logging()
+            coordinator = Coordinator(queue, DatabaseManager.instance())
+            if args.follow:
+                coordinator.follow(args.interval)
+            else:
+                summary = coordinator.collect()
+                print(f"已汇总 {summary['tasks']} 个任务，写入 {summary['books']} 条图书数据")
+        else:
+            for status, count in sorted(queue.stats().items()):
+                print(f"{status}: {count}")
+    finally:
+        queue.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,453 @@
+"""
+分布式采集任务队列
+
+任务被工作进程"租用"（lease）后需要定期续租（heartbeat），租约过期的任务会重新回到待处理队列，
+由其他工作进程接手。每次租用都会生成新的租约令牌，只有持有当前令牌的工作进程才能提交结果，
+因此超时后才返回的旧结果会被拒绝。结果入库的去重由 DatabaseManager.ingest_task_result 保证。
+
+后端：
+- SQLiteTaskQueue：单机多进程，队列保存在本地SQLite文件中；
+- RedisTaskQueue：多节点共享，需要 redis 库；LocalRedis 是进程内的替身，命令语义与 Redis 一致。
+
+队列地址（Settings.TASK_QUEUE_URL / --queue）：
+    sqlite:///data/tasks.db    redis://host:6379/0    memory://
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from src.config.settings import Settings
+
+try:
+    import redis
+except ImportError:  # redis 为可选依赖，仅多节点部署时需要
+    redis = None
+
+class Task(NamedTuple):
+    task_id: str
+    payload: Dict
+    lease_token: str
+    attempts: int
+
+class TaskQueue:
+    """任务队列接口"""
+
+    def __init__(self, max_attempts: int = None):
+        self.max_attempts = max_attempts or Settings.TASK_MAX_ATTEMPTS
+
+    def put(self, payloads: List[Dict]) -> List[str]:
+        """加入一批任务，返回任务编号"""
+        raise NotImplementedError
+
+    def lease(self, worker_id: str, lease_seconds: float) -> Optional[Task]:
+        """租用一个待处理任务，没有任务时返回 None"""
+        raise NotImplementedError
+
+    def heartbeat(self, task: Task, lease_seconds: float) -> bool:
+        """续租，租约已失效（被其他工作进程接手）时返回 False"""
+        raise NotImplementedError
+
+    def complete(self, task: Task, result: List[Dict]) -> bool:
+        """提交任务结果，租约已失效时返回 False"""
+        raise NotImplementedError
+
+    def fail(self, task: Task, error: str):
+        """报告任务失败，未超过最大尝试次数时重新排队"""
+        raise NotImplementedError
+
+    def completed(self, limit: int = 100) -> List[Tuple[str, List[Dict]]]:
+        """已完成但尚未确认入库的任务结果"""
+        raise NotImplementedError
+
+    def ack(self, task_id: str):
+        """确认任务结果已入库"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        """各状态的任务数量"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class SQLiteTaskQueue(TaskQueue):
+    """基于SQLite的任务队列（同一台机器上的多个进程共享）"""
+
+    def __init__(self, db_path: Path, max_attempts: int = None):
+        super().__init__(max_attempts)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 自行管理事务，租用时使用 BEGIN IMMEDIATE 保证多进程间的原子性
+        self.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            task_id TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            worker_id TEXT,
+            lease_token TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, created_at)')
+
+    def _transaction(self, func):
+        """在写事务中执行 func(conn)"""
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = func(self.conn)
+                self.conn.execute('COMMIT')
+                return result
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def put(self, payloads: List[Dict]) -> List[str]:
+        now = time.time()
+        rows = [(uuid.uuid4().hex, json.dumps(payload, ensure_ascii=False), now, now) for payload in payloads]
+        self._transaction(lambda conn: conn.executemany(
+            'INSERT INTO tasks (task_id, payload, created_at, updated_at) VALUES (?, ?, ?, ?)', rows
+        ))
+        return [row[0] for row in rows]
+
+    def lease(self, worker_id: str, lease_seconds: float) -> Optional[Task]:
+        def _lease(conn):
+            now = time.time()
+            # 回收租约已过期的任务；已用完尝试次数的（工作进程崩溃或卡死）标记为失败，不再重试
+            conn.execute('''
+            UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                error = CASE WHEN attempts >= ? THEN '租约过期' ELSE error END,
+                lease_token = NULL, worker_id = NULL, updated_at = ?
+            WHERE status = 'leased' AND lease_expires < ?
+            ''', (self.max_attempts, self.max_attempts, now, now))
+            row = conn.execute('''
+            SELECT task_id, payload, attempts FROM tasks
+            WHERE status = 'pending' ORDER BY created_at LIMIT 1
+            ''').fetchone()
+            if row is None:
+                return None
+            token = uuid.uuid4().hex
+            conn.execute('''
+            UPDATE tasks SET status = 'leased', worker_id = ?, lease_token = ?, lease_expires = ?,
+                attempts = attempts + 1, updated_at = ?
+            WHERE task_id = ?
+            ''', (worker_id, token, now + lease_seconds, now, row[0]))
+            return Task(row[0], json.loads(row[1]), token, row[2] + 1)
+        return self._transaction(_lease)
+
+    def heartbeat(self, task: Task, lease_seconds: float) -> bool:
+        now = time.time()
+        cursor = self._transaction(lambda conn: conn.execute('''
+        UPDATE tasks SET lease_expires = ?, updated_at = ?
+        WHERE task_id = ? AND status = 'leased' AND lease_token = ?
+        ''', (now + lease_seconds, now, task.task_id, task.lease_token)))
+        return cursor.rowcount == 1
+
+    def complete(self, task: Task, result: List[Dict]) -> bool:
+        cursor = self._transaction(lambda conn: conn.execute('''
+        UPDATE tasks SET status = 'done', result = ?, lease_token = NULL, updated_at = ?
+        WHERE task_id = ? AND status = 'leased' AND lease_token = ?
+        ''', (json.dumps(result, ensure_ascii=False), time.time(), task.task_id, task.lease_token)))
+        return cursor.rowcount == 1
+
+    def fail(self, task: Task, error: str):
+        status = 'failed' if task.attempts >= self.max_attempts else 'pending'
+        self._transaction(lambda conn: conn.execute('''
+        UPDATE tasks SET status = ?, error = ?, lease_token = NULL, worker_id = NULL, updated_at = ?
+        WHERE task_id = ? AND status = 'leased' AND lease_token = ?
+        ''', (status, error, time.time(), task.task_id, task.lease_token)))
+
+    def completed(self, limit: int = 100) -> List[Tuple[str, List[Dict]]]:
+        with self._lock:
+            rows = self.conn.execute('''
+            SELECT task_id, result FROM tasks WHERE status = 'done' ORDER BY updated_at LIMIT ?
+            ''', (limit,)).fetchall()
+        return [(task_id, json.loads(result)) for task_id, result in rows]
+
+    def ack(self, task_id: str):
+        self._transaction(lambda conn: conn.execute('''
+        UPDATE tasks SET status = 'ingested', result = NULL, updated_at = ?
+        WHERE task_id = ? AND status = 'done'
+        ''', (time.time(), task_id)))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.conn.execute('SELECT status, COUNT(*) FROM tasks GROUP BY status').fetchall())
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+class RedisTaskQueue(TaskQueue):
+    """
+    基于 Redis 的任务队列（多节点共享）
+
+    client 需以 decode_responses=True 创建；只使用哈希、列表和有序集合的基本命令。
+    每个状态变更都在 WATCH/MULTI 事务（client.transaction）中完成：先在 WATCH 下读取并校验，
+    再把写命令放进 MULTI 一次提交，被监视的键在此期间被其他节点修改时整体重试。
+    """
+
+    def __init__(self, client, namespace: str = 'book_tasks', max_attempts: int = None):
+        super().__init__(max_attempts)
+        self.client = client
+        self.keys = {name: f"{namespace}:{name}" for name in
+                     ('tasks', 'pending', 'leases', 'owners', 'attempts', 'results', 'failed', 'ingested')}
+
+    def _transaction(self, func, *watches):
+        """在 WATCH/MULTI 事务中执行 func(pipe)，返回 func 的返回值"""
+        return self.client.transaction(func, *(self.keys[name] for name in watches), value_from_callable=True)
+
+    def put(self, payloads: List[Dict]) -> List[str]:
+        task_ids = [uuid.uuid4().hex for _ in payloads]
+
+        def _put(pipe):
+            pipe.multi()
+            for task_id, payload in zip(task_ids, payloads):
+                pipe.hset(self.keys['tasks'], task_id, json.dumps(payload, ensure_ascii=False))
+                pipe.rpush(self.keys['pending'], task_id)
+        self._transaction(_put)
+        return task_ids
+
+    def _reclaim_expired(self):
+        """
+        回收租约已过期的任务，移出租约和重新排队在同一事务中完成；
+        已用完尝试次数的任务（工作进程崩溃或卡死）标记为失败，不再重试
+        """
+        def _reclaim(pipe):
+            expired = pipe.zrangebyscore(self.keys['leases'], '-inf', time.time())
+            attempts = {task_id: int(pipe.hget(self.keys['attempts'], task_id) or 0) for task_id in expired}
+            pipe.multi()
+            for task_id in expired:
+                pipe.zrem(self.keys['leases'], task_id)
+                pipe.hdel(self.keys['owners'], task_id)
+                if attempts[task_id] >= self.max_attempts:
+                    pipe.hset(self.keys['failed'], task_id, '租约过期')
+                else:
+                    pipe.rpush(self.keys['pending'], task_id)
+        self._transaction(_reclaim, 'leases')
+
+    def lease(self, worker_id: str, lease_seconds: float) -> Optional[Task]:
+        self._reclaim_expired()
+        token = f"{worker_id}:{uuid.uuid4().hex}"
+
+        def _lease(pipe):
+            task_id = pipe.lindex(self.keys['pending'], 0)
+            if task_id is None:
+                return None
+            attempts = int(pipe.hget(self.keys['attempts'], task_id) or 0) + 1
+            payload = pipe.hget(self.keys['tasks'], task_id)
+            pipe.multi()
+            pipe.lpop(self.keys['pending'])
+            pipe.hset(self.keys['owners'], task_id, token)
+            pipe.zadd(self.keys['leases'], {task_id: time.time() + lease_seconds})
+            pipe.hset(self.keys['attempts'], task_id, attempts)
+            return Task(task_id, json.loads(payload), token, attempts)
+        return self._transaction(_lease, 'pending')
+
+    def _owned_transaction(self, task: Task, writes) -> bool:
+        """持有当前租约时在事务中执行 writes(pipe)，租约已失效时返回 False"""
+        def _run(pipe):
+            if pipe.hget(self.keys['owners'], task.task_id) != task.lease_token:
+                return False
+            pipe.multi()
+            writes(pipe)
+            return True
+        return self._transaction(_run, 'owners')
+
+    def heartbeat(self, task: Task, lease_seconds: float) -> bool:
+        return self._owned_transaction(task, lambda pipe: pipe.zadd(
+            self.keys['leases'], {task.task_id: time.time() + lease_seconds}
+        ))
+
+    def complete(self, task: Task, result: List[Dict]) -> bool:
+        def _complete(pipe):
+            pipe.hset(self.keys['results'], task.task_id, json.dumps(result, ensure_ascii=False))
+            pipe.zrem(self.keys['leases'], task.task_id)
+            pipe.hdel(self.keys['owners'], task.task_id)
+        return self._owned_transaction(task, _complete)
+
+    def fail(self, task: Task, error: str):
+        def _fail(pipe):
+            pipe.zrem(self.keys['leases'], task.task_id)
+            pipe.hdel(self.keys['owners'], task.task_id)
+            if task.attempts >= self.max_attempts:
+                pipe.hset(self.keys['failed'], task.task_id, error)
+            else:
+                pipe.rpush(self.keys['pending'], task.task_id)
+        self._owned_transaction(task, _fail)
+
+    def completed(self, limit: int = 100) -> List[Tuple[str, List[Dict]]]:
+        results = []
+        for task_id in self.client.hkeys(self.keys['results'])[:limit]:
+            result = self.client.hget(self.keys['results'], task_id)
+            if result is not None:
+                results.append((task_id, json.loads(result)))
+        return results
+
+    def ack(self, task_id: str):
+        def _ack(pipe):
+            if pipe.hget(self.keys['results'], task_id) is None:
+                return
+            pipe.multi()
+            pipe.hdel(self.keys['results'], task_id)
+            pipe.hdel(self.keys['tasks'], task_id)
+            pipe.hdel(self.keys['attempts'], task_id)
+            pipe.hincrby(self.keys['ingested'], 'count', 1)
+        self._transaction(_ack, 'results')
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pending': self.client.llen(self.keys['pending']),
+            'leased': self.client.zcard(self.keys['leases']),
+            'done': self.client.hlen(self.keys['results']),
+            'failed': self.client.hlen(self.keys['failed']),
+            'ingested': int(self.client.hget(self.keys['ingested'], 'count') or 0)
+        }
+
+class _LocalPipeline:
+    """LocalRedis 的事务管道：multi() 之前的命令立即执行，之后的命令缓存到 execute() 时执行"""
+
+    def __init__(self, client: 'LocalRedis'):
+        self._client = client
+        self._commands = None
+
+    def multi(self):
+        self._commands = []
+
+    def execute(self) -> List:
+        commands, self._commands = self._commands or [], None
+        return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+    def __getattr__(self, name):
+        command = getattr(self._client, name)
+        if self._commands is None:
+            return command
+
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+class LocalRedis:
+    """进程内的 Redis 替身，实现 RedisTaskQueue 用到的命令（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._hashes: Dict[str, Dict[str, str]] = {}
+        self._lists: Dict[str, List[str]] = {}
+        self._zsets: Dict[str, Dict[str, float]] = {}
+
+    def hset(self, name, key, value):
+        with self._lock:
+            is_new = key not in self._hashes.setdefault(name, {})
+            self._hashes[name][key] = str(value)
+            return int(is_new)
+
+    def hget(self, name, key):
+        with self._lock:
+            return self._hashes.get(name, {}).get(key)
+
+    def hdel(self, name, key):
+        with self._lock:
+            return int(self._hashes.get(name, {}).pop(key, None) is not None)
+
+    def hkeys(self, name):
+        with self._lock:
+            return list(self._hashes.get(name, {}))
+
+    def hlen(self, name):
+        with self._lock:
+            return len(self._hashes.get(name, {}))
+
+    def hincrby(self, name, key, amount=1):
+        with self._lock:
+            values = self._hashes.setdefault(name, {})
+            values[key] = str(int(values.get(key, 0)) + amount)
+            return int(values[key])
+
+    def rpush(self, name, value):
+        with self._lock:
+            self._lists.setdefault(name, []).append(value)
+            return len(self._lists[name])
+
+    def lindex(self, name, index):
+        with self._lock:
+            values = self._lists.get(name, [])
+            return values[index] if -len(values) <= index < len(values) else None
+
+    def lpop(self, name):
+        with self._lock:
+            values = self._lists.get(name)
+            return values.pop(0) if values else None
+
+    def llen(self, name):
+        with self._lock:
+            return len(self._lists.get(name, []))
+
+    def zadd(self, name, mapping):
+        with self._lock:
+            zset = self._zsets.setdefault(name, {})
+            added = sum(1 for member in mapping if member not in zset)
+            zset.update({member: float(score) for member, score in mapping.items()})
+            return added
+
+    def zrem(self, name, member):
+        with self._lock:
+            return int(self._zsets.get(name, {}).pop(member, None) is not None)
+
+    def zrangebyscore(self, name, min_score, max_score):
+        low, high = float(min_score), float(max_score)
+        with self._lock:
+            items = sorted(self._zsets.get(name, {}).items(), key=lambda item: item[1])
+            return [member for member, score in items if low <= score <= high]
+
+    def zcard(self, name):
+        with self._lock:
+            return len(self._zsets.get(name, {}))
+
+    def transaction(self, func, *watches, value_from_callable=False):
+        """
+        与 redis-py 的 Redis.transaction 相同的接口
+
+        整个事务持有锁执行，被监视的键不可能被并发修改，因此无需重试。
+        """
+        with self._lock:
+            pipe = _LocalPipeline(self)
+            value = func(pipe)
+            results = pipe.execute()
+        return value if value_from_callable else results
+
+_LOCAL_REDIS = LocalRedis()
+
+def open_queue(url: str = None) -> TaskQueue:
+    """
+    按地址打开任务队列
+
+    Args:
+        url: sqlite:///路径、redis://主机:端口/库 或 memory://（进程内共享的 LocalRedis），
+            默认使用 Settings.TASK_QUEUE_URL
+
+    Returns:
+        TaskQueue: 任务队列
+    """
+    url = url or Settings.TASK_QUEUE_URL
+    if url.startswith('sqlite:///'):
+        return SQLiteTaskQueue(Path(url[len('sqlite:///'):]))
+    if url.startswith('redis://') or url.startswith('rediss://'):
+        if redis is None:
+            raise RuntimeError("使用 Redis 任务队列需要安装 redis 库: pip install redis")
+        return RedisTaskQueue(redis.Redis.from_url(url, decode_responses=True))
+    if url.startswith('memory://'):
+        return RedisTaskQueue(_LOCAL_REDIS)
+    raise ValueError(f"不支持的任务队列地址: {url}")
@@ -0,0 +1,115 @@
+"""
+分布式采集工作进程（无界面）
+
+从任务队列租用任务、抓取并提交结果；采集期间由后台线程定期续租，
+续租失败（租约已过期并被其他工作进程接手）时放弃当前任务。
+
+命令行用法（在项目根目录执行，可在多台机器上同时运行）：
+    python -m src.distributed.worker --queue redis://队列主机:6379/0
+    python -m src.distributed.worker --exit-when-idle
+"""
+import argparse
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Optional
+from src.config.settings import Settings
+from src.distributed.coordinator import task_urls
+from src.distributed.task_queue import Task, TaskQueue, open_queue
+from src.utils.metrics import Metrics
+
+class DistributedWorker:
+    """租用并执行采集任务"""
+
+    def __init__(self, queue: TaskQueue, crawler=None, worker_id: str = None, lease_seconds: float = None):
+        if crawler is None:
+            from src.crawler.book_crawler import BookCrawler
+            crawler = BookCrawler()
+        self.queue = queue
+        self.crawler = crawler
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds or Settings.TASK_LEASE_SECONDS
+        self.logger = logging.getLogger(__name__)
+
+    def _heartbeat(self, task: Task, stop: threading.Event, lost: threading.Event):
+        """按租约时长的三分之一定期续租"""
+        while not stop.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(task, self.lease_seconds):
+                    lost.set()
+                    return
+            except Exception as e:
+                self.logger.warning(f"任务 {task.task_id} 续租失败: {str(e)}")
+
+    def run_task(self, task: Task) -> bool:
+        """执行一个任务，返回结果是否被队列接受"""
+        stop, lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(task, stop, lost), daemon=True)
+        heartbeat.start()
+        try:
+            books = self.crawler.crawl_urls(task_urls(task.payload), should_continue=lambda: not lost.is_set())
+            if lost.is_set():
+                self.logger.warning(f"任务 {task.task_id} 的租约已失效，放弃结果")
+                return False
+            accepted = self.queue.complete(task, books)
+            Metrics.inc('tasks_completed_total' if accepted else 'tasks_rejected_total')
+            self.logger.info(f"任务 {task.task_id} 完成: {len(books)} 条图书数据")
+            return accepted
+        except Exception as e:
+            Metrics.inc('tasks_failed_total')
+            self.logger.error(f"任务 {task.task_id} 失败（第{task.attempts}次）: {str(e)}")
+            self.queue.fail(task, str(e))
+            return False
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def run(self, max_tasks: Optional[int] = None, exit_when_idle: bool = False, poll_interval: float = 5.0) -> int:
+        """
+        循环租用并执行任务
+
+        Args:
+            max_tasks: 最多执行的任务数
+            exit_when_idle: 队列为空时退出，否则等待新任务
+            poll_interval: 队列为空时的轮询间隔（秒）
+
+        Returns:
+            int: 执行的任务数
+        """
+        done = 0
+        while max_tasks is None or done < max_tasks:
+            task = self.queue.lease(self.worker_id, self.lease_seconds)
+            if task is None:
+                if exit_when_idle:
+                    break
+                time.sleep(poll_interval)
+                continue
+            self.run_task(task)
+            done += 1
+        return done
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="分布式采集工作进程")
+    parser.add_argument('--queue', default=None, help="任务队列地址，默认使用 Settings.TASK_QUEUE_URL")
+    parser.add_argument('--worker-id', default=None, help="工作进程标识，默认为 主机名-进程号")
+    parser.add_argument('--max-tasks', type=int, default=None, help="最多执行的任务数")
+    parser.add_argument('--exit-when-idle', action='store_true', help="队列为空时退出")
+    args = parser.parse_args(argv)
+
+    from src.utils.logger import Logger
+
+    Logger.setup_logging()
+    queue = open_queue(args.queue)
+    try:
+        worker = DistributedWorker(queue, worker_id=args.worker_id)
+        done = worker.run(args.max_tasks, args.exit_when_idle)
+        print(f"共执行 {done} 个任务")
+    finally:
+        queue.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
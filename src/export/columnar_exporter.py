@@ -0,0 +1,164 @@
+import logging
+from typing import Callable, List, Optional
+from src.export.stream_exporter import StreamingExporter
+from src.utils.metrics import Metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 为可选依赖
+    pa = None
+    pq = None
+
+# 整数列，其余列统一按字符串存储
+INTEGER_COLUMNS = {'id'}
+
+class ColumnarExporter(StreamingExporter):
+    """列式导出器：将图书表按行组写入 Parquet / Arrow IPC(Feather) 文件，并支持从 Parquet 快照导入"""
+
+    def __init__(self, db_manager, chunk_size: int = None,
+                 progress_callback: Optional[Callable[[int], None]] = None):
+        super().__init__(db_manager, chunk_size, progress_callback)
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _require_pyarrow():
+        """检查 pyarrow 是否可用"""
+        if pa is None:
+            raise ImportError("列式导出需要安装 pyarrow：pip install pyarrow")
+
+    @staticmethod
+    def _build_schema(columns: List[str]):
+        """根据查询结果的列名构造 Arrow Schema"""
+        return pa.schema([
+            pa.field(name, pa.int64() if name in INTEGER_COLUMNS else pa.string())
+            for name in columns
+        ])
+
+    @staticmethod
+    def _to_record_batch(schema, rows: List[tuple]):
+        """将一批数据库行转换为 RecordBatch"""
+        arrays = [
+            pa.array(list(values), type=field.type)
+            for field, values in zip(schema, zip(*rows))
+        ]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    @Metrics.timed('export.parquet')
+    def export_parquet(self, output_path: str) -> bool:
+        """
+        导出为 Parquet 文件（zstd 压缩 + 字典编码），每个读取批次写成一个行组
+
+        Args:
+            output_path: Parquet 文件保存路径
+
+        Returns:
+            bool: 是否导出成功
+        """
+        try:
+            self._require_pyarrow()
+            total = self.db_manager.count_books()
+            writer = None
+            try:
+                for columns, rows in self._iter_chunks(total):
+                    if writer is None:
+                        schema = self._build_schema(columns)
+                        writer = pq.ParquetWriter(
+                            output_path, schema,
+                            compression='zstd',
+                            use_dictionary=True
+                        )
+                    writer.write_batch(self._to_record_batch(schema, rows))
+            finally:
+                if writer is not None:
+                    writer.close()
+
+            if writer is None:
+                # 空表：写入只有表结构的文件
+                pq.write_table(self._build_schema(self.db_manager.get_book_columns()).empty_table(), output_path)
+
+            self.logger.info(f"成功导出 {total} 条数据到 {output_path}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Parquet导出失败: {str(e)}")
+            return False
+
+    @Metrics.timed('export.feather')
+    def export_feather(self, output_path: str) -> bool:
+        """
+        导出为 Arrow IPC 文件（即 Feather V2，zstd 压缩），逐批追加写入
+
+        Args:
+            output_path: Feather 文件保存路径
+
+        Returns:
+            bool: 是否导出成功
+        """
+        try:
+            self._require_pyarrow()
+            total = self.db_manager.count_books()
+            options = pa.ipc.IpcWriteOptions(compression='zstd')
+            writer = None
+            try:
+                for columns, rows in self._iter_chunks(total):
+                    if writer is None:
+                        schema = self._build_schema(columns)
+                        writer = pa.ipc.new_file(output_path, schema, options=options)
+                    writer.write_batch(self._to_record_batch(schema, rows))
+            finally:
+                if writer is not None:
+                    writer.close()
+
+            if writer is None:
+                # 空表：写入只有表结构的文件
+                schema = self._build_schema(self.db_manager.get_book_columns())
+                with pa.ipc.new_file(output_path, schema, options=options):
+                    pass
+
+            self.logger.info(f"成功导出 {total} 条数据到 {output_path}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Feather导出失败: {str(e)}")
+            return False
+
+    @Metrics.timed('import.parquet')
+    def import_parquet(self, input_path: str, keep_ids: bool = False) -> int:
+        """
+        将 Parquet 快照按行组批量导入图书表
+
+        整个导入在一个写事务中完成，中途失败时全部回滚，可以直接重新导入。
+
+        Args:
+            input_path: Parquet 文件路径
+            keep_ids: 是否保留快照中的 id 列（默认由数据库重新分配）
+
+        Returns:
+            int: 导入的行数，失败时返回 -1
+        """
+        try:
+            self._require_pyarrow()
+            parquet_file = pq.ParquetFile(input_path)
+            total = parquet_file.metadata.num_rows
+            columns = [
+                name for name in parquet_file.schema_arrow.names
+                if keep_ids or name != 'id'
+            ]
+
+            imported = 0
+            self._report_progress(0)
+            with self.db_manager.writer() as conn:
+                for batch in parquet_file.iter_batches(batch_size=self.chunk_size, columns=columns):
+                    rows = list(zip(*(column.to_pylist() for column in batch.columns)))
+                    imported += self.db_manager.insert_rows(columns, rows, conn)
+                    if total:
+                        self._report_progress(min(99, imported * 100 // total))
+            self._report_progress(100)
+
+            self.logger.info(f"成功从 {input_path} 导入 {imported} 条数据")
+            return imported
+
+        except Exception as e:
+            self.logger.error(f"Parquet导入失败: {str(e)}")
+            return -1
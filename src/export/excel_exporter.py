@@ -0,0 +1,92 @@
+import logging
+from typing import Callable, Dict, Optional
+from openpyxl import Workbook
+from src.export.stream_exporter import StreamingExporter
+from src.utils.metrics import Metrics
+
+# xlsx 单个工作表最多 1048576 行，扣除表头后可容纳的数据行数
+EXCEL_MAX_DATA_ROWS = 1048576 - 1
+
+class ExcelExporter(StreamingExporter):
+    """流式Excel导出器：使用 openpyxl 只写模式逐行写入，超出行数上限时自动分表"""
+
+    def __init__(self, db_manager, chunk_size: int = None,
+                 progress_callback: Optional[Callable[[int], None]] = None,
+                 max_rows_per_sheet: int = EXCEL_MAX_DATA_ROWS):
+        super().__init__(db_manager, chunk_size, progress_callback)
+        self.max_rows_per_sheet = max_rows_per_sheet
+        self.logger = logging.getLogger(__name__)
+
+    def _write_raw_data(self, workbook: Workbook):
+        """写入原始数据，按行数上限拆分为 原始数据、原始数据_2 …"""
+        total = self.db_manager.count_books()
+        sheet = None
+        sheet_index = 0
+        sheet_rows = 0
+        for columns, rows in self._iter_chunks(total):
+            for row in rows:
+                if sheet is None or sheet_rows >= self.max_rows_per_sheet:
+                    sheet_index += 1
+                    title = '原始数据' if sheet_index == 1 else f'原始数据_{sheet_index}'
+                    sheet = workbook.create_sheet(title)
+                    sheet.append(columns)
+                    sheet_rows = 0
+                sheet.append(row)
+                sheet_rows += 1
+
+        if sheet is None:
+            # 空表也保留原始数据工作表
+            sheet = workbook.create_sheet('原始数据')
+
+    def _write_stats(self, workbook: Workbook):
+        """根据SQL聚合结果写入统计数据工作表"""
+        sheet = workbook.create_sheet('统计数据')
+
+        price_summary: Dict = self.db_manager.get_price_summary()
+        sheet.append(['价格统计', '数值'])
+        labels = {
+            'count': '数量',
+            'mean': '平均值',
+            'std': '标准差',
+            'min': '最小值',
+            'max': '最大值'
+        }
+        for key, label in labels.items():
+            sheet.append([label, price_summary.get(key)])
+
+        sheet.append([])
+        sheet.append(['平台', '图书数量'])
+        for platform, count in self.db_manager.get_platform_counts().items():
+            sheet.append([platform, count])
+
+    @Metrics.timed('export.excel')
+    def export_excel(self, output_path: str, export_raw: bool = True,
+                     export_stats: bool = True) -> bool:
+        """
+        导出为Excel文件
+
+        Args:
+            output_path: Excel文件保存路径
+            export_raw: 是否导出原始数据
+            export_stats: 是否导出统计数据
+
+        Returns:
+            bool: 是否导出成功
+        """
+        try:
+            workbook = Workbook(write_only=True)
+            if export_raw:
+                self._write_raw_data(workbook)
+            if export_stats:
+                self._write_stats(workbook)
+            if not workbook.worksheets:
+                workbook.create_sheet('原始数据')
+
+            workbook.save(output_path)
+            self._report_progress(100)
+            self.logger.info(f"成功导出Excel文件到 {output_path}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Excel导出失败: {str(e)}")
+            return False
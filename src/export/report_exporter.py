@@ -0,0 +1,235 @@
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import quote
+from jinja2 import Environment
+from src.config.settings import Settings
+from src.export.stream_exporter import StreamingExporter
+from src.utils.metrics import Metrics
+
+REPORT_TEMPLATE = """<html>
+<head>
+    <meta charset="utf-8">
+    <title>当当网图书数据分析报告</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        h1, h2 { color: #333; }
+        .section { margin: 20px 0; padding: 10px; border: 1px solid #ddd; border-radius: 5px; }
+        table { border-collapse: collapse; width: 100%; margin: 10px 0; }
+        th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+        th { background-color: #f5f5f5; }
+        img { max-width: 100%; height: auto; margin: 10px 0; display: block; margin: 0 auto; }
+        .chart-container { text-align: center; }
+        .pager { margin: 10px 0; }
+        .pager button { margin: 0 5px; }
+        ul { list-style-type: none; padding-left: 0; }
+        li { margin: 5px 0; }
+    </style>
+</head>
+<body>
+    <h1>当当网图书数据分析报告</h1>
+    <p>生成时间：{{ report.generated_at }}</p>
+    {% set basic = report.basic_stats %}
+    <div class="section">
+        <h2>基本统计信息</h2>
+        <ul>
+            <li>总图书数量：{{ basic.total_books }}本</li>
+            <li>平均价格：{{ '%.2f'|format(basic.avg_price) }}元</li>
+            <li>最高价格：{{ '%.2f'|format(basic.max_price) }}元</li>
+            <li>最低价格：{{ '%.2f'|format(basic.min_price) }}元</li>
+            <li>平均评分：{{ '%.2f'|format(basic.avg_rating) }}</li>
+            {% if basic.median_price is defined %}
+            <li>价格中位数：{{ '%.2f'|format(basic.median_price) }}元（P90：{{ '%.2f'|format(basic.p90_price) }}元，P99：{{ '%.2f'|format(basic.p99_price) }}元）</li>
+            <li>作者数：约{{ basic.distinct_authors }}，出版社数：约{{ basic.distinct_publishers }}</li>
+            {% endif %}
+        </ul>
+    </div>
+
+    <div class="section">
+        <h2>出版社统计（TOP10）</h2>
+        <table>
+            <tr><th>出版社</th><th>图书数量</th><th>平均价格</th><th>平均评分</th></tr>
+            {% for pub in report.publisher_stats[:10] %}
+            <tr>
+                <td>{{ pub.publisher }}</td>
+                <td>{{ pub.book_count }}本</td>
+                <td>{{ '%.2f'|format(pub.avg_price) }}元</td>
+                <td>{{ '%.2f'|format(pub.avg_rating) }}</td>
+            </tr>
+            {% endfor %}
+        </table>
+    </div>
+
+    <div class="section">
+        <h2>图书分类统计</h2>
+        <table>
+            <tr><th>分类</th><th>图书数量</th><th>平均价格</th></tr>
+            {% for cat in report.category_stats %}
+            <tr>
+                <td>{{ cat.category }}</td>
+                <td>{{ cat.book_count }}本</td>
+                <td>{{ '%.2f'|format(cat.avg_price) }}元</td>
+            </tr>
+            {% endfor %}
+        </table>
+    </div>
+
+    <div class="section">
+        <h2>热门关键词（TOP10）</h2>
+        <ul>
+            {% for word, count in keywords %}
+            <li>{{ word }}: {{ count }}次</li>
+            {% endfor %}
+        </ul>
+    </div>
+
+    {% if chart_file %}
+    <div class="section">
+        <h2>分类分布图</h2>
+        <div class="chart-container">
+            <img src="{{ assets_dir }}/{{ chart_file }}" alt="分类分布图">
+        </div>
+    </div>
+    {% endif %}
+
+    <div class="section">
+        <h2>原始数据</h2>
+        {% if page_count %}
+        <div class="pager">
+            <button onclick="showPage(currentPage - 1)">上一页</button>
+            <span id="page-info"></span>
+            <button onclick="showPage(currentPage + 1)">下一页</button>
+        </div>
+        <table id="data-table"><thead><tr>
+            {% for column in columns %}<th>{{ column }}</th>{% endfor %}
+        </tr></thead><tbody></tbody></table>
+        {% else %}
+        <p>暂无数据</p>
+        {% endif %}
+    </div>
+
+    {% if page_count %}
+    <script>
+        var pageCount = {{ page_count }};
+        var currentPage = 0;
+        var pages = {};
+
+        // 数据分页保存在独立的脚本文件中，按需加载（兼容 file:// 协议打开）
+        window.addReportPage = function (index, rows) {
+            pages[index] = rows;
+            if (index === currentPage) { renderPage(rows); }
+        };
+
+        function renderPage(rows) {
+            var body = document.querySelector('#data-table tbody');
+            body.innerHTML = '';
+            rows.forEach(function (row) {
+                var tr = document.createElement('tr');
+                row.forEach(function (value) {
+                    var td = document.createElement('td');
+                    td.textContent = value === null ? '' : value;
+                    tr.appendChild(td);
+                });
+                body.appendChild(tr);
+            });
+            document.getElementById('page-info').textContent = (currentPage + 1) + ' / ' + pageCount;
+        }
+
+        function showPage(index) {
+            if (index < 0 || index >= pageCount) { return; }
+            currentPage = index;
+            if (pages[index]) { renderPage(pages[index]); return; }
+            var script = document.createElement('script');
+            script.src = '{{ assets_dir }}/data/page_' + String(index + 1).padStart(5, '0') + '.js';
+            document.body.appendChild(script);
+        }
+
+        showPage(0);
+    </script>
+    {% endif %}
+</body>
+</html>
+"""
+
+class ReportExporter(StreamingExporter):
+    """HTML报告导出器：模板流式渲染到磁盘，原始数据按页写入独立的脚本文件按需加载"""
+
+    def __init__(self, db_manager, chunk_size: int = None,
+                 progress_callback: Optional[Callable[[int], None]] = None):
+        super().__init__(db_manager, chunk_size or Settings.REPORT_PAGE_SIZE, progress_callback)
+        self.environment = Environment(autoescape=True)
+        self.logger = logging.getLogger(__name__)
+
+    def _write_data_pages(self, data_dir: Path):
+        """
+        将原始数据按页写入 data/page_XXXXX.js
+
+        Returns:
+            Tuple[List[str], int]: (列名列表, 页数)
+        """
+        data_dir.mkdir(parents=True, exist_ok=True)
+        for old_page in data_dir.glob('page_*.js'):
+            old_page.unlink()
+
+        columns = []
+        page_count = 0
+        for columns, rows in self._iter_chunks(self.db_manager.count_books()):
+            page_file = data_dir / f'page_{page_count + 1:05d}.js'
+            with open(page_file, 'w', encoding='utf-8') as f:
+                f.write(f'window.addReportPage({page_count}, ')
+                json.dump([list(row) for row in rows], f, ensure_ascii=False)
+                f.write(');\n')
+            page_count += 1
+        return columns, page_count
+
+    @staticmethod
+    def assets_dir_for(output_path) -> Path:
+        """报告附属文件目录：与HTML文件同名的 <文件名>_files，每份报告各自独立"""
+        output_path = Path(output_path)
+        return output_path.parent / f"{output_path.stem}_files"
+
+    @Metrics.timed('export.report')
+    def export_report(self, output_path: str, report: Dict, chart_path: Path = None) -> bool:
+        """
+        导出HTML分析报告
+
+        Args:
+            output_path: HTML文件保存路径
+            report: 已生成的分析报告（generate_summary_report 的返回值）
+            chart_path: 分类分布图路径，不存在时报告中不包含图表
+
+        Returns:
+            bool: 是否导出成功
+        """
+        try:
+            output_path = Path(output_path)
+            assets_dir = self.assets_dir_for(output_path)
+            assets_dir.mkdir(exist_ok=True)
+
+            chart_file = None
+            if chart_path and Path(chart_path).exists():
+                chart_file = Path(chart_path).name
+                shutil.copy2(chart_path, assets_dir / chart_file)
+
+            columns, page_count = self._write_data_pages(assets_dir / 'data')
+
+            template = self.environment.from_string(REPORT_TEMPLATE)
+            stream = template.stream(
+                report=report,
+                keywords=list(report['keyword_stats'].items())[:10],
+                chart_file=chart_file,
+                assets_dir=quote(assets_dir.name),
+                columns=columns,
+                page_count=page_count
+            )
+            with open(output_path, 'w', encoding='utf-8') as f:
+                stream.dump(f)
+
+            self.logger.info(f"分析报告已保存至 {output_path}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"导出报告失败: {str(e)}")
+            return False
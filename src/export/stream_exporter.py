@@ -0,0 +1,128 @@
+import csv
+import json
+import logging
+from datetime import datetime
+from typing import Callable, Optional
+from src.config.settings import Settings
+from src.utils.metrics import Metrics
+
+class StreamingExporter:
+    """流式导出器：按批次从数据库读取并增量写入文件，内存占用与数据量无关"""
+
+    def __init__(self, db_manager, chunk_size: int = None,
+                 progress_callback: Optional[Callable[[int], None]] = None):
+        self.db_manager = db_manager
+        self.chunk_size = chunk_size or Settings.EXPORT_CHUNK_SIZE
+        self.progress_callback = progress_callback
+        self.logger = logging.getLogger(__name__)
+
+    def _iter_chunks(self, total: int):
+        """遍历数据批次，并在每批写入后汇报进度"""
+        done = 0
+        self._report_progress(0)
+        for columns, rows in self.db_manager.iter_book_chunks(self.chunk_size):
+            yield columns, rows
+            done += len(rows)
+            if total:
+                self._report_progress(min(99, done * 100 // total))
+        self._report_progress(100)
+
+    def _report_progress(self, value: int):
+        """汇报导出进度"""
+        if self.progress_callback:
+            self.progress_callback(value)
+
+    @Metrics.timed('export.csv')
+    def export_csv(self, output_path: str) -> bool:
+        """
+        流式导出为CSV文件
+
+        Args:
+            output_path: CSV文件保存路径
+
+        Returns:
+            bool: 是否导出成功
+        """
+        try:
+            total = self.db_manager.count_books()
+            with open(output_path, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                header_written = False
+                for columns, rows in self._iter_chunks(total):
+                    if not header_written:
+                        writer.writerow(columns)
+                        header_written = True
+                    writer.writerows(rows)
+                if not header_written:
+                    # 空表也写出表头
+                    writer.writerow(self.db_manager.get_book_columns())
+
+            self.logger.info(f"成功导出 {total} 条数据到 {output_path}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"导出CSV文件失败: {str(e)}")
+            return False
+
+    @Metrics.timed('export.json')
+    def export_json(self, output_path: str) -> bool:
+        """
+        流式导出为JSON文件，结构与原导出格式一致：{"metadata": ..., "books": [...]}
+
+        Args:
+            output_path: JSON文件保存路径
+
+        Returns:
+            bool: 是否导出成功
+        """
+        try:
+            total = self.db_manager.count_books()
+            metadata = {
+                'exported_at': datetime.now().isoformat(),
+                'total_records': total
+            }
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write('{\n  "metadata": ')
+                f.write(json.dumps(metadata, ensure_ascii=False))
+                f.write(',\n  "books": [')
+                first = True
+                for columns, rows in self._iter_chunks(total):
+                    for row in rows:
+                        f.write('\n    ' if first else ',\n    ')
+                        f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                        first = False
+                f.write('\n  ]\n}\n')
+
+            self.logger.info(f"成功导出 {total} 条数据到 {output_path}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"JSON导出失败: {str(e)}")
+            return False
+
+    @Metrics.timed('export.jsonl')
+    def export_jsonl(self, output_path: str) -> bool:
+        """
+        流式导出为JSON Lines文件，每行一条图书记录
+
+        Args:
+            output_path: JSONL文件保存路径
+
+        Returns:
+            bool: 是否导出成功
+        """
+        try:
+            total = self.db_manager.count_books()
+            with open(output_path, 'w', encoding='utf-8') as f:
+                for columns, rows in self._iter_chunks(total):
+                    f.writelines(
+                        json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+                        for row in rows
+                    )
+
+            self.logger.info(f"成功导出 {total} 条数据到 {output_path}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"JSON Lines导出失败: {str(e)}")
+            return False
@@ -1,5 +1,6 @@
 import sys
 import os
+import argparse
 
 # 将项目根目录添加到Python路径
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -7,17 +8,45 @@ sys.path.insert(0, project_root)
 
 from src.ui.main_window import MainWindow
 from src.utils.path_manager import PathManager
+from src.utils.logger import Logger
+from src.utils.metrics import Metrics, Profiler
+from src.config.settings import Settings
 from PyQt5.QtWidgets import QApplication
 
+def parse_args():
+    """解析命令行参数，未识别的参数交给Qt处理"""
+    parser = argparse.ArgumentParser(description="当当网图书数据分析系统")
+    parser.add_argument('--metrics-file', default=str(Settings.METRICS_FILE),
+                        help="退出时写入性能指标的文件（.json 为JSON格式，否则为Prometheus文本格式）")
+    parser.add_argument('--profile', action='store_true',
+                        help="启用 cProfile + tracemalloc 性能分析，结果保存在 logs/profile")
+    return parser.parse_known_args()
+
 def main():
+    args, qt_args = parse_args()
+    
     # 初始化项目目录
     PathManager.initialize_project_directories()
     
+    # 配置异步日志
+    Logger.setup_logging()
+    
+    profiler = None
+    if args.profile:
+        profiler = Profiler(Settings.PROFILE_DIR)
+        profiler.start()
+    
     # 启动应用
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_args)
     window = MainWindow()
     window.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    
+    # 保存性能数据
+    if profiler:
+        profiler.stop()
+    Metrics.write(args.metrics_file)
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
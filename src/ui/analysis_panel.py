@@ -1,16 +1,20 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                            QPushButton, QComboBox, QTabWidget, QScrollArea,
                            QGridLayout, QTableWidget, QTableWidgetItem,
-                           QHeaderView, QFileDialog, QMessageBox)
+                           QHeaderView, QFileDialog, QMessageBox, QCheckBox,
+                           QLineEdit)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QPixmap
-from ..analysis.book_analyzer import BookAnalyzer
+from ..analysis.book_analyzer import create_analyzer
+from ..analysis.near_duplicates import NearDuplicateDetector
+from ..analysis.similarity_index import SimilarityIndex
 from ..visualization.data_visualizer import DataVisualizer
 from ..database.db_manager import DatabaseManager
+from ..export.report_exporter import ReportExporter
 import pandas as pd
 import logging
 from pathlib import Path
-import shutil
+from ..utils.metrics import Profiler
 
 class AnalysisWorker(QThread):
     """数据分析工作线程"""
@@ -20,6 +24,7 @@ class AnalysisWorker(QThread):
         super().__init__()
         self.analyzer = analyzer
         
+    @Profiler.threaded
     def run(self):
         try:
             report = self.analyzer.generate_summary_report()
@@ -27,12 +32,33 @@ class AnalysisWorker(QThread):
         except Exception as e:
             self.finished.emit(False, {"error": str(e)})
 
+class SimilarityWorker(QThread):
+    """相似图书查找工作线程（增量更新索引可能触发整体重建，不能放在界面线程）"""
+    finished = pyqtSignal(bool, object)
+    
+    def __init__(self, similarity_index, text):
+        super().__init__()
+        self.similarity_index = similarity_index
+        self.text = text
+        
+    @Profiler.threaded
+    def run(self):
+        try:
+            # 把上次建索引之后入库的图书加入索引
+            self.similarity_index.update()
+            self.finished.emit(True, self.similarity_index.search(self.text, k=20))
+        except Exception as e:
+            self.finished.emit(False, str(e))
+
 class AnalysisPanel(QWidget):
     def __init__(self):
         super().__init__()
-        self.db_manager = DatabaseManager()
-        self.analyzer = BookAnalyzer(self.db_manager)
+        self.db_manager = DatabaseManager.instance()
+        self.analyzer = create_analyzer(self.db_manager)
         self.visualizer = DataVisualizer()
+        self.report = None  # 最近一次生成的报告
+        self.similarity_index = None  # 首次查找相似图书时加载
+        self.similarity_worker = None
         self.logger = logging.getLogger(__name__)
         self.setup_ui()
         
@@ -53,6 +79,11 @@ class AnalysisPanel(QWidget):
         self.export_button.clicked.connect(self.export_report)
         control_layout.addWidget(self.export_button)
         
+        # 同一作品的多个版本只计一次
+        self.dedup_check = QCheckBox("合并重复版本")
+        self.dedup_check.setToolTip("出版社、分类和关键词统计中，同一作品的不同版本、套装只计一次")
+        control_layout.addWidget(self.dedup_check)
+        
         control_layout.addStretch()
         layout.addLayout(control_layout)
         
@@ -90,6 +121,11 @@ class AnalysisPanel(QWidget):
         self.stats_layout = QVBoxLayout(self.stats_tab)
         self.tab_widget.addTab(self.stats_tab, "统计信息")
         
+        # 相似图书页
+        self.similar_tab = QWidget()
+        self.create_similar_tab()
+        self.tab_widget.addTab(self.similar_tab, "相似图书")
+        
         # 添加到主布局
         layout.addWidget(self.tab_widget)
         
@@ -104,6 +140,62 @@ class AnalysisPanel(QWidget):
         header.setSectionResizeMode(QHeaderView.ResizeToContents)
         self.table_layout.addWidget(self.table)
         
+    def create_similar_tab(self):
+        """创建相似图书查找页"""
+        similar_layout = QVBoxLayout(self.similar_tab)
+        
+        search_layout = QHBoxLayout()
+        self.similar_edit = QLineEdit()
+        self.similar_edit.setPlaceholderText("输入书名（可附带作者、出版社）")
+        self.similar_edit.returnPressed.connect(self.find_similar_books)
+        search_layout.addWidget(self.similar_edit)
+        
+        self.similar_button = QPushButton("查找相似图书")
+        self.similar_button.clicked.connect(self.find_similar_books)
+        search_layout.addWidget(self.similar_button)
+        similar_layout.addLayout(search_layout)
+        
+        self.similar_table = QTableWidget()
+        self.similar_table.setColumnCount(4)
+        self.similar_table.setHorizontalHeaderLabels(["书名", "作者", "价格", "相似度"])
+        self.similar_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        similar_layout.addWidget(self.similar_table)
+        
+    def find_similar_books(self):
+        """在相似图书索引中查找与输入书名最相似的图书"""
+        text = self.similar_edit.text().strip()
+        if not text:
+            return
+        if self.similarity_worker is not None and self.similarity_worker.isRunning():
+            return
+        try:
+            if self.similarity_index is None:
+                self.similarity_index = SimilarityIndex(self.db_manager)
+        except Exception as e:
+            self.logger.error(f"加载相似图书索引失败: {str(e)}")
+            QMessageBox.warning(self, "查找失败", f"查找相似图书时出错：\n{str(e)}")
+            return
+            
+        self.similar_button.setEnabled(False)
+        self.similarity_worker = SimilarityWorker(self.similarity_index, text)
+        self.similarity_worker.finished.connect(self.on_similar_books_found)
+        self.similarity_worker.start()
+        
+    def on_similar_books_found(self, success, result):
+        """相似图书查找完成"""
+        self.similar_button.setEnabled(True)
+        if not success:
+            self.logger.error(f"查找相似图书失败: {result}")
+            QMessageBox.warning(self, "查找失败", f"查找相似图书时出错：\n{result}")
+            return
+            
+        self.similar_table.setRowCount(len(result))
+        for i, book in enumerate(result):
+            self.similar_table.setItem(i, 0, QTableWidgetItem(str(book['title'])))
+            self.similar_table.setItem(i, 1, QTableWidgetItem(str(book['author'])))
+            self.similar_table.setItem(i, 2, QTableWidgetItem(str(book['price'])))
+            self.similar_table.setItem(i, 3, QTableWidgetItem(f"{book['score']:.3f}"))
+        
     def update_data_table(self, df: pd.DataFrame):
         """更新数据表格"""
         self.table.setRowCount(0)
@@ -143,6 +235,14 @@ class AnalysisPanel(QWidget):
             content_layout.addWidget(QLabel(f"最高价格: {basic['max_price']:.2f}元"))
             content_layout.addWidget(QLabel(f"最低价格: {basic['min_price']:.2f}元"))
             content_layout.addWidget(QLabel(f"平均评分: {basic['avg_rating']:.2f}"))
+            if 'median_price' in basic:
+                content_layout.addWidget(QLabel(
+                    f"价格中位数: {basic['median_price']:.2f}元, "
+                    f"P90: {basic['p90_price']:.2f}元, P99: {basic['p99_price']:.2f}元"
+                ))
+                content_layout.addWidget(QLabel(
+                    f"作者数: 约{basic['distinct_authors']}, 出版社数: 约{basic['distinct_publishers']}"
+                ))
         
         # 出版社统计
         if 'publisher_stats' in stats:
@@ -173,6 +273,13 @@ class AnalysisPanel(QWidget):
         scroll.setWidget(content)
         self.stats_layout.addWidget(scroll)
 
+    def generate_report(self) -> dict:
+        """生成分析报告，合并重复版本时先为新入库的图书更新聚类"""
+        dedup = self.dedup_check.isChecked()
+        if dedup:
+            NearDuplicateDetector(self.db_manager).ensure_current()
+        return self.analyzer.generate_summary_report(dedup=dedup)
+
     def start_analysis(self):
         """开始数据分析"""
         try:
@@ -181,7 +288,8 @@ class AnalysisPanel(QWidget):
                 df = pd.read_sql_query("SELECT * FROM books", conn)
             
             # 生成分析报告
-            report = self.analyzer.generate_summary_report()
+            report = self.generate_report()
+            self.report = report
             
             # 更新所有分析结果
             self.update_stats_display(report)  # 显示所有统计信息
@@ -251,120 +359,16 @@ class AnalysisPanel(QWidget):
             if not file_path:
                 return
             
-            # 创建报告目录
-            report_dir = Path(file_path).parent / "report_files"
-            report_dir.mkdir(exist_ok=True)
+            # 每次导出都重新生成报告，与分页写出的原始数据保持一致
+            # （各项分析结果按数据版本缓存，数据没有变化时直接命中缓存）
+            self.report = self.generate_report()
             
-            # 复制图片到报告目录
+            # 流式生成HTML报告，原始数据分页写入 <文件名>_files/data
+            exporter = ReportExporter(self.db_manager)
             chart_path = self.visualizer.save_dir / 'category_distribution.png'
-            chart_dest = report_dir / 'category_distribution.png'
-            shutil.copy2(chart_path, chart_dest)
-            
-            # 获取最新数据
-            with self.db_manager.get_connection() as conn:
-                df = pd.read_sql_query("SELECT * FROM books", conn)
-            
-            # 生成分析报告
-            report = self.analyzer.generate_summary_report()
-            
-            # 生成HTML报告
-            html_content = f"""
-            <html>
-            <head>
-                <meta charset="utf-8">
-                <title>当当网图书数据分析报告</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                    h1, h2 {{ color: #333; }}
-                    .section {{ margin: 20px 0; padding: 10px; border: 1px solid #ddd; border-radius: 5px; }}
-                    table {{ border-collapse: collapse; width: 100%; margin: 10px 0; }}
-                    th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-                    th {{ background-color: #f5f5f5; }}
-                    img {{ max-width: 100%; height: auto; margin: 10px 0; display: block; margin: 0 auto; }}
-                    .chart-container {{ text-align: center; }}
-                    ul {{ list-style-type: none; padding-left: 0; }}
-                    li {{ margin: 5px 0; }}
-                </style>
-            </head>
-            <body>
-                <h1>当当网图书数据分析报告</h1>
-                <p>生成时间：{report['generated_at']}</p>
-                
-                <div class="section">
-                    <h2>基本统计信息</h2>
-                    <ul>
-                        <li>总图书数量：{report['basic_stats']['total_books']}本</li>
-                        <li>平均价格：{report['basic_stats']['avg_price']:.2f}元</li>
-                        <li>最高价格：{report['basic_stats']['max_price']:.2f}元</li>
-                        <li>最低价格：{report['basic_stats']['min_price']:.2f}元</li>
-                        <li>平均评分：{report['basic_stats']['avg_rating']:.2f}</li>
-                    </ul>
-                </div>
-                
-                <div class="section">
-                    <h2>出版社统计（TOP10）</h2>
-                    <table>
-                        <tr>
-                            <th>出版社</th>
-                            <th>图书数量</th>
-                            <th>平均价格</th>
-                            <th>平均评分</th>
-                        </tr>
-                        {''.join(f'''
-                        <tr>
-                            <td>{pub['publisher']}</td>
-                            <td>{pub['book_count']}本</td>
-                            <td>{pub['avg_price']:.2f}元</td>
-                            <td>{pub['avg_rating']:.2f}</td>
-                        </tr>
-                        ''' for pub in report['publisher_stats'][:10])}
-                    </table>
-                </div>
-                
-                <div class="section">
-                    <h2>图书分类统计</h2>
-                    <table>
-                        <tr>
-                            <th>分类</th>
-                            <th>图书数量</th>
-                            <th>平均价格</th>
-                        </tr>
-                        {''.join(f'''
-                        <tr>
-                            <td>{cat['category']}</td>
-                            <td>{cat['book_count']}本</td>
-                            <td>{cat['avg_price']:.2f}元</td>
-                        </tr>
-                        ''' for cat in report['category_stats'])}
-                    </table>
-                </div>
-                
-                <div class="section">
-                    <h2>热门关键词（TOP10）</h2>
-                    <ul>
-                        {''.join(f'<li>{word}: {count}次</li>' 
-                                for word, count in list(report['keyword_stats'].items())[:10])}
-                    </ul>
-                </div>
-                
-                <div class="section">
-                    <h2>分类分布图</h2>
-                    <div class="chart-container">
-                        <img src="report_files/category_distribution.png" alt="分类分布图">
-                    </div>
-                </div>
-                
-                <div class="section">
-                    <h2>原始数据</h2>
-                    {df.to_html(index=False, classes='data-table')}
-                </div>
-            </body>
-            </html>
-            """
-            
-            # 保存HTML报告
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            if not exporter.export_report(file_path, self.report, chart_path):
+                raise RuntimeError("生成HTML报告失败，详见日志")
+            report_dir = ReportExporter.assets_dir_for(file_path)
             
             # 显示成功消息
             QMessageBox.information(self, "导出成功", 
@@ -1,35 +1,113 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                            QLineEdit, QSpinBox, QComboBox, QPushButton,
-                           QProgressBar, QTextEdit, QDateEdit)
+                           QProgressBar, QTextEdit, QDateEdit, QCheckBox)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QDate
 from src.crawler.book_crawler import BookCrawler
+from src.crawler.detail_enricher import DetailEnricher
+from src.crawler.engine import CrawlEngine
+from src.crawler.platforms.registry import available_platforms
 from src.database.db_manager import DatabaseManager
+from src.utils.metrics import Profiler
 
 class CrawlerWorker(QThread):
     """爬虫工作线程"""
     progress = pyqtSignal(int)
     finished = pyqtSignal(bool, str)
     
-    def __init__(self, crawler, keywords, pages, start_date, end_date):
+    def __init__(self, crawler, keywords, pages, start_date, end_date, incremental=False, enrich=False,
+                 platforms=None):
         super().__init__()
         self.crawler = crawler
         self.keywords = keywords
         self.pages = pages
         self.start_date = start_date
         self.end_date = end_date
+        self.incremental = incremental
+        self.enrich = enrich
+        self.platforms = platforms or ['dangdang']
         
+    @Profiler.threaded
     def run(self):
         try:
-            books = self.crawler.crawl_dangdang(self.keywords, self.pages, self.start_date, self.end_date)
+            db_manager = DatabaseManager.instance()
+            change_detector = db_manager.price_history.classify if self.incremental else None
+            if self.platforms == ['dangdang']:
+                books = self.crawler.crawl_dangdang(self.keywords, self.pages, self.start_date, self.end_date,
+                                                   change_detector=change_detector)
+                summary = self.crawler.last_summary
+            else:
+                books, summary = self.crawl_platforms(change_detector)
             
             # 保存到数据库
-            db_manager = DatabaseManager()
             success = db_manager.save_books(books)
             
-            self.finished.emit(success, f"成功采集{len(books)}条数据" if success else "数据采集失败")
+            message = f"成功采集{len(books)}条数据" if success else "数据采集失败"
+            if success and summary.get('incremental'):
+                message += (
+                    f"（增量采集：新书{summary['new_books']}本，价格变化{summary['changed_books']}本，"
+                    f"实际抓取{summary['pages_fetched']}/{summary['pages_requested']}页，"
+                    f"节省{summary['pages_saved']}页）"
+                )
+            
+            # 为本次采集到的图书补充详情（有效期内已补充过的会被跳过）
+            if success and self.enrich and books:
+                enricher = DetailEnricher(db_manager)
+                # 详情页解析目前只支持当当网
+                urls = [book['url'] for book in books if book['platform'] == '当当网']
+                detail_summary = enricher.enrich(urls,
+                                                 progress_callback=self.progress.emit)
+                message += f"，补充详情{detail_summary['enriched']}本"
+            self.finished.emit(success, message)
         except Exception as e:
             self.finished.emit(False, f"发生错误: {str(e)}")
 
+    def crawl_platforms(self, change_detector):
+        """
+        多个平台并发采集
+
+        增量采集时，某个平台出现一整页已知且价格未变的图书后不再需要它后面的页面，
+        所有平台都满足后取消尚未开始的页面。
+
+        Returns:
+            Tuple[List[Dict], Dict]: 图书数据列表和本次运行的统计信息（字段与 BookCrawler.last_summary 相同）
+        """
+        engine = CrawlEngine(self.platforms, self.crawler)
+        total_pages = len(self.platforms) * self.pages
+        summary = {
+            'incremental': change_detector is not None,
+            'pages_requested': total_pages,
+            'pages_fetched': 0,
+            'pages_saved': 0,
+            'new_books': 0,
+            'changed_books': 0,
+            'unchanged_books': 0,
+            'stopped_early': False
+        }
+        books = []
+        exhausted = set()
+        crawl = engine.crawl(self.keywords, self.pages, self.start_date, self.end_date)
+        try:
+            for platform, page_books in crawl:
+                summary['pages_fetched'] += 1
+                if change_detector is not None:
+                    groups = change_detector(page_books)
+                    summary['new_books'] += len(groups['new'])
+                    summary['changed_books'] += len(groups['changed'])
+                    summary['unchanged_books'] += len(groups['unchanged'])
+                    if page_books and not groups['new'] and not groups['changed']:
+                        exhausted.add(platform)
+                    page_books = groups['new'] + groups['changed']
+                books.extend(page_books)
+                self.progress.emit(int(summary['pages_fetched'] * 100 / total_pages))
+                if exhausted >= set(self.platforms) and summary['pages_fetched'] < total_pages:
+                    summary['stopped_early'] = True
+                    break
+        finally:
+            # 关闭生成器时取消尚未开始的页面
+            crawl.close()
+        summary['pages_saved'] = total_pages - summary['pages_fetched'] if summary['incremental'] else 0
+        return books, summary
+
 class CrawlerPanel(QWidget):
     def __init__(self):
         super().__init__()
@@ -55,6 +133,24 @@ class CrawlerPanel(QWidget):
         self.page_spin.setValue(1)
         param_layout.addWidget(self.page_spin)
         
+        # 采集平台
+        param_layout.addWidget(QLabel("平台:"))
+        self.platform_combo = QComboBox()
+        for platform in available_platforms():
+            self.platform_combo.addItem(platform.display_name, [platform.name])
+        self.platform_combo.addItem("全部平台", [platform.name for platform in available_platforms()])
+        param_layout.addWidget(self.platform_combo)
+        
+        # 增量采集
+        self.incremental_check = QCheckBox("增量采集")
+        self.incremental_check.setToolTip("只保存新书和价格变化的图书，遇到整页无变化时停止翻页")
+        param_layout.addWidget(self.incremental_check)
+        
+        # 详情补充
+        self.enrich_check = QCheckBox("补充详情")
+        self.enrich_check.setToolTip("采集后抓取商品详情页，补充ISBN、出版社、出版日期、页数和分类")
+        param_layout.addWidget(self.enrich_check)
+        
         layout.addLayout(param_layout)
         
         # 日期选择区域
@@ -114,7 +210,10 @@ class CrawlerPanel(QWidget):
             self.keyword_edit.text(),
             self.page_spin.value(),
             start_date,
-            end_date
+            end_date,
+            self.incremental_check.isChecked(),
+            self.enrich_check.isChecked(),
+            self.platform_combo.currentData()
         )
         self.worker.progress.connect(self.update_progress)
         self.worker.finished.connect(self.crawling_finished)
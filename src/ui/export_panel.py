@@ -1,13 +1,14 @@
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout,
                            QPushButton, QComboBox, QFileDialog, QCheckBox,
                            QGroupBox, QFormLayout, QMessageBox, QProgressBar)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-import pandas as pd
-import json
+from PyQt5.QtCore import QThread, pyqtSignal
 import logging
 from pathlib import Path
-from datetime import datetime
 from ..database.db_manager import DatabaseManager
+from ..export.stream_exporter import StreamingExporter
+from ..export.columnar_exporter import ColumnarExporter
+from ..export.excel_exporter import ExcelExporter
+from ..utils.metrics import Profiler
 
 class ExportWorker(QThread):
     """数据导出工作线程"""
@@ -21,14 +22,21 @@ class ExportWorker(QThread):
         self.file_path = file_path
         self.options = options
         
+    @Profiler.threaded
     def run(self):
         try:
             if self.export_type == "CSV":
-                success = self.db_manager.export_to_csv(self.file_path)
+                success = self.db_manager.export_to_csv(self.file_path, self.progress.emit)
             elif self.export_type == "Excel":
                 success = self.export_to_excel()
             elif self.export_type == "JSON":
                 success = self.export_to_json()
+            elif self.export_type == "JSON Lines":
+                success = self.export_to_jsonl()
+            elif self.export_type == "Parquet":
+                success = ColumnarExporter(self.db_manager, progress_callback=self.progress.emit).export_parquet(self.file_path)
+            elif self.export_type == "Feather":
+                success = ColumnarExporter(self.db_manager, progress_callback=self.progress.emit).export_feather(self.file_path)
             else:
                 raise ValueError(f"不支持的导出格式: {self.export_type}")
                 
@@ -38,62 +46,49 @@ class ExportWorker(QThread):
             self.finished.emit(False, f"导出错误: {str(e)}")
             
     def export_to_excel(self):
-        """导出为Excel格式"""
-        try:
-            with self.db_manager.get_connection() as conn:
-                df = pd.read_sql_query("SELECT * FROM books", conn)
-                
-                # 创建Excel写入器
-                with pd.ExcelWriter(self.file_path) as writer:
-                    # 导出原始数据
-                    if self.options.get('export_raw', True):
-                        df.to_excel(writer, sheet_name='原始数据', index=False)
-                        
-                    # 导出统计数据
-                    if self.options.get('export_stats', True):
-                        # 价格统计
-                        price_stats = df['price'].describe()
-                        price_stats.to_excel(writer, sheet_name='统计数据', startrow=0)
-                        
-                        # 平台统计
-                        platform_stats = df['platform'].value_counts()
-                        platform_stats.to_excel(writer, sheet_name='统计数据', startrow=10)
-                        
-                return True
-                
-        except Exception as e:
-            logging.error(f"Excel导出失败: {str(e)}")
-            return False
+        """导出为Excel格式（只写模式流式写入）"""
+        exporter = ExcelExporter(self.db_manager, progress_callback=self.progress.emit)
+        return exporter.export_excel(
+            self.file_path,
+            export_raw=self.options.get('export_raw', True),
+            export_stats=self.options.get('export_stats', True)
+        )
             
     def export_to_json(self):
-        """导出为JSON格式"""
+        """导出为JSON格式（分批流式写入）"""
+        exporter = StreamingExporter(self.db_manager, progress_callback=self.progress.emit)
+        return exporter.export_json(self.file_path)
+
+    def export_to_jsonl(self):
+        """导出为JSON Lines格式（分批流式写入）"""
+        exporter = StreamingExporter(self.db_manager, progress_callback=self.progress.emit)
+        return exporter.export_jsonl(self.file_path)
+
+class ImportWorker(QThread):
+    """Parquet快照导入工作线程"""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(bool, str)
+    
+    def __init__(self, db_manager, file_path):
+        super().__init__()
+        self.db_manager = db_manager
+        self.file_path = file_path
+        
+    @Profiler.threaded
+    def run(self):
         try:
-            with self.db_manager.get_connection() as conn:
-                df = pd.read_sql_query("SELECT * FROM books", conn)
-                
-                # 转换为字典格式
-                data = {
-                    'metadata': {
-                        'exported_at': datetime.now().isoformat(),
-                        'total_records': len(df)
-                    },
-                    'books': df.to_dict('records')
-                }
-                
-                # 写入JSON文件
-                with open(self.file_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                    
-                return True
-                
+            exporter = ColumnarExporter(self.db_manager, progress_callback=self.progress.emit)
+            imported = exporter.import_parquet(self.file_path)
+            success = imported >= 0
+            self.finished.emit(success, f"成功导入{imported}条数据" if success else "导入失败")
+            
         except Exception as e:
-            logging.error(f"JSON导出失败: {str(e)}")
-            return False
+            self.finished.emit(False, f"导入错误: {str(e)}")
 
 class ExportPanel(QWidget):
     def __init__(self):
         super().__init__()
-        self.db_manager = DatabaseManager()
+        self.db_manager = DatabaseManager.instance()
         self.logger = logging.getLogger(__name__)
         self.setup_ui()
         
@@ -107,7 +102,7 @@ class ExportPanel(QWidget):
         
         # 导出格式选择
         self.format_combo = QComboBox()
-        self.format_combo.addItems(["CSV", "Excel", "JSON"])
+        self.format_combo.addItems(["CSV", "Excel", "JSON", "JSON Lines", "Parquet", "Feather"])
         options_layout.addRow("导出格式:", self.format_combo)
         
         options_group.setLayout(options_layout)
@@ -139,6 +134,10 @@ class ExportPanel(QWidget):
         self.export_button.clicked.connect(self.start_export)
         button_layout.addWidget(self.export_button)
         
+        self.import_button = QPushButton("导入Parquet快照")
+        self.import_button.clicked.connect(self.start_import)
+        button_layout.addWidget(self.import_button)
+        
         self.cancel_button = QPushButton("取消")
         self.cancel_button.clicked.connect(self.cancel_export)
         self.cancel_button.setEnabled(False)
@@ -158,7 +157,10 @@ class ExportPanel(QWidget):
         file_filter = {
             "CSV": "CSV files (*.csv)",
             "Excel": "Excel files (*.xlsx)",
-            "JSON": "JSON files (*.json)"
+            "JSON": "JSON files (*.json)",
+            "JSON Lines": "JSON Lines files (*.jsonl)",
+            "Parquet": "Parquet files (*.parquet)",
+            "Feather": "Feather files (*.feather *.arrow)"
         }
         
         file_path, _ = QFileDialog.getSaveFileName(
@@ -193,6 +195,28 @@ class ExportPanel(QWidget):
         self.worker.finished.connect(self.export_finished)
         self.worker.start()
         
+    def start_import(self):
+        """从Parquet快照导入数据"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "选择快照文件",
+            str(Path.home()),
+            "Parquet files (*.parquet)"
+        )
+        
+        if not file_path:
+            return
+            
+        self.export_button.setEnabled(False)
+        self.import_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.progress_bar.setValue(0)
+        
+        self.worker = ImportWorker(self.db_manager, file_path)
+        self.worker.progress.connect(self.update_progress)
+        self.worker.finished.connect(self.export_finished)
+        self.worker.start()
+        
     def cancel_export(self):
         """取消导出"""
         if hasattr(self, 'worker') and self.worker.isRunning():
@@ -207,6 +231,7 @@ class ExportPanel(QWidget):
     def export_finished(self, success: bool, message: str):
         """导出完成回调"""
         self.export_button.setEnabled(True)
+        self.import_button.setEnabled(True)
         self.cancel_button.setEnabled(False)
         self.progress_bar.setValue(100 if success else 0)
         
@@ -1,37 +1,118 @@
+import atexit
 import logging
+import queue
+import threading
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from src.config.settings import Settings
 
 class Logger:
-    """日志管理工具"""
-    
-    @staticmethod
-    def setup_logger(name: str) -> logging.Logger:
+    """日志管理工具：所有日志经队列交给后台线程写入，调用方不会阻塞在文件/控制台I/O上"""
+
+    _listener = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def setup_logging(cls):
+        """
+        配置全局日志（只会生效一次）
+
+        根记录器只挂一个 QueueHandler；后台 QueueListener 负责写入
+        滚动日志文件 app.log、爬虫专用的 crawler.log 以及控制台。
+        """
+        with cls._lock:
+            if cls._listener is not None:
+                return
+
+            # 确保日志目录存在
+            Settings.LOGS_DIR.mkdir(parents=True, exist_ok=True)
+            formatter = logging.Formatter(Settings.LOG_FORMAT)
+
+            # 文件处理器（按大小滚动）
+            file_handler = RotatingFileHandler(
+                Settings.LOG_FILE,
+                maxBytes=Settings.LOG_MAX_BYTES,
+                backupCount=Settings.LOG_BACKUP_COUNT,
+                encoding='utf-8'
+            )
+            file_handler.setFormatter(formatter)
+
+            # 爬虫日志单独保存一份
+            crawler_handler = RotatingFileHandler(
+                Settings.CRAWLER_LOG_FILE,
+                maxBytes=Settings.LOG_MAX_BYTES,
+                backupCount=Settings.LOG_BACKUP_COUNT,
+                encoding='utf-8'
+            )
+            crawler_handler.setFormatter(formatter)
+            crawler_handler.addFilter(logging.Filter('src.crawler'))
+
+            # 控制台处理器
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(formatter)
+
+            log_queue = queue.SimpleQueue()
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(QueueHandler(log_queue))
+            root.setLevel(Settings.LOG_LEVEL)
+
+            cls._listener = QueueListener(
+                log_queue, file_handler, crawler_handler, console_handler,
+                respect_handler_level=True
+            )
+            cls._listener.start()
+            atexit.register(cls.shutdown)
+
+    @classmethod
+    def shutdown(cls):
+        """停止后台写入线程，并把队列中剩余的日志写完"""
+        with cls._lock:
+            if cls._listener is not None:
+                cls._listener.stop()
+                cls._listener = None
+
+    @classmethod
+    def setup_logger(cls, name: str) -> logging.Logger:
         """
         设置并返回一个命名的日志记录器
-        
+
         Args:
             name: 日志记录器名称
         Returns:
             logging.Logger: 配置好的日志记录器
         """
-        # 确保日志目录存在
-        Settings.LOGS_DIR.mkdir(parents=True, exist_ok=True)
-        
-        logger = logging.getLogger(name)
-        logger.setLevel(Settings.LOG_LEVEL)
-        
-        # 文件处理器
-        file_handler = logging.FileHandler(
-            Settings.LOG_FILE, 
-            encoding='utf-8'
-        )
-        file_handler.setFormatter(logging.Formatter(Settings.LOG_FORMAT))
-        
-        # 控制台处理器
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(logging.Formatter(Settings.LOG_FORMAT))
-        
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-        
-        return logger 
\ No newline at end of file
+        cls.setup_logging()
+        return logging.getLogger(name)
+
+class EventCounter:
+    """高频事件计数器：逐条事件只计数，由调用方定期输出一条汇总日志"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.samples = {}
+
+    def add(self, event: str, sample: str = None):
+        """
+        记录一次事件
+
+        Args:
+            event: 事件名称
+            sample: 事件示例（每种事件只保留第一条）
+        """
+        self.counts[event] += 1
+        if sample is not None and event not in self.samples:
+            self.samples[event] = sample
+
+    def flush(self, logger: logging.Logger, prefix: str, level: int = logging.INFO):
+        """输出汇总日志并清空计数"""
+        if self.counts:
+            parts = [f"{event}{count}条" for event, count in self.counts.items()]
+            message = f"{prefix}: {', '.join(parts)}"
+            if self.samples:
+                examples = '; '.join(f"{event}示例: {sample}" for event, sample in self.samples.items())
+                message = f"{message} ({examples})"
+            logger.log(level, message)
+        self.counts.clear()
+        self.samples.clear()
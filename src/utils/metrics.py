@@ -0,0 +1,263 @@
+import bisect
+import cProfile
+import functools
+import json
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Tuple
+
+# 延迟直方图的桶上限（秒），与 Prometheus 客户端默认值一致并补充了长耗时桶
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class _Histogram:
+    """固定桶直方图"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个桶为 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Metrics:
+    """
+    全流程计时与指标收集
+
+    用法：
+        with Metrics.timer('fetch'):
+            ...
+        Metrics.inc('pages_fetched_total')
+
+    计时结果记录到直方图 stage_duration_seconds{stage="..."}，
+    可通过 write() 以 Prometheus 文本格式或 JSON 写入文件。
+    """
+
+    _lock = threading.Lock()
+    _counters: Dict[Tuple[str, str], float] = {}
+    _histograms: Dict[str, _Histogram] = {}
+
+    @classmethod
+    def inc(cls, name: str, value: float = 1, stage: str = ''):
+        """累加计数器"""
+        with cls._lock:
+            key = (name, stage)
+            cls._counters[key] = cls._counters.get(key, 0) + value
+
+    @classmethod
+    def observe(cls, stage: str, seconds: float):
+        """记录一次阶段耗时"""
+        with cls._lock:
+            histogram = cls._histograms.get(stage)
+            if histogram is None:
+                histogram = cls._histograms[stage] = _Histogram()
+            histogram.observe(seconds)
+
+    @classmethod
+    @contextmanager
+    def timer(cls, stage: str):
+        """计时上下文，出现异常时额外累加 stage_errors_total"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            cls.inc('stage_errors_total', stage=stage)
+            raise
+        finally:
+            cls.observe(stage, time.perf_counter() - start)
+
+    @classmethod
+    def timed(cls, stage: str):
+        """计时装饰器"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with cls.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @classmethod
+    def reset(cls):
+        """清空所有指标"""
+        with cls._lock:
+            cls._counters.clear()
+            cls._histograms.clear()
+
+    @classmethod
+    def snapshot(cls) -> Dict:
+        """以字典形式返回当前指标"""
+        with cls._lock:
+            counters = {}
+            for (name, stage), value in cls._counters.items():
+                counters.setdefault(name, {})[stage or '_total'] = value
+            stages = {
+                stage: {
+                    'count': h.count,
+                    'sum': h.sum,
+                    'avg': h.sum / h.count if h.count else 0.0,
+                    'buckets': {
+                        str(bound): count
+                        for bound, count in zip(list(h.buckets) + ['+Inf'], cls._cumulative(h.counts))
+                    }
+                }
+                for stage, h in cls._histograms.items()
+            }
+            return {'counters': counters, 'stage_duration_seconds': stages}
+
+    @staticmethod
+    def _cumulative(counts):
+        total = 0
+        result = []
+        for count in counts:
+            total += count
+            result.append(total)
+        return result
+
+    @classmethod
+    def to_prometheus(cls) -> str:
+        """生成 Prometheus 文本格式"""
+        lines = []
+        with cls._lock:
+            names = sorted({name for name, _ in cls._counters})
+            for name in names:
+                lines.append(f'# TYPE {name} counter')
+                for (counter_name, stage), value in sorted(cls._counters.items()):
+                    if counter_name != name:
+                        continue
+                    label = f'{{stage="{stage}"}}' if stage else ''
+                    lines.append(f'{name}{label} {value}')
+
+            if cls._histograms:
+                lines.append('# TYPE stage_duration_seconds histogram')
+            for stage, h in sorted(cls._histograms.items()):
+                bounds = [str(b) for b in h.buckets] + ['+Inf']
+                for bound, count in zip(bounds, cls._cumulative(h.counts)):
+                    lines.append(f'stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'stage_duration_seconds_sum{{stage="{stage}"}} {h.sum}')
+                lines.append(f'stage_duration_seconds_count{{stage="{stage}"}} {h.count}')
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def write(cls, path) -> bool:
+        """
+        将指标写入文件，扩展名为 .json 时写JSON，否则写 Prometheus 文本格式
+
+        Args:
+            path: 输出文件路径
+
+        Returns:
+            bool: 是否写入成功
+        """
+        try:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.suffix == '.json':
+                content = json.dumps(cls.snapshot(), ensure_ascii=False, indent=2)
+            else:
+                content = cls.to_prometheus()
+            path.write_text(content, encoding='utf-8')
+            return True
+        except Exception as e:
+            logging.getLogger(__name__).error(f"写入指标文件失败: {str(e)}")
+            return False
+
+class Profiler:
+    """
+    cProfile + tracemalloc 采样，结束时写出 .prof 统计和内存分配TOP列表
+
+    cProfile 只采样调用 enable() 的线程，因此每个线程各用一个 Profile，结束时合并：
+    threading 创建的线程通过 threading.setprofile 自动启用；QThread 不经过 threading，
+    需要用 Profiler.thread() 或 @Profiler.threaded 包裹其 run()。
+    """
+
+    _active = None  # 当前正在采样的 Profiler
+
+    def __init__(self, output_dir, top_n: int = 30):
+        self.output_dir = Path(output_dir)
+        self.top_n = top_n
+        self.profile = cProfile.Profile()
+        self.logger = logging.getLogger(__name__)
+        self._thread_profiles = []
+        self._lock = threading.Lock()
+
+    def _enable_thread_profile(self):
+        """为当前线程启用一个独立的 Profile，结束时合并到总统计"""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ 的 cProfile 基于 sys.monitoring，主线程的采样已覆盖所有线程
+            return None
+        with self._lock:
+            self._thread_profiles.append(profile)
+        return profile
+
+    def _bootstrap_thread(self, frame, event, arg):
+        """threading 新线程的第一个采样事件：换成该线程自己的 Profile"""
+        sys.setprofile(None)
+        self._enable_thread_profile()
+
+    @classmethod
+    @contextmanager
+    def thread(cls):
+        """在当前线程内采样（未启用性能分析时什么也不做），用于 QThread 的 run()"""
+        profiler = cls._active
+        profile = profiler._enable_thread_profile() if profiler is not None else None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+
+    @classmethod
+    def threaded(cls, func):
+        """Profiler.thread() 的装饰器形式"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with cls.thread():
+                return func(*args, **kwargs)
+        return wrapper
+
+    def start(self):
+        """开始采样"""
+        tracemalloc.start()
+        Profiler._active = self
+        threading.setprofile(self._bootstrap_thread)
+        self.profile.enable()
+
+    def stop(self):
+        """停止采样并写出结果"""
+        self.profile.disable()
+        threading.setprofile(None)
+        Profiler._active = None
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        stats = pstats.Stats(self.profile)
+        with self._lock:
+            for profile in self._thread_profiles:
+                stats.add(profile)
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        prof_path = self.output_dir / f'profile_{stamp}.prof'
+        stats.dump_stats(prof_path)
+
+        with open(self.output_dir / f'profile_{stamp}.txt', 'w', encoding='utf-8') as f:
+            stats.stream = f
+            stats.sort_stats('cumulative').print_stats(self.top_n)
+            f.write('\n内存分配TOP（tracemalloc）:\n')
+            for stat in snapshot.statistics('lineno')[:self.top_n]:
+                f.write(f'{stat}\n')
+
+        self.logger.info(f"性能分析结果已保存至: {prof_path}")
@@ -0,0 +1,139 @@
+"""
+可合并的流式摘要（sketch）
+
+KLLSketch 用固定大小的内存近似任意分位数，HyperLogLog 近似不重复元素的个数。
+两者都可以逐条更新、序列化保存，并且同类摘要可以直接合并（例如合并多次采集
+或多个工作进程的结果），合并后的精度与对全部数据直接构建的摘要相同。
+"""
+import hashlib
+import json
+import math
+import random
+from typing import Iterable, List
+
+class KLLSketch:
+    """
+    KLL 分位数摘要
+
+    第 h 层中的每个元素代表 2^h 个原始数据。某一层装满时排序并隔一个取一个
+    提升到上一层，层越低容量越小。k=200 时分位数的秩误差约为 1%。
+    """
+
+    def __init__(self, k: int = 200, n: int = 0, levels: List[List[float]] = None):
+        self.k = k
+        self.n = n
+        self.levels = levels or [[]]
+        self._random = random.Random(n)
+        self._size = sum(len(level) for level in self.levels)
+        self._max_size = self._capacity_total()
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(self.k * (2 / 3) ** depth))
+
+    def _capacity_total(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def update(self, value: float):
+        self.levels[0].append(float(value))
+        self.n += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def update_many(self, values: Iterable[float]):
+        for value in values:
+            self.update(value)
+
+    def _compress(self):
+        while self._size >= self._max_size:
+            for level, items in enumerate(self.levels):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.levels):
+                        self.levels.append([])
+                    items.sort()
+                    # 奇数个时保留最小的一个，其余随机保留奇数位或偶数位
+                    keep = [items[0]] if len(items) % 2 else []
+                    pairs = items[len(keep):]
+                    promoted = pairs[self._random.randint(0, 1)::2]
+                    self.levels[level + 1].extend(promoted)
+                    self.levels[level] = keep
+                    self._size -= len(pairs) - len(promoted)
+                    self._max_size = self._capacity_total()
+                    break
+
+    def merge(self, other: 'KLLSketch'):
+        """合并另一个摘要"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self._size += sum(len(items) for items in other.levels)
+        self._max_size = self._capacity_total()
+        self._compress()
+
+    def quantile(self, q: float) -> float:
+        """近似的 q 分位数（0 <= q <= 1），没有数据时返回 NaN"""
+        weighted = sorted(
+            (value, 1 << level) for level, items in enumerate(self.levels) for value in items
+        )
+        if not weighted:
+            return float('nan')
+        target = q * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def to_bytes(self) -> bytes:
+        return json.dumps({'k': self.k, 'n': self.n, 'levels': self.levels}).encode()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'KLLSketch':
+        state = json.loads(data)
+        return cls(state['k'], state['n'], state['levels'])
+
+class HyperLogLog:
+    """
+    HyperLogLog 基数估计
+
+    2^p 个寄存器（p=14 时占用 16KB），标准误差约 1.04 / sqrt(2^p)，即 0.8%。
+    """
+
+    def __init__(self, p: int = 14, registers: bytes = None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers else bytearray(self.m)
+
+    def add(self, value: str):
+        h = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        """合并另一个相同精度的 HyperLogLog"""
+        if other.p != self.p:
+            raise ValueError(f"HyperLogLog 精度不一致: {self.p} != {other.p}")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # 小基数时改用线性计数
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.p]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        return cls(data[0], data[1:])
@@ -5,6 +5,7 @@ import pandas as pd
 import logging
 from pathlib import Path
 from src.utils.path_manager import PathManager
+from src.utils.metrics import Metrics
 import numpy as np
 
 class DataVisualizer:
@@ -44,6 +45,7 @@ class DataVisualizer:
         except Exception as e:
             self.logger.error(f"保存图表失败: {str(e)}")
 
+    @Metrics.timed('chart.category_distribution')
     def plot_category_distribution(self, distribution: Dict[str, int]):
         """绘制图书分类分布图"""
         plt.figure(figsize=(8, 8))  # 使用更小的尺寸
@@ -77,6 +79,7 @@ class DataVisualizer:
         plt.tight_layout()
         self._save_plot('category_distribution.png')
 
+    @Metrics.timed('chart.all')
     def generate_all_plots(self, analyzer):
         """生成所有可视化图表"""
         try:
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 与 python src/main.py 一样，以项目根目录作为导入起点（import src.xxx）
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,50 @@
+import pytest
+
+from src.config.settings import Settings
+from src.database.book_storage import NormalizedBookStore
+from src.database.db_manager import DatabaseManager
+
+def _book(i, **fields):
+    book = {'title': f'图书{i}', 'author': '张三 著 /2020-01-01/某出版社', 'price': '¥45.60',
+            'rating': '4.5', 'url': f'http://books.example/{i}', 'platform': '当当网',
+            'crawl_time': '2024-01-15 10:00:00'}
+    book.update(fields)
+    return book
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, 'DB_STORAGE_LAYOUT', 'legacy')
+    db = DatabaseManager(tmp_path / 'books.db')
+    yield db
+    db.pool.close()
+
+def test_migrate_legacy_table_keeps_ids_and_rows(legacy_db):
+    books = [_book(i) for i in range(5)] + [
+        # 无法拆分的作者信息、缺失的价格和非标准的采集时间原样保留
+        _book(5, author='佚名'),
+        _book(6, price=None, platform='京东'),
+        _book(7, crawl_time='昨天'),
+    ]
+    assert legacy_db.save_books(books)
+    with legacy_db.writer() as conn:
+        conn.execute('DELETE FROM books WHERE id = 3')
+    with legacy_db.reader() as conn:
+        assert NormalizedBookStore.layout(conn) == 'legacy'
+        before = conn.execute('SELECT id, title, author, price, rating, url, platform, crawl_time '
+                              'FROM books ORDER BY id').fetchall()
+
+    assert legacy_db.book_store.migrate() == len(before)
+    assert legacy_db.normalized_layout and legacy_db.book_rows_table == 'book_rows_all'
+    with legacy_db.reader() as conn:
+        assert NormalizedBookStore.layout(conn) == 'normalized'
+        after = conn.execute('SELECT id, title, author, price, rating, url, platform, crawl_time '
+                             'FROM books ORDER BY id').fetchall()
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'books_legacy'").fetchone() is None
+    assert after == before
+    assert legacy_db.count_books() == len(before)
+
+    # 迁移后新写入的图书 id 接在原有 id 之后，再次迁移不做任何事
+    assert legacy_db.save_books([_book(8)])
+    with legacy_db.reader() as conn:
+        assert conn.execute("SELECT id FROM books WHERE title = '图书8'").fetchone()[0] == before[-1][0] + 1
+    assert legacy_db.book_store.migrate() == 0
@@ -0,0 +1,76 @@
+from datetime import date, datetime
+
+import pytest
+
+from src.config.settings import Settings
+from src.database.db_manager import DatabaseManager
+
+def _books(month, count, price='10'):
+    """某月 15 日采集的 count 本图书"""
+    return [{'title': f'图书{month}-{i}', 'author': '张三 著 /2020-01-01/某出版社', 'price': price,
+             'rating': '4.5', 'url': f'http://books.example/{month}/{i}', 'platform': '当当网',
+             'crawl_time': f'{month}-15 10:00:00'} for i in range(count)]
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, 'DB_STORAGE_LAYOUT', 'normalized')
+    monkeypatch.setattr(Settings, 'PARTITION_RETENTION_MONTHS', 6)
+    monkeypatch.setattr(Settings, 'PARTITION_ARCHIVE', True)
+    db = DatabaseManager(tmp_path / 'books.db')
+    yield db
+    db.pool.close()
+
+def _main_rows(db):
+    with db.reader() as conn:
+        return conn.execute('SELECT COUNT(*) FROM main.book_rows').fetchone()[0]
+
+def test_rotate_requires_normalized_layout(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, 'DB_STORAGE_LAYOUT', 'legacy')
+    db = DatabaseManager(tmp_path / 'books.db')
+    with pytest.raises(ValueError):
+        db.partitions.rotate(datetime(2024, 3, 15))
+    db.pool.close()
+
+def test_rotate_moves_months_and_expires_past_retention(db):
+    # 2023-07 到 2024-03 每月 10 本，2023-07 的价格缺失
+    months = ['2023-07', '2023-08', '2023-09', '2023-10', '2023-11', '2023-12', '2024-01', '2024-02', '2024-03']
+    for month in months:
+        assert db.save_books(_books(month, 10, price=None if month == '2023-07' else '10'))
+
+    # 保留 6 个整月：2023-09 至 2024-02 移入分区，更早的月份汇总后移出，当月留在主库
+    summary = db.partitions.rotate(datetime(2024, 3, 15))
+    assert summary['moved'] == 60 and summary['expired'] == 20
+    assert db.partitions.attached_months() == ['202309', '202310', '202311', '202312', '202401', '202402']
+    assert _main_rows(db) == 10
+    assert db.count_books() == 70
+    with db.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM books WHERE crawl_time LIKE '2023-09-%'").fetchone()[0] == 10
+        assert conn.execute("SELECT COUNT(*) FROM books WHERE crawl_time LIKE '2023-08-%'").fetchone()[0] == 0
+
+    stats = db.partitions.daily_stats()
+    assert [(s['date'], s['observations']) for s in stats] == [(date(2023, 7, 15), 10), (date(2023, 8, 15), 10)]
+    assert stats[0]['avg_price'] is None and stats[1]['avg_price'] == 10.0
+    assert stats[1]['platform'] == '当当网' and stats[1]['publisher'] == '某出版社'
+    assert (db.partitions.directory / 'archive' / 'books_202308.db').exists()
+
+    # 再次轮转同一时间不做任何事
+    assert db.partitions.rotate(datetime(2024, 3, 15))['moved'] == 0
+
+    # 一年后：此前的分区和主库中的 2024-03 全部超出保留期，2025-02 移入分区
+    assert db.save_books(_books('2025-02', 5) + _books('2025-03', 3))
+    summary = db.partitions.rotate(datetime(2025, 3, 15))
+    assert summary['moved'] == 5 and summary['expired'] == 70
+    assert db.partitions.attached_months() == ['202502']
+    assert _main_rows(db) == 3
+    assert db.count_books() == 8
+    states = {p['month']: p['state'] for p in db.partitions.partitions()}
+    assert states.pop('202502') == 'attached'
+    assert set(states.values()) == {'archived'}
+    assert not (db.partitions.directory / 'books_202309.db').exists()
+    assert (db.partitions.directory / 'archive' / 'books_202309.db').exists()
+
+    stats = db.partitions.daily_stats()
+    assert len(stats) == 9
+    assert sum(s['observations'] for s in stats) == 90
+    assert stats[-1]['date'] == date(2024, 3, 15)
+    assert db.partitions.daily_stats(start=date(2023, 9, 1), end=date(2023, 12, 31)) == stats[2:6]
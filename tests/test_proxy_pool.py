@@ -0,0 +1,86 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.crawler.proxy_pool import BlockedError, ProxyPool
+
+TARGET_URL = 'http://books.example/bestsellers'
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    """HTTP 代理替身：对任何经过它的请求返回服务器上设置的状态码"""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        body = '<html>图书</html>'.encode('utf-8')
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def proxy_stub():
+    servers = []
+
+    def start(status: int):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _ProxyHandler)
+        server.status = status
+        server.requests = []
+        server.url = f"http://127.0.0.1:{server.server_address[1]}"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def test_server_errors_fail_over_to_healthy_proxy(proxy_stub):
+    bad, good = proxy_stub(502), proxy_stub(200)
+    pool = ProxyPool([bad.url, good.url], include_direct=False, quarantine_seconds=3600,
+                     failure_threshold=1, max_tries=3)
+    # 让坏出口先被选中；坏出口随后被隔离 1 小时，好出口会作为最早期满的出口被试探
+    pool.exits[1].quarantined_until = time.time() + 60
+
+    response = pool.get(TARGET_URL)
+    assert response.status_code == 200
+    assert bad.requests == [TARGET_URL] and good.requests == [TARGET_URL]
+    bad_exit = pool.exits[0]
+    assert bad_exit.failures == 1 and bad_exit.quarantined_until > time.time()
+
+def test_proxy_auth_required_counts_as_failure(proxy_stub):
+    proxy = proxy_stub(407)
+    pool = ProxyPool([proxy.url], include_direct=False, failure_threshold=2, max_tries=2)
+
+    with pytest.raises(requests.HTTPError):
+        pool.get(TARGET_URL)
+    exit_ = pool.exits[0]
+    assert exit_.failures == 2 and exit_.requests == 2
+    assert exit_.quarantined_until > time.time()
+
+def test_quarantine_backoff_doubles_and_resets_on_recovery(proxy_stub):
+    proxy = proxy_stub(403)
+    pool = ProxyPool([proxy.url], include_direct=False, quarantine_seconds=10,
+                     max_quarantine_seconds=35, max_tries=1)
+    exit_ = pool.exits[0]
+
+    durations = []
+    for _ in range(4):
+        with pytest.raises(BlockedError):
+            pool.get(TARGET_URL)
+        durations.append(exit_.quarantined_until - time.time())
+    assert [round(duration) for duration in durations] == [10, 20, 35, 35]
+    assert exit_.blocks == 4 and exit_.strikes == 4
+
+    # 全部出口都在隔离中时仍会放行一次试探请求，成功即恢复
+    proxy.status = 200
+    assert pool.get(TARGET_URL).status_code == 200
+    assert exit_.quarantined_until == 0.0 and exit_.strikes == 0
+    assert pool.stats()[0]['quarantined_for'] == 0.0
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+from src.distributed.task_queue import LocalRedis, RedisTaskQueue, SQLiteTaskQueue
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def queue(request, tmp_path):
+    if request.param == 'sqlite':
+        task_queue = SQLiteTaskQueue(tmp_path / 'tasks.db', max_attempts=2)
+    else:
+        task_queue = RedisTaskQueue(LocalRedis(), max_attempts=2)
+    yield task_queue
+    task_queue.close()
+
+def test_local_redis_commands():
+    client = LocalRedis()
+    assert client.hset('h', 'a', 1) == 1
+    assert client.hset('h', 'a', 2) == 0
+    assert client.hget('h', 'a') == '2'
+    assert client.hincrby('h', 'a', 3) == 5
+    assert client.hkeys('h') == ['a'] and client.hlen('h') == 1
+    assert client.hdel('h', 'a') == 1 and client.hdel('h', 'a') == 0
+
+    client.rpush('l', 'x')
+    client.rpush('l', 'y')
+    assert client.lindex('l', 0) == 'x' and client.lindex('l', 5) is None
+    assert client.lpop('l') == 'x' and client.llen('l') == 1
+
+    assert client.zadd('z', {'a': 2, 'b': 1}) == 2
+    assert client.zrangebyscore('z', '-inf', 1.5) == ['b']
+    assert client.zrem('z', 'b') == 1 and client.zcard('z') == 1
+
+def test_local_redis_transaction_queues_after_multi():
+    client = LocalRedis()
+    client.rpush('l', 'x')
+
+    def func(pipe):
+        head = pipe.lindex('l', 0)
+        pipe.multi()
+        pipe.lpop('l')
+        pipe.hset('h', 'head', head)
+        # MULTI 之后的命令在 execute 前不生效
+        assert client.llen('l') == 1
+        return head
+
+    assert client.transaction(func, 'l', value_from_callable=True) == 'x'
+    assert client.llen('l') == 0 and client.hget('h', 'head') == 'x'
+    assert client.transaction(lambda pipe: pipe.multi() or pipe.rpush('l', 'y')) == [1]
+
+def test_lease_complete_ack(queue):
+    [task_id] = queue.put([{'url': 'http://example.com/1'}])
+    task = queue.lease('w1', 60)
+    assert task.task_id == task_id and task.payload == {'url': 'http://example.com/1'}
+    assert task.attempts == 1
+    assert queue.lease('w2', 60) is None
+    assert queue.heartbeat(task, 60)
+    assert queue.complete(task, [{'title': 'a'}])
+    assert queue.completed() == [(task_id, [{'title': 'a'}])]
+    queue.ack(task_id)
+    queue.ack(task_id)
+    assert queue.completed() == []
+    assert queue.stats().get('ingested') == 1
+
+def test_expired_lease_is_reassigned_and_stale_result_rejected(queue):
+    queue.put([{'page': 1}])
+    stale = queue.lease('w1', 0.05)
+    time.sleep(0.1)
+    fresh = queue.lease('w2', 60)
+    assert fresh is not None and fresh.task_id == stale.task_id
+    assert fresh.attempts == 2 and fresh.lease_token != stale.lease_token
+
+    assert not queue.heartbeat(stale, 60)
+    assert not queue.complete(stale, [{'title': 'stale'}])
+    queue.fail(stale, 'late failure')
+    assert queue.complete(fresh, [{'title': 'fresh'}])
+    assert queue.completed() == [(fresh.task_id, [{'title': 'fresh'}])]
+
+def test_fail_requeues_until_max_attempts(queue):
+    queue.put([{'page': 1}])
+    queue.fail(queue.lease('w1', 60), 'timeout')
+    task = queue.lease('w1', 60)
+    assert task.attempts == 2
+    queue.fail(task, 'timeout')
+    assert queue.lease('w1', 60) is None
+    assert queue.stats().get('failed') == 1
+
+def test_expired_lease_fails_after_max_attempts(queue):
+    queue.put([{'page': 1}])
+    # 工作进程每次都在提交前崩溃，只留下过期的租约
+    first = queue.lease('w1', 0.05)
+    time.sleep(0.1)
+    second = queue.lease('w2', 0.05)
+    assert second.task_id == first.task_id and second.attempts == 2
+    time.sleep(0.1)
+
+    assert queue.lease('w3', 60) is None
+    assert not queue.complete(second, [{'title': 'late'}])
+    stats = queue.stats()
+    assert stats.get('failed') == 1 and not stats.get('pending') and not stats.get('leased')
+
+def test_concurrent_workers_complete_each_task_exactly_once(queue):
+    task_ids = queue.put([{'page': page} for page in range(200)])
+    completed = []
+    lock = threading.Lock()
+
+    def work(worker_id):
+        while True:
+            task = queue.lease(worker_id, 60)
+            if task is None:
+                return
+            if queue.complete(task, [task.payload]):
+                with lock:
+                    completed.append(task.task_id)
+
+    workers = [threading.Thread(target=work, args=(f'w{i}',)) for i in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sorted(completed) == sorted(task_ids)
+    assert sorted(task_id for task_id, _ in queue.completed(limit=1000)) == sorted(task_ids)